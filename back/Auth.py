@@ -1,16 +1,40 @@
+import os
+import time
+import uuid
+import asyncio
+import hashlib
+import secrets
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import Depends
 from fastapi.security import OAuth2PasswordBearer
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
-# Pas sécurisé en cas réel
-SECRET_KEY = "Timothée"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
+# Rotation des clés : JWT_KEYS="k2:nouveau,k1:ancien" ; JWT_ACTIVE_KID signe les nouveaux tokens,
+# les autres clés restent acceptées jusqu'à expiration des tokens qu'elles ont signés.
+# Sans JWT_KEYS, clé aléatoire propre au processus : les tokens ne survivent pas à un
+# redémarrage (serve.py en tire une commune à ses workers)
+JWT_KEYS = dict(
+    entry.split(":", 1) for entry in os.getenv("JWT_KEYS", "").split(",") if entry
+) or {"k1": secrets.token_urlsafe(32)}
+JWT_ACTIVE_KID = os.getenv("JWT_ACTIVE_KID", next(iter(JWT_KEYS)))
+# Tokens sans kid, émis avant la rotation des clés : refusés, sauf si JWT_LEGACY_KEY
+# donne la clé qui les a signés
+JWT_LEGACY_KEY = os.getenv("JWT_LEGACY_KEY") or None
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+# Coût bcrypt : les hash d'un coût différent sont recalculés à la connexion suivante
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_QUEUE_SIZE = int(os.getenv("HASH_QUEUE_SIZE", "32"))  # calculs en attente au-delà des workers
+
 # Gestion des mots de passe
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 
 def verify_password(plain_password, hashed_password):
@@ -21,16 +45,123 @@ def get_password_hash(password):
     return pwd_context.hash(password)
 
 
+class HasherBusy(Exception):
+    """Trop de calculs bcrypt en cours : la requête est refusée plutôt que mise en file."""
+
+
+class PasswordHasher:
+    """
+    Exécute bcrypt dans un pool de threads borné (bcrypt libère le GIL) pour ne
+    pas bloquer la boucle d'événements. Au-delà de workers + queue_size calculs
+    en cours, les appels échouent immédiatement avec HasherBusy.
+    """
+
+    def __init__(self, workers=HASH_WORKERS, queue_size=HASH_QUEUE_SIZE):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self.limit = workers + queue_size
+        self.in_flight = 0
+        self.rejected = 0
+
+    async def _run(self, func, *args):
+        if self.in_flight >= self.limit:
+            self.rejected += 1
+            raise HasherBusy()
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.in_flight -= 1
+
+    async def hash(self, password):
+        return await self._run(get_password_hash, password)
+
+    async def verify_and_update(self, plain_password, hashed_password):
+        """(valide, nouveau hash ou None si le hash stocké est encore au bon coût)."""
+        return await self._run(pwd_context.verify_and_update, plain_password, hashed_password)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {"in_flight": self.in_flight, "limit": self.limit, "rejected": self.rejected}
+
+
+hasher = PasswordHasher()
+
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    # jti : identifiant du token, pour pouvoir le révoquer
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
+    return jwt.encode(to_encode, JWT_KEYS[JWT_ACTIVE_KID], algorithm=ALGORITHM,
+                      headers={"kid": JWT_ACTIVE_KID})
+
+
+class TokenVerifier:
+    """
+    Vérification des JWT avec cache : un token déjà validé n'est plus décodé
+    tant qu'il n'a pas expiré. Le cache est une LRU bornée indexée par
+    l'empreinte du token (le token lui-même n'est pas conservé).
+
+    Les tokens révoqués (déconnexion) sont gardés dans une liste de refus par
+    jti jusqu'à leur date d'expiration, après quoi ils seraient refusés de
+    toute façon.
+    """
+
+    def __init__(self, keys=JWT_KEYS, max_size=TOKEN_CACHE_SIZE, legacy_key=JWT_LEGACY_KEY):
+        self.keys = keys
+        self.max_size = max_size
+        self.legacy_key = legacy_key
+        self._claims = OrderedDict()  # empreinte -> claims
+        self._revoked = {}  # jti -> exp
+        self.hits = 0
+        self.misses = 0
+
+    def _decode(self, token):
+        kid = jwt.get_unverified_header(token).get("kid")
+        # Seules les clés de JWT_KEYS signent : kid absent ou inconnu refusé
+        key = self.keys.get(kid) if kid else self.legacy_key
+        if key is None:
+            raise JWTError("Clé de signature absente ou inconnue")
+        return jwt.decode(token, key, algorithms=[ALGORITHM])
+
+    def verify(self, token):
+        """Claims du token ; lève JWTError s'il est invalide, expiré ou révoqué."""
+        digest = hashlib.blake2b(token.encode(), digest_size=16).digest()
+        claims = self._claims.get(digest)
+        if claims is not None and claims["exp"] > time.time():
+            self.hits += 1
+            self._claims.move_to_end(digest)
+        else:
+            self._claims.pop(digest, None)
+            self.misses += 1
+            claims = self._decode(token)
+            self._claims[digest] = claims
+            if len(self._claims) > self.max_size:
+                self._claims.popitem(last=False)
+        if claims.get("jti") in self._revoked:
+            raise JWTError("Token révoqué")
+        return claims
+
+    def revoke(self, claims):
+        now = time.time()
+        # Les révocations expirées ne servent plus : purge au fil de l'eau
+        for jti in [jti for jti, exp in self._revoked.items() if exp <= now]:
+            del self._revoked[jti]
+        if claims.get("jti"):
+            self._revoked[claims["jti"]] = claims["exp"]
+
+    def stats(self):
+        return {"cached": len(self._claims), "max_size": self.max_size, "hits": self.hits,
+                "misses": self.misses, "revoked": len(self._revoked)}
+
+
+tokens = TokenVerifier()
 
 
 def decode_token(token: str):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
+        return tokens.verify(token)
     except JWTError:
         return None
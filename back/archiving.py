@@ -0,0 +1,136 @@
+"""
+Archivage : les projets au statut "archivé" et les tâches terminées depuis plus
+de ARCHIVE_TASKS_AFTER_DAYS jours quittent les tables chaudes pour les tables
+Archived*, avec leurs membres et assignations. Les lectures par défaut (tableau,
+/my-projects, /tasks...) ne portent plus que sur les données vivantes, quelle
+que soit la taille des archives ; `include_archived=true` les y réintègre.
+
+Le déplacement se fait par lots de ARCHIVE_BATCH_SIZE, chacun dans sa
+transaction, toutes les ARCHIVE_INTERVAL secondes dans l'API (0 : jamais),
+ou à la demande :
+
+    python back/archiving.py                        # une passe complète
+    python back/archiving.py --restore-project 12
+
+    POST /projects/{id}/restore     projet, membres et tâches récentes
+    POST /tasks/{id}/restore        tâche archivée d'un projet actif
+"""
+import os
+import asyncio
+import logging
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from cache import cache
+from search import search
+from shared import shared
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_INTERVAL = float(os.getenv("ARCHIVE_INTERVAL", "3600"))
+ARCHIVE_TASKS_AFTER_DAYS = int(os.getenv("ARCHIVE_TASKS_AFTER_DAYS", "90"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+
+
+def completed_before():
+    """Date limite d'archivage des tâches terminées (UTC, comme CURRENT_TIMESTAMP)."""
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return now - timedelta(days=ARCHIVE_TASKS_AFTER_DAYS)
+
+
+async def archive_pass(archive_repo, batch_size=ARCHIVE_BATCH_SIZE, cutoff=None, progress=None):
+    """
+    Archive par lots tout ce qui est archivable, caches invalidés lot par lot.
+    Retourne (projets archivés, tâches archivées).
+    """
+    cutoff = cutoff or completed_before()
+    projects = tasks = 0
+    while project_ids := await archive_repo.archivable_projects(batch_size):
+        members = await archive_repo.archive_projects(project_ids)
+        users = {user_id for users in members.values() for user_id in users}
+        await cache.invalidate(*(f"project:{p}" for p in members), *(f"user:{u}" for u in users))
+        await search.projects_changed(list(members))
+        projects += len(members)
+        if not members:
+            break  # projets réactivés entre la lecture et l'archivage
+        if progress:
+            progress(projects, tasks)
+    while task_ids := await archive_repo.archivable_tasks(cutoff, batch_size):
+        project_ids, archived = await archive_repo.archive_tasks(task_ids, cutoff)
+        if not archived:
+            break  # tâches rouvertes entre la lecture et l'archivage
+        await cache.invalidate(*(f"project:{p}" for p in project_ids))
+        await search.tasks_changed(task_ids)
+        tasks += archived
+        if progress:
+            progress(projects, tasks)
+    return projects, tasks
+
+
+class Archiver:
+    """Passe d'archivage en tâche de fond, toutes les `interval` secondes."""
+
+    def __init__(self, interval=ARCHIVE_INTERVAL):
+        self.interval = interval
+        self._task = None
+
+    def start(self, archive_repo):
+        if self.interval > 0:
+            self._task = asyncio.create_task(self._run(archive_repo))
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, archive_repo):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                # Un seul worker archive : celui qui détient (et renouvelle) le bail
+                if not await shared.lease("lease:archiver", self.interval * 2):
+                    continue
+                projects, tasks = await archive_pass(archive_repo)
+                if projects or tasks:
+                    logger.info("Archivage : %s projets, %s tâches", projects, tasks)
+            except Exception:
+                logger.exception("Passe d'archivage interrompue")
+
+
+archiver = Archiver()
+
+
+async def main(argv=None):
+    from database import db
+    from repository import ArchiveRepository
+
+    parser = argparse.ArgumentParser(description="Archivage des projets archivés et des tâches terminées")
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--restore-project", type=int, metavar="PROJECT_ID", help="Restaurer un projet archivé")
+    args = parser.parse_args(argv)
+
+    await db.open()
+    try:
+        archive_repo = ArchiveRepository(db)
+        if args.restore_project is not None:
+            project, members = await archive_repo.restore_project(args.restore_project, completed_before())
+            if project is None:
+                raise SystemExit(f"Projet {args.restore_project} absent des archives")
+            await cache.invalidate(f"project:{project['id']}", *(f"user:{user_id}" for user_id in members))
+            print(f"Projet {project['id']} restauré")
+            return
+        projects, tasks = await archive_pass(
+            archive_repo, args.batch_size,
+            progress=lambda projects, tasks: print(f"  {projects} projets, {tasks} tâches", end="\r", flush=True),
+        )
+        print(f"\n{projects} projets et {tasks} tâches archivés")
+    finally:
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,179 @@
+"""
+Cache de lecture (read-through) pour les réponses les plus sollicitées :
+tâches d'un projet, projet, liste des utilisateurs, projets d'un utilisateur.
+
+Chaque entrée appartient à un périmètre ("project:3", "user:7", "users").
+Invalider un périmètre incrémente son numéro de génération : les entrées de
+l'ancienne génération ne sont plus jamais lues et finissent évincées (LRU) ou
+expirées (TTL). Les générations sont dans l'état partagé (shared.py) : une
+invalidation vaut pour tous les workers, même quand chacun garde ses entrées
+en mémoire. Les entrées elles-mêmes sont en mémoire ou sur Redis.
+
+La génération sert aussi de version pour les ETag : un GET conditionnel dont
+l'ETag correspond encore reçoit un 304 sans qu'aucune requête SQL ne soit faite.
+"""
+import os
+import json
+import time
+import hashlib
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from responses import dumps
+from shared import SHARED_BACKEND, shared
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")  # memory, redis ou none
+CACHE_TTL = float(os.getenv("CACHE_TTL", "60"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+
+class MemoryCache:
+    """LRU en mémoire, bornée en octets, avec expiration par entrée."""
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # clé -> (valeur, date d'expiration)
+        self._bytes = 0
+        self.evictions = 0
+
+    def _remove(self, key):
+        value, _ = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    async def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key, value, ttl):
+        if len(value) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._bytes += len(value)
+        while self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def stats(self):
+        return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                "evictions": self.evictions}
+
+
+class RedisCache:
+    """
+    Même interface sur un serveur compatible Redis, partagé entre workers.
+    La borne mémoire et l'éviction sont celles du serveur (maxmemory-policy).
+    """
+
+    def __init__(self, url=CACHE_REDIS_URL):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis nécessite le paquet redis (pip install redis)")
+        self.client = redis.from_url(url)
+
+    async def get(self, key):
+        return await self.client.get(key)
+
+    async def set(self, key, value, ttl):
+        await self.client.set(key, value, px=int(ttl * 1000))
+
+    def stats(self):
+        return {}
+
+
+class ResponseCache:
+
+    def __init__(self, backend, ttl=CACHE_TTL, counters=shared):
+        self.backend = backend
+        # Les versions restent disponibles (pour les ETag) même cache désactivé
+        self.counters = counters
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def version(self, scope):
+        return await self.counters.get_counter(f"gen:{scope}")
+
+    async def etag(self, scope, key=""):
+        """ETag fort de (scope, key) à la version courante du périmètre."""
+        digest = hashlib.blake2b(f"{scope}|{key}".encode(), digest_size=6).hexdigest()
+        return f'"{self.counters.token}-{await self.version(scope)}-{digest}"'
+
+    async def _key(self, scope, key):
+        return f"{scope}:{await self.version(scope)}:{key}"
+
+    async def get_or_load(self, scope, key, loader):
+        """Valeur en cache pour (scope, key), sinon résultat de `await loader()` mis en cache."""
+        if self.backend is None:
+            return await loader()
+        full_key = await self._key(scope, key)
+        cached = await self.backend.get(full_key)
+        if cached is not None:
+            self.hits += 1
+            return json.loads(cached)
+        self.misses += 1
+        value = await loader()
+        await self.backend.set(full_key, dumps(value), self.ttl)
+        return value
+
+    async def get_or_load_json(self, scope, key, loader):
+        """Comme get_or_load, mais retourne le JSON encodé, à servir tel quel sans le redécoder."""
+        if self.backend is None:
+            return dumps(await loader())
+        full_key = await self._key(scope, key)
+        cached = await self.backend.get(full_key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        value = dumps(await loader())
+        await self.backend.set(full_key, value, self.ttl)
+        return value
+
+    async def invalidate(self, *scopes):
+        for scope in dict.fromkeys(scopes):
+            await self.counters.incr(f"gen:{scope}")
+            self.invalidations += 1
+
+    def stats(self):
+        stats = {"backend": CACHE_BACKEND, "shared": SHARED_BACKEND, "hits": self.hits, "misses": self.misses,
+                 "invalidations": self.invalidations}
+        if self.backend is not None:
+            stats.update(self.backend.stats())
+        return stats
+
+
+def query_key(request):
+    """Paramètres de la requête sous forme canonique, pour servir de clé de cache."""
+    return urlencode(sorted(request.query_params.multi_items()))
+
+
+def if_none_match(request, etag):
+    """Vrai si l'en-tête If-None-Match de la requête désigne déjà `etag`."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def create_cache():
+    if CACHE_BACKEND == "redis":
+        return ResponseCache(RedisCache())
+    if CACHE_BACKEND == "none":
+        return ResponseCache(None)
+    return ResponseCache(MemoryCache())
+
+
+cache = create_cache()
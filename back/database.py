@@ -0,0 +1,605 @@
+import os
+import time
+import asyncio
+import logging
+import sqlite3
+from collections import deque
+from contextlib import asynccontextmanager, suppress
+from datetime import date, datetime
+from pathlib import Path
+
+import aiomysql
+import aiosqlite
+
+from metrics import record_query
+from migrations import create_mysql_schema, migrate
+
+logger = logging.getLogger(__name__)
+
+# "mysql" en production, "sqlite" pour les tests locaux sans Docker
+DB_BACKEND = os.getenv("DB_BACKEND", "mysql")
+
+# Paramètres de connexion (surchargeables par variables d'environnement)
+DB_HOST = os.getenv("DB_HOST", "db")
+DB_PORT = int(os.getenv("DB_PORT", "3306"))
+DB_USER = os.getenv("DB_USER", "taskuser")
+DB_PASSWORD = os.getenv("DB_PASSWORD", "taskpassword")
+DB_NAME = os.getenv("DB_NAME", "Task_Manager")
+DB_SQLITE_PATH = os.getenv("DB_SQLITE_PATH", "task_manager.db")
+SQLITE_SCHEMA = Path(__file__).parent.parent / "init_sqlite.sql"
+MYSQL_SCHEMA = Path(__file__).parent.parent / "init.sql"
+
+# Paramètres du pool
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+DB_POOL_RECYCLE = float(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+
+# Nombre maximal de lignes par INSERT multi-lignes, et de valeurs par IN (...)
+BATCH_SIZE = 1000
+
+
+def chunked(seq, size=BATCH_SIZE):
+    seq = list(seq)
+    for start in range(0, len(seq), size):
+        yield seq[start:start + size]
+
+
+def in_clause(values):
+    """Marqueurs d'une clause IN (...) pour `values`."""
+    return f"({', '.join(['%s'] * len(values))})"
+
+
+class DatabaseError(Exception):
+    """Erreur remontée par le pilote, quel que soit le backend."""
+
+
+class PoolTimeout(Exception):
+    """Aucune connexion libre dans le délai imparti."""
+
+
+class ConnectionPool:
+    """
+    Pool de connexions asynchrone partagé par tout le processus.
+
+    - min_size connexions ouvertes au démarrage, jamais plus de max_size
+    - attente bornée par `timeout` secondes quand le pool est plein
+    - ping de la connexion à l'emprunt (remplacée si elle est morte)
+    - connexion recyclée après `recycle` secondes d'existence
+
+    Le pool ne connaît pas le pilote : `connect`, `ping` et `close` sont des
+    coroutines fournies par le backend.
+    """
+
+    def __init__(self, connect, ping, close, min_size=DB_POOL_MIN_SIZE, max_size=DB_POOL_MAX_SIZE,
+                 timeout=DB_POOL_TIMEOUT, recycle=DB_POOL_RECYCLE):
+        if min_size > max_size:
+            raise ValueError("min_size doit être inférieur ou égal à max_size")
+        self._connect = connect
+        self._ping = ping
+        self._close = close
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+
+        self._idle = deque()
+        self._created_at = {}  # id(connexion) -> date de création
+        self._size = 0
+        self._in_use = 0
+        self._cond = asyncio.Condition()
+        self._closed = False
+
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+        self._recycled = 0
+        self._health_check_failures = 0
+
+    async def open(self):
+        """Ouvre les min_size connexions initiales."""
+        self._closed = False
+        for _ in range(self.min_size - self._size):
+            try:
+                connection = await self._connect()
+            except Exception as e:
+                logger.warning("Pré-ouverture du pool impossible : %s", e)
+                return
+            self._size += 1
+            self._created_at[id(connection)] = time.monotonic()
+            self._idle.append(connection)
+
+    async def close(self):
+        async with self._cond:
+            self._closed = True
+            while self._idle:
+                await self._discard(self._idle.popleft())
+            self._cond.notify_all()
+
+    async def _discard(self, connection):
+        self._size -= 1
+        self._created_at.pop(id(connection), None)
+        try:
+            await self._close(connection)
+        except Exception:
+            pass
+
+    async def _is_healthy(self, connection):
+        if time.monotonic() - self._created_at.get(id(connection), 0) > self.recycle:
+            self._recycled += 1
+            return False
+        try:
+            await self._ping(connection)
+            return True
+        except Exception:
+            self._health_check_failures += 1
+            return False
+
+    async def acquire(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        waited = False
+        while True:
+            async with self._cond:
+                while not self._idle and self._size >= self.max_size and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout("Aucune connexion disponible")
+                    waited = True
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        pass
+                if self._closed:
+                    raise PoolTimeout("Pool fermé")
+                connection = self._idle.pop() if self._idle else None
+                if connection is None:
+                    # Réserve la place avant de se connecter hors du verrou
+                    self._size += 1
+                self._in_use += 1
+
+            if connection is None:
+                try:
+                    connection = await self._connect()
+                except Exception:
+                    async with self._cond:
+                        self._size -= 1
+                        self._in_use -= 1
+                        self._cond.notify()
+                    raise
+                self._created_at[id(connection)] = time.monotonic()
+                break
+            if await self._is_healthy(connection):
+                break
+            async with self._cond:
+                self._in_use -= 1
+                await self._discard(connection)
+                self._cond.notify()
+
+        if waited:
+            self._waits += 1
+            self._wait_time += time.monotonic() - start
+        return connection
+
+    async def release(self, connection, discard=False):
+        async with self._cond:
+            self._in_use -= 1
+            if self._closed or discard:
+                await self._discard(connection)
+            else:
+                self._idle.append(connection)
+            self._cond.notify()
+
+    def stats(self):
+        return {
+            "size": self._size,
+            "in_use": self._in_use,
+            "idle": len(self._idle),
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "waits": self._waits,
+            "wait_time_total": round(self._wait_time, 6),
+            "timeouts": self._timeouts,
+            "recycled": self._recycled,
+            "health_check_failures": self._health_check_failures,
+        }
+
+
+class Connection:
+    """
+    Connexion empruntée au pool, exposant la même API quel que soit le backend.
+    Les requêtes s'écrivent avec des marqueurs `%s` (style MySQL).
+    """
+
+    # UPDATE ... RETURNING : modifier et relire une ligne en une seule requête
+    supports_returning = False
+    # Suffixe d'une lecture qui verrouille les lignes lues jusqu'à la fin de la transaction
+    locking_read = ""
+    # Un INSERT multi-lignes reçoit des ids consécutifs : _inserted_ids les déduit du dernier id
+    consecutive_ids = True
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    # Chaque requête est chronométrée et comptée (metrics.record_query) ;
+    # les sous-classes implémentent les variantes _fetch_all, _execute...
+
+    async def fetch_all(self, query, params=()):
+        start, rows = time.perf_counter(), []
+        try:
+            rows = await self._fetch_all(query, params)
+            return rows
+        finally:
+            record_query(query, params, time.perf_counter() - start, len(rows))
+
+    async def fetch_one(self, query, params=()):
+        rows = await self.fetch_all(query, params)
+        return rows[0] if rows else None
+
+    async def execute(self, query, params=()):
+        """Retourne (nombre de lignes affectées, dernier id inséré)."""
+        start = time.perf_counter()
+        try:
+            return await self._execute(query, params)
+        finally:
+            record_query(query, params, time.perf_counter() - start)
+
+    async def execute_many(self, query, seq_of_params):
+        start = time.perf_counter()
+        try:
+            return await self._execute_many(query, seq_of_params)
+        finally:
+            record_query(query, (), time.perf_counter() - start)
+
+    async def stream(self, query, params=(), size=BATCH_SIZE):
+        """Lignes du résultat par lots de `size`, sans charger tout le résultat en mémoire."""
+        # Seul le temps passé à attendre la base compte, pas celui du consommateur
+        elapsed, count = 0.0, 0
+        batches = self._stream(query, params, size).__aiter__()
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    rows = await batches.__anext__()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    elapsed += time.perf_counter() - start
+                count += len(rows)
+                yield rows
+        finally:
+            await batches.aclose()
+            record_query(query, params, elapsed, count)
+
+    async def _fetch_all(self, query, params):
+        raise NotImplementedError
+
+    async def _execute(self, query, params):
+        raise NotImplementedError
+
+    async def _execute_many(self, query, seq_of_params):
+        raise NotImplementedError
+
+    def _stream(self, query, params, size):
+        raise NotImplementedError
+
+    async def insert_many(self, table, columns, rows, with_ids=True):
+        """
+        INSERT multi-lignes par lots de BATCH_SIZE lignes (ligne à ligne si les
+        ids d'un INSERT multi-lignes ne sont pas consécutifs et qu'on les lit).
+        Retourne les ids auto-incrémentés générés, dans l'ordre des lignes
+        (liste vide si with_ids=False, pour les tables sans auto-incrément).
+        """
+        ids = []
+        placeholders = in_clause(columns)
+        if with_ids and not self.consecutive_ids:
+            # Ids non déductibles d'un INSERT multi-lignes : une ligne par requête
+            query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES {placeholders}"
+            for row in rows:
+                _, lastrowid = await self.execute(query, row)
+                ids.append(lastrowid)
+            return ids
+        for batch in chunked(rows):
+            query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([placeholders] * len(batch))}"
+            _, lastrowid = await self.execute(query, [value for row in batch for value in row])
+            if with_ids:
+                ids += self._inserted_ids(lastrowid, len(batch))
+        return ids
+
+    def _inserted_ids(self, lastrowid, count):
+        raise NotImplementedError
+
+    async def increment(self, table, keys, column, rows):
+        """
+        Ajoute à `column` la valeur de chaque ligne (clé..., valeur), en créant
+        les lignes absentes : INSERT multi-lignes avec mise à jour sur clé existante.
+        Les lignes sont triées pour que deux transactions verrouillent les
+        compteurs dans le même ordre.
+        """
+        columns = (*keys, column)
+        placeholders = in_clause(columns)
+        for batch in chunked(sorted(rows)):
+            query = (
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([placeholders] * len(batch))} "
+                f"{self._increment_clause(keys, column)}"
+            )
+            await self.execute(query, [value for row in batch for value in row])
+
+    def _increment_clause(self, keys, column):
+        raise NotImplementedError
+
+    async def begin(self):
+        raise NotImplementedError
+
+    async def commit(self):
+        raise NotImplementedError
+
+    async def rollback(self):
+        raise NotImplementedError
+
+
+class MySQLConnection(Connection):
+
+    locking_read = " FOR UPDATE"
+
+    async def _fetch_all(self, query, params):
+        async with self.raw.cursor(aiomysql.DictCursor) as cursor:
+            await cursor.execute(query, params)
+            return list(await cursor.fetchall())
+
+    async def _execute(self, query, params):
+        async with self.raw.cursor() as cursor:
+            await cursor.execute(query, params)
+            return cursor.rowcount, cursor.lastrowid
+
+    async def _execute_many(self, query, seq_of_params):
+        async with self.raw.cursor() as cursor:
+            await cursor.executemany(query, seq_of_params)
+            return cursor.rowcount
+
+    async def _stream(self, query, params, size):
+        # Curseur non bufferisé : les lignes restent côté serveur jusqu'à leur lecture
+        async with self.raw.cursor(aiomysql.SSDictCursor) as cursor:
+            await cursor.execute(query, params)
+            while rows := await cursor.fetchmany(size):
+                yield rows
+
+    def _inserted_ids(self, lastrowid, count):
+        # MySQL renvoie le premier id du lot ; les ids d'un INSERT multi-lignes ne
+        # sont consécutifs qu'avec innodb_autoinc_lock_mode à 0 ou 1 (docker-compose
+        # le fixe à 1) : en mode 2, défaut de MySQL 8, des INSERT concurrents
+        # s'entrelacent et MySQLDatabase.open passe à InterleavedMySQLConnection
+        return list(range(lastrowid, lastrowid + count))
+
+    def _increment_clause(self, keys, column):
+        return f"ON DUPLICATE KEY UPDATE {column} = {column} + VALUES({column})"
+
+    async def begin(self):
+        await self.raw.begin()
+
+    async def commit(self):
+        await self.raw.commit()
+
+    async def rollback(self):
+        await self.raw.rollback()
+
+
+class InterleavedMySQLConnection(MySQLConnection):
+    """Connexion d'un serveur en innodb_autoinc_lock_mode=2 : ids relus ligne par ligne."""
+
+    consecutive_ids = False
+
+
+def _sqlite_param(value):
+    # Les adaptateurs date/datetime par défaut de sqlite3 sont dépréciés
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+# Colonnes DATE / DATETIME relues typées comme avec MySQL (detect_types=PARSE_DECLTYPES)
+sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value.decode()))
+sqlite3.register_converter("DATETIME", lambda value: datetime.fromisoformat(value.decode()))
+
+
+def _sqlite_query(query, params):
+    return query.replace("%s", "?"), tuple(_sqlite_param(p) for p in params)
+
+
+class SQLiteConnection(Connection):
+
+    supports_returning = sqlite3.sqlite_version_info >= (3, 35, 0)
+    # Pas de verrou de ligne : les transactions d'écriture sont déjà sérialisées (BEGIN IMMEDIATE)
+    locking_read = ""
+
+    async def _fetch_all(self, query, params):
+        async with self.raw.execute(*_sqlite_query(query, params)) as cursor:
+            return [dict(row) for row in await cursor.fetchall()]
+
+    async def _execute(self, query, params):
+        async with self.raw.execute(*_sqlite_query(query, params)) as cursor:
+            return cursor.rowcount, cursor.lastrowid
+
+    async def _execute_many(self, query, seq_of_params):
+        query = query.replace("%s", "?")
+        rows = [tuple(_sqlite_param(p) for p in params) for params in seq_of_params]
+        async with self.raw.executemany(query, rows) as cursor:
+            return cursor.rowcount
+
+    async def _stream(self, query, params, size):
+        async with self.raw.execute(*_sqlite_query(query, params)) as cursor:
+            while rows := await cursor.fetchmany(size):
+                yield [dict(row) for row in rows]
+
+    def _inserted_ids(self, lastrowid, count):
+        # SQLite renvoie le dernier id du lot
+        return list(range(lastrowid - count + 1, lastrowid + 1))
+
+    def _increment_clause(self, keys, column):
+        return f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {column} = {column} + excluded.{column}"
+
+    async def begin(self):
+        # IMMEDIATE : le verrou d'écriture est pris (avec busy_timeout) dès le début ;
+        # un BEGIN différé qui lit puis écrit échoue aussitôt si un autre écrivain est passé entre-temps
+        await self.raw.execute("BEGIN IMMEDIATE")
+
+    async def commit(self):
+        await self.raw.commit()
+
+    async def rollback(self):
+        await self.raw.rollback()
+
+
+class Database:
+    """
+    Point d'entrée de la couche d'accès aux données.
+
+        async with db.acquire() as conn:        # lectures (autocommit)
+            rows = await conn.fetch_all(...)
+        async with db.transaction() as conn:    # écritures atomiques
+            await conn.execute(...)
+    """
+
+    dialect = None
+    connection_class = Connection
+    driver_errors = ()
+    # Erreurs après lesquelles la connexion n'est pas rendue au pool
+    broken_errors = ()
+
+    def __init__(self, **pool_kwargs):
+        self.pool = ConnectionPool(self._connect, self._ping, self._close, **pool_kwargs)
+
+    async def _connect(self):
+        raise NotImplementedError
+
+    async def _ping(self, raw):
+        raise NotImplementedError
+
+    async def _close(self, raw):
+        raise NotImplementedError
+
+    async def open(self):
+        await self.pool.open()
+
+    async def close(self):
+        await self.pool.close()
+
+    @asynccontextmanager
+    async def acquire(self):
+        raw = await self.pool.acquire()
+        broken = False
+        try:
+            yield self.connection_class(raw)
+        except self.driver_errors as e:
+            broken = isinstance(e, self.broken_errors)
+            raise DatabaseError(str(e)) from e
+        finally:
+            await self.pool.release(raw, discard=broken)
+
+    @asynccontextmanager
+    async def transaction(self):
+        async with self.acquire() as conn:
+            await conn.begin()
+            try:
+                yield conn
+            except BaseException:
+                with suppress(*self.driver_errors):
+                    await conn.rollback()
+                raise
+            await conn.commit()
+
+    async def fetch_all(self, query, params=()):
+        async with self.acquire() as conn:
+            return await conn.fetch_all(query, params)
+
+    async def fetch_one(self, query, params=()):
+        async with self.acquire() as conn:
+            return await conn.fetch_one(query, params)
+
+    async def stream(self, query, params=(), size=BATCH_SIZE):
+        """
+        Lots de lignes lus au fil de l'eau (exports). La connexion reste
+        empruntée jusqu'à la fin de l'itération.
+        """
+        async with self.acquire() as conn:
+            async for rows in conn.stream(query, params, size):
+                yield rows
+
+
+class MySQLDatabase(Database):
+    dialect = "mysql"
+    connection_class = MySQLConnection
+    driver_errors = (aiomysql.Error,)
+    broken_errors = (aiomysql.OperationalError, aiomysql.InterfaceError)
+
+    def __init__(self, host=DB_HOST, port=DB_PORT, user=DB_USER, password=DB_PASSWORD,
+                 database=DB_NAME, **pool_kwargs):
+        super().__init__(**pool_kwargs)
+        self.connect_kwargs = dict(host=host, port=port, user=user, password=password, db=database)
+
+    async def _connect(self):
+        return await aiomysql.connect(autocommit=True, **self.connect_kwargs)
+
+    async def _ping(self, raw):
+        await raw.ping(reconnect=False)
+
+    async def _close(self, raw):
+        raw.close()
+
+    async def open(self):
+        await super().open()
+        row = await self.fetch_one("SELECT @@innodb_autoinc_lock_mode AS mode")
+        if int(row["mode"]) == 2:
+            logger.warning("innodb_autoinc_lock_mode=2 : INSERT multi-lignes remplacés par des INSERT "
+                           "ligne à ligne quand leurs ids sont lus (fixer le mode à 1, voir docker-compose.yml)")
+            self.connection_class = InterleavedMySQLConnection
+        # Base créée par une version antérieure de init.sql : colonnes, tables et index manquants
+        script = MYSQL_SCHEMA.read_text(encoding="utf-8")
+        await migrate(self, lambda conn: create_mysql_schema(conn, script))
+
+
+class SQLiteDatabase(Database):
+    dialect = "sqlite"
+    connection_class = SQLiteConnection
+    driver_errors = (sqlite3.Error,)
+
+    def __init__(self, path=DB_SQLITE_PATH, **pool_kwargs):
+        super().__init__(**pool_kwargs)
+        self.path = path
+
+    async def _connect(self):
+        # isolation_level=None : autocommit, les transactions sont ouvertes par begin()
+        raw = await aiosqlite.connect(self.path, isolation_level=None, detect_types=sqlite3.PARSE_DECLTYPES)
+        raw.row_factory = sqlite3.Row
+        await raw.execute("PRAGMA foreign_keys = ON")
+        await raw.execute("PRAGMA busy_timeout = 5000")
+        return raw
+
+    async def _ping(self, raw):
+        await raw.execute("SELECT 1")
+
+    async def _close(self, raw):
+        await raw.close()
+
+    async def open(self):
+        raw = await self._connect()
+        try:
+            await raw.execute("PRAGMA journal_mode = WAL")
+        finally:
+            await raw.close()
+        await super().open()
+        script = SQLITE_SCHEMA.read_text(encoding="utf-8")
+        await migrate(self, lambda conn: conn.raw.executescript(script))
+
+
+def create_database():
+    if DB_BACKEND == "sqlite":
+        return SQLiteDatabase()
+    return MySQLDatabase()
+
+
+db = create_database()
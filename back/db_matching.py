@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List, Literal
+from typing import Optional, List, Literal, Dict
 from datetime import date, datetime
 
 
@@ -63,19 +63,41 @@ class ProjectUpdate(BaseModel):
     end_date: Optional[date] = None
     status: Optional[Literal["actif", "archivé"]] = None
     owner_id: Optional[int] = None
+    version: Optional[int] = None  # version attendue, comme If-Match
 
 
 class Project(ProjectBase):
     id: int
     owner_id: Optional[int] = None
     created_at: datetime
+    version: int = 1
+    archived_at: Optional[datetime] = None  # renseigné pour les projets lus en archive (include_archived)
     model_config = {"from_attributes": True}
 
 
+class AssigneeStats(BaseModel):
+    user_id: int
+    name: str
+    tasks: int
+
+
+class ProjectStats(BaseModel):
+    project_id: int
+    total: int
+    by_status: Dict[str, int]
+    progress: float  # pourcentage de tâches terminées
+    overdue: int  # tâches non terminées dont l'échéance est passée
+    by_assignee: List[AssigneeStats] = []
+
+
+class ProjectWithStats(Project):
+    stats: Optional[ProjectStats] = None
+
+
 class ProjectUserBase(BaseModel):
     project_id: int
     user_id: int
-    role: str = "viewer"  # 'owner', 'editor', 'viewer'
+    role: Literal["owner", "editor", "viewer"] = "viewer"
 
 
 class ProjectUserCreate(ProjectUserBase):
@@ -109,19 +131,53 @@ class TaskUpdate(BaseModel):
     status: Optional[Literal["todo", "en cours", "terminé"]] = None
     priority: Optional[Literal["basse", "moyenne", "haute", "critique"]] = None
     project_id: Optional[int] = None
+    version: Optional[int] = None  # version attendue, comme If-Match
 
 
 class Task(TaskBase):
     id: int
     project_id: int
     created_at: datetime
+    version: int = 1
+    position: Optional[str] = None  # rang dans la colonne, ordre lexicographique
+    completed_at: Optional[datetime] = None  # passage au statut "terminé"
+    archived_at: Optional[datetime] = None  # renseigné pour les tâches lues en archive (include_archived)
     model_config = {"from_attributes": True}
 
 
+class TaskMove(BaseModel):
+    status: Literal["todo", "en cours", "terminé"]
+    after_id: Optional[int] = None  # carte qui précédera la tâche dans la colonne
+    before_id: Optional[int] = None  # carte qui la suivra ; aucune des deux : fin de colonne
+    version: Optional[int] = None
+
+
 class TaskWithUsers(Task):
     users: List[User] = []
 
 
+class TaskBulkUpdate(TaskUpdate):
+    id: int
+
+
+class TaskBulkRequest(BaseModel):
+    create: List[TaskCreate] = []
+    update: List[TaskBulkUpdate] = []
+    delete: List[int] = []
+
+
+class TaskBulkResult(BaseModel):
+    action: Literal["create", "update", "delete"]
+    index: int  # position de l'élément dans sa liste de la requête
+    id: Optional[int] = None
+    status: Literal["created", "updated", "deleted", "not_found", "invalid", "conflict"]
+    detail: Optional[str] = None
+
+
+class TaskBulkResponse(BaseModel):
+    results: List[TaskBulkResult]
+
+
 # =========================================================
 # ASSIGNED TASKS
 # =========================================================
@@ -142,6 +198,11 @@ class AssignUsersRequest(BaseModel):
     user_ids: List[int]
 
 
+class AssignUsersBatchRequest(BaseModel):
+    task_ids: List[int]
+    user_ids: List[int]
+
+
 class AssignedTask(AssignedTaskBase):
     model_config = {"from_attributes": True}
 
@@ -156,3 +217,49 @@ class TaskWithProject(Task):
 
 class ProjectWithTasks(Project):
     tasks: List[Task] = []
+
+
+# =========================================================
+# IMPORT
+# =========================================================
+class TaskImport(TaskBase):
+    assignees: List[EmailStr] = []
+
+
+class ProjectMemberImport(BaseModel):
+    email: EmailStr
+    role: Literal["owner", "editor", "viewer"] = "viewer"
+
+
+class ProjectImport(ProjectBase):
+    members: List[ProjectMemberImport] = []
+    tasks: List[TaskImport] = []
+
+
+class ImportJob(BaseModel):
+    id: int
+    user_id: int
+    status: Literal["en cours", "terminé", "échec"]
+    total: int
+    done: int  # projets déjà importés (et validés en base)
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+
+# =========================================================
+# SEARCH
+# =========================================================
+class SearchHit(BaseModel):
+    id: int
+    project_id: int
+    title: str  # titre de la tâche, nom du projet
+    snippet: Optional[str] = None  # extrait de la description autour du premier terme trouvé
+    # Positions [début, fin) des termes trouvés, dans "title" et "snippet"
+    highlights: Dict[str, List[List[int]]] = {}
+    score: float
+
+
+class SearchResults(BaseModel):
+    projects: List[SearchHit] = []
+    tasks: List[SearchHit] = []
@@ -0,0 +1,149 @@
+"""
+Diffusion en temps réel des modifications d'un tableau Kanban.
+
+Les endpoints d'écriture publient des deltas compacts (task.created,
+task.updated, task.moved, task.deleted, task.assigned) ; chaque abonné de
+/ws/projects/{project_id} les reçoit numérotés par projet :
+
+    {"seq": 42, "type": "task.moved", "task": {"id": 7, "status": "terminé", ...}}
+
+Un client qui se reconnecte passe `since=<dernier seq reçu>` pour recevoir
+ce qu'il a manqué ; si l'historique ne remonte pas assez loin il reçoit
+{"type": "resync"} et doit recharger le tableau.
+
+Les événements sont numérotés et diffusés par l'état partagé (shared.py) :
+chaque worker reçoit ceux de tous les autres, dans l'ordre, et tient son
+propre historique pour les abonnés qui lui sont connectés.
+
+Un membre retiré du projet (ou tous, le projet supprimé) est déconnecté par
+revoke(), dans tous les workers.
+"""
+import os
+import asyncio
+from collections import deque
+
+from fastapi.encoders import jsonable_encoder
+
+from shared import shared as default_shared
+
+EVENTS_HISTORY = int(os.getenv("EVENTS_HISTORY", "500"))  # événements conservés par projet
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "256"))  # retard toléré par abonné
+
+
+# Marqueurs de fin de flux dans la file d'un abonné
+OVERFLOWED = None
+REVOKED = "revoked"
+
+
+class Subscriber:
+
+    def __init__(self, user_id=None, queue_size=EVENTS_QUEUE_SIZE):
+        self.user_id = user_id
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def push(self, event):
+        """Empile sans jamais bloquer l'émetteur ; un abonné trop lent est déconnecté."""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.close(OVERFLOWED)
+
+    def close(self, marker):
+        """Vide la file et n'y laisse que `marker`, qui réveille le consommateur pour qu'il ferme."""
+        self.overflowed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(marker)
+
+
+class ProjectChannel:
+
+    def __init__(self, history=EVENTS_HISTORY):
+        self.seq = 0
+        self.history = deque(maxlen=history)
+        self.subscribers = set()
+
+
+class EventBus:
+
+    def __init__(self, shared=default_shared, history=EVENTS_HISTORY):
+        self.shared = shared
+        self.history_size = history
+        self.channels = {}
+        shared.subscribe("events", self._deliver)
+        shared.subscribe("events:revocations", self._revoked)
+
+    def _channel(self, project_id):
+        channel = self.channels.get(project_id)
+        if channel is None:
+            channel = self.channels[project_id] = ProjectChannel(self.history_size)
+        return channel
+
+    async def publish(self, project_id, type, **payload):
+        payload = jsonable_encoder(payload)
+        message = {"project_id": project_id, "type": type, **payload}
+        seq = await self.shared.publish("events", message, counter=f"events:seq:{project_id}")
+        return {"seq": seq, "type": type, **payload}
+
+    def _deliver(self, message, seq):
+        """Événement reçu (de ce worker ou d'un autre) : historique et abonnés du projet."""
+        project_id = message["project_id"]
+        event = {"seq": seq, **{key: value for key, value in message.items() if key != "project_id"}}
+        channel = self._channel(project_id)
+        channel.seq = seq
+        channel.history.append(event)
+        for subscriber in channel.subscribers:
+            subscriber.push(event)
+
+    async def revoke(self, project_id, user_id=None):
+        """Déconnecte les abonnés du projet qui sont `user_id` (tous sans `user_id`)."""
+        await self.shared.publish("events:revocations", {"project_id": project_id, "user_id": user_id})
+
+    def _revoked(self, message, seq):
+        channel = self.channels.get(message["project_id"])
+        if channel is None:
+            return
+        for subscriber in channel.subscribers:
+            if message["user_id"] is None or subscriber.user_id == message["user_id"]:
+                subscriber.close(REVOKED)
+
+    def subscribe(self, project_id, since=None, user_id=None):
+        """
+        Inscrit un abonné et lui rejoue les événements postérieurs à `since`.
+        Sans `since`, seuls les événements à venir sont transmis.
+        """
+        channel = self._channel(project_id)
+        subscriber = Subscriber(user_id)
+        if since is not None and since > channel.seq:
+            # Historique perdu (redémarrage du serveur)
+            subscriber.push({"seq": channel.seq, "type": "resync"})
+        elif since is not None and since < channel.seq:
+            oldest = channel.history[0]["seq"] if channel.history else channel.seq + 1
+            missed = [event for event in channel.history if event["seq"] > since]
+            if since + 1 < oldest or len(missed) >= subscriber.queue.maxsize:
+                subscriber.push({"seq": channel.seq, "type": "resync"})
+            else:
+                for event in missed:
+                    subscriber.push(event)
+        channel.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, project_id, subscriber):
+        channel = self.channels.get(project_id)
+        if channel is None:
+            return
+        channel.subscribers.discard(subscriber)
+        if not channel.subscribers and not channel.history:
+            del self.channels[project_id]
+
+    def stats(self):
+        return {
+            "projects": len(self.channels),
+            "subscribers": sum(len(c.subscribers) for c in self.channels.values()),
+        }
+
+
+events = EventBus()
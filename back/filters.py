@@ -0,0 +1,151 @@
+"""
+Filtres et tri des tâches, exécutés en SQL.
+
+    GET /projects/3/tasks?status=todo&priority=haute&assignee_id=7
+    GET /tasks?due_after=2025-01-01&due_before=2025-03-31&q=login&sort=-due_date
+"""
+from datetime import date, datetime
+from typing import List, Literal, Optional
+
+from fastapi import HTTPException, Query
+
+TASK_STATUSES = ("todo", "en cours", "terminé")
+TASK_PRIORITIES = ("basse", "moyenne", "haute", "critique")
+
+# Les ENUM se trient par rang métier, pas par ordre alphabétique
+ENUM_RANKS = {
+    "status": {value: rank for rank, value in enumerate(TASK_STATUSES)},
+    "priority": {value: rank for rank, value in enumerate(TASK_PRIORITIES)},
+}
+TASK_SORT_FIELDS = ("id", "title", "due_date", "created_at", "status", "priority")
+
+
+def sort_expression(field, alias=""):
+    """Expression SQL sur laquelle trier (et comparer le curseur) pour `field`."""
+    ranks = ENUM_RANKS.get(field)
+    if not ranks:
+        return f"{alias}{field}"
+    cases = " ".join(f"WHEN '{value}' THEN {rank}" for value, rank in ranks.items())
+    return f"CASE {alias}{field} {cases} END"
+
+
+class TaskFilters:
+    """Dépendance FastAPI regroupant les filtres et le tri des tâches."""
+
+    def __init__(
+        self,
+        status: Optional[List[Literal["todo", "en cours", "terminé"]]] = Query(None),
+        priority: Optional[List[Literal["basse", "moyenne", "haute", "critique"]]] = Query(None),
+        due_after: Optional[date] = Query(None, description="Échéance à partir de cette date (incluse)"),
+        due_before: Optional[date] = Query(None, description="Échéance jusqu'à cette date (incluse)"),
+        assignee_id: Optional[int] = Query(None, description="Tâches assignées à cet utilisateur"),
+        q: Optional[str] = Query(None, min_length=1, max_length=100, description="Recherche dans le titre"),
+        sort: Optional[str] = Query(
+            None, description="Champ de tri, préfixé par '-' pour l'ordre décroissant "
+                              "(par défaut : id, ou ordre des cartes pour le tableau d'un projet)"
+        ),
+        after_value: Optional[str] = Query(None, description="Curseur : valeur du champ de tri de la dernière ligne"),
+    ):
+        self.status = status
+        self.priority = priority
+        self.due_after = due_after
+        self.due_before = due_before
+        self.assignee_id = assignee_id
+        self.q = q
+        self.default_order = sort is None
+        sort = sort or "id"
+        self.descending = sort.startswith("-")
+        self.sort = sort.lstrip("-")
+        if self.sort not in TASK_SORT_FIELDS:
+            raise HTTPException(status_code=400, detail=f"Tri impossible sur : {self.sort}")
+        self.after_value = None if after_value is None else self.parse_cursor_value(after_value)
+
+    def parse_cursor_value(self, value):
+        """
+        Valeur du curseur validée selon le champ de tri : rang pour un ENUM,
+        date ou date-heure ISO 8601 (transmise telle quelle à la base).
+        """
+        try:
+            if self.sort in ENUM_RANKS:
+                rank = int(value)
+                if not 0 <= rank < len(ENUM_RANKS[self.sort]):
+                    raise ValueError(value)
+                return rank
+            if self.sort == "due_date":
+                date.fromisoformat(value)
+            elif self.sort == "created_at":
+                datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Curseur invalide pour le tri sur {self.sort} : {value}")
+        return value
+
+    def where(self, alias="", assignments=("AssignedTasks",)):
+        """
+        Conditions SQL et paramètres correspondant aux filtres renseignés ;
+        `assignments` : tables des assignations à consulter (archive comprise ou non).
+        """
+        conditions, params = [], []
+        if self.status:
+            conditions.append(f"{alias}status IN ({', '.join(['%s'] * len(self.status))})")
+            params += self.status
+        if self.priority:
+            conditions.append(f"{alias}priority IN ({', '.join(['%s'] * len(self.priority))})")
+            params += self.priority
+        if self.due_after:
+            conditions.append(f"{alias}due_date >= %s")
+            params.append(self.due_after)
+        if self.due_before:
+            conditions.append(f"{alias}due_date <= %s")
+            params.append(self.due_before)
+        if self.assignee_id is not None:
+            exists = [
+                f"EXISTS (SELECT 1 FROM {table} a WHERE a.user_id = %s AND a.task_id = {alias}id)"
+                for table in assignments
+            ]
+            conditions.append(f"({' OR '.join(exists)})")
+            params += [self.assignee_id] * len(assignments)
+        if self.q:
+            # '!' comme caractère d'échappement : même syntaxe en MySQL et en SQLite
+            escaped = self.q.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+            conditions.append(f"{alias}title LIKE %s ESCAPE '!'")
+            params.append(f"%{escaped}%")
+        return conditions, params
+
+    def keyset(self, after_id, alias=""):
+        """
+        Condition de curseur (avec ses paramètres) et clause ORDER BY pour le tri
+        demandé, l'id servant de départage. Les NULL viennent en tête en ordre
+        croissant et en queue en ordre décroissant, comme en MySQL et SQLite.
+        """
+        expr = sort_expression(self.sort, alias)
+        key = f"{alias}id"
+        direction = "DESC" if self.descending else "ASC"
+        order = f"{key} {direction}" if self.sort == "id" else f"{expr} {direction}, {key} {direction}"
+        if after_id is None:
+            return None, [], order
+        if self.sort == "id":
+            return f"{key} {'<' if self.descending else '>'} %s", [after_id], order
+        if self.after_value is None:
+            if self.descending:
+                return f"({expr} IS NULL AND {key} < %s)", [after_id], order
+            return f"(({expr} IS NULL AND {key} > %s) OR {expr} IS NOT NULL)", [after_id], order
+        value = self.after_value
+        if self.descending:
+            condition = f"({expr} < %s OR ({expr} = %s AND {key} < %s) OR {expr} IS NULL)"
+        else:
+            condition = f"({expr} > %s OR ({expr} = %s AND {key} > %s))"
+        return condition, [value, value, after_id], order
+
+    def cursor(self, row):
+        """Curseur de la page suivante à partir de la dernière ligne servie."""
+        if self.sort == "id":
+            return {"after_id": row["id"]}
+        return {"after_id": row["id"], "after_value": self.cursor_value(row)}
+
+    def cursor_value(self, row):
+        """Valeur du champ de tri à placer dans le curseur de la page suivante."""
+        value = row.get(self.sort)
+        ranks = ENUM_RANKS.get(self.sort)
+        if ranks and value is not None:
+            return ranks[value]
+        return value
@@ -0,0 +1,203 @@
+"""
+Import en masse d'un client : projets, membres, tâches et assignations.
+
+L'archive est du NDJSON (un projet par ligne) ou du JSON (liste de projets, ou
+{"projects": [...]}) ; les membres et assignés sont désignés par e-mail :
+
+    {"name": "Site web", "members": [{"email": "bob@x.fr", "role": "editor"}],
+     "tasks": [{"title": "Maquettes", "status": "en cours", "assignees": ["bob@x.fr"]}]}
+
+Tout est validé avant la première écriture, puis les projets sont écrits par
+lots de IMPORT_CHUNK_SIZE, chacun dans sa transaction. Un import interrompu
+reprend au premier lot non écrit en renvoyant la même archive :
+
+    POST /imports                 (corps : l'archive)  -> 202, job
+    GET  /imports/{id}            -> progression
+    POST /imports/{id}/resume     (même archive)       -> 202, job
+
+ou en ligne de commande, directement sur la base :
+
+    python back/importer.py clients.ndjson --owner admin@exemple.fr [--resume 12]
+"""
+import os
+import json
+import asyncio
+import hashlib
+import logging
+import argparse
+from typing import List
+
+from pydantic import TypeAdapter, ValidationError
+from fastapi.concurrency import run_in_threadpool
+
+from database import BATCH_SIZE
+from db_matching import ProjectImport
+from cache import cache
+from search import search
+from shared import shared
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "100"))  # projets par transaction
+MAX_IMPORT_BYTES = int(os.getenv("MAX_IMPORT_BYTES", str(50 * 1024 * 1024)))
+MAX_IMPORT_ERRORS = 50
+# Bail du worker qui écrit un job, renouvelé à chaque lot
+IMPORT_LEASE_SECONDS = float(os.getenv("IMPORT_LEASE_SECONDS", "300"))
+
+_projects_adapter = TypeAdapter(List[ProjectImport])
+
+
+class ArchiveError(Exception):
+    """Archive illisible ou invalide ; `errors` détaille les problèmes (au plus MAX_IMPORT_ERRORS)."""
+
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} erreur(s) dans l'archive")
+        self.errors = errors[:MAX_IMPORT_ERRORS]
+
+
+def checksum(data: bytes):
+    return hashlib.sha256(data).hexdigest()
+
+
+def parse_archive(data: bytes):
+    """Objets bruts de l'archive, JSON ou NDJSON."""
+    text = data.decode("utf-8-sig")
+    try:
+        document = json.loads(text)
+    except json.JSONDecodeError:
+        document = None
+    if isinstance(document, list):
+        return document
+    if isinstance(document, dict):
+        return document["projects"] if "projects" in document else [document]
+    items, errors = [], []
+    for number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            items.append(json.loads(line))
+        except json.JSONDecodeError as e:
+            errors.append(f"ligne {number} : JSON invalide ({e.msg})")
+    if errors:
+        raise ArchiveError(errors)
+    return items
+
+
+def validate_projects(items):
+    """Valide l'archive par lots de BATCH_SIZE projets avec les modèles de db_matching."""
+    projects, errors = [], []
+    for start in range(0, len(items), BATCH_SIZE):
+        try:
+            projects += _projects_adapter.validate_python(items[start:start + BATCH_SIZE])
+        except ValidationError as e:
+            for error in e.errors():
+                index, *path = error["loc"]
+                errors.append(f"projet {start + index + 1} {'.'.join(map(str, path))} : {error['msg']}")
+    if errors:
+        raise ArchiveError(errors)
+    for project in projects:
+        # Doublons tolérés dans l'archive, mais une seule ligne par (projet, utilisateur) en base
+        project.members = list({member.email: member for member in project.members}.values())
+        for task in project.tasks:
+            task.assignees = list(dict.fromkeys(task.assignees))
+    return projects
+
+
+def read_archive(data: bytes):
+    """Projets validés de l'archive et e-mails qu'ils citent (calcul seul, sans la base)."""
+    if len(data) > MAX_IMPORT_BYTES:
+        raise ArchiveError([f"Archive trop volumineuse (au plus {MAX_IMPORT_BYTES} octets)"])
+    projects = validate_projects(parse_archive(data))
+    emails = {member.email for project in projects for member in project.members}
+    emails |= {email for project in projects for task in project.tasks for email in task.assignees}
+    return projects, emails
+
+
+async def prepare_import(data: bytes, users_repo):
+    """
+    Lit et valide l'archive, puis résout tous les e-mails en une lecture.
+    Retourne (projets, {email: user_id}) ; lève ArchiveError sans rien écrire.
+    La lecture (jusqu'à MAX_IMPORT_BYTES de JSON) se fait dans un thread :
+    la boucle d'événements continue de servir les autres requêtes.
+    """
+    projects, emails = await run_in_threadpool(read_archive, data)
+    user_ids = await users_repo.ids_by_email(emails)
+    unknown = sorted(emails - user_ids.keys())
+    if unknown:
+        raise ArchiveError([f"Utilisateur inconnu : {email}" for email in unknown])
+    return projects, user_ids
+
+
+async def running(job_id):
+    """Vrai si un worker écrit le job ; un job "en cours" sans bail a été interrompu."""
+    return await shared.get(f"lease:import:{job_id}") is not None
+
+
+async def run_import(imports_repo, job_id, projects, owner_id, user_ids, start=0,
+                     chunk_size=IMPORT_CHUNK_SIZE, progress=None):
+    """Écrit les projets à partir de l'indice `start` ; l'échec d'un lot arrête le job."""
+    lease = f"lease:import:{job_id}"
+    if not await shared.lease(lease, IMPORT_LEASE_SECONDS):
+        logger.warning("Import %s déjà en cours dans un autre worker", job_id)
+        return
+    try:
+        await imports_repo.set_status(job_id, "en cours")
+        for offset in range(start, len(projects), chunk_size):
+            chunk = projects[offset:offset + chunk_size]
+            project_ids = await imports_repo.import_chunk(job_id, chunk, owner_id, user_ids)
+            await search.projects_changed(project_ids, with_tasks=True)
+            members = {user_ids[member.email] for project in chunk for member in project.members}
+            await cache.invalidate(*(f"user:{user_id}" for user_id in {owner_id, *members}))
+            await shared.lease(lease, IMPORT_LEASE_SECONDS)
+            if progress:
+                progress(offset + len(chunk), len(projects))
+        await imports_repo.set_status(job_id, "terminé")
+    except Exception as e:
+        logger.exception("Import %s interrompu", job_id)
+        await imports_repo.set_status(job_id, "échec", str(e))
+        raise
+    finally:
+        await shared.delete(lease)
+
+
+async def main(argv=None):
+    from database import db
+    from repository import UserRepository, ImportRepository
+
+    parser = argparse.ArgumentParser(description="Import en masse de projets, tâches et membres")
+    parser.add_argument("archive", help="Fichier NDJSON ou JSON")
+    parser.add_argument("--owner", required=True, help="E-mail du propriétaire des projets importés")
+    parser.add_argument("--resume", type=int, metavar="JOB_ID", help="Reprendre un import interrompu")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    with open(args.archive, "rb") as f:
+        data = f.read()
+    await db.open()
+    try:
+        users_repo, imports_repo = UserRepository(db), ImportRepository(db)
+        owner = await users_repo.get_by_email(args.owner)
+        if owner is None:
+            raise SystemExit(f"Utilisateur inconnu : {args.owner}")
+        try:
+            projects, user_ids = await prepare_import(data, users_repo)
+        except ArchiveError as e:
+            raise SystemExit("\n".join(e.errors))
+
+        start = 0
+        if args.resume is not None:
+            job = await imports_repo.get(args.resume)
+            if job is None or job["checksum"] != checksum(data):
+                raise SystemExit(f"Import {args.resume} introuvable ou archive différente")
+            job_id, start = job["id"], job["done"]
+        else:
+            job_id = await imports_repo.create(owner["id"], checksum(data), len(projects))
+        print(f"Import {job_id} : {len(projects)} projets, reprise à {start}")
+        await run_import(imports_repo, job_id, projects, owner["id"], user_ids, start, args.chunk_size,
+                         progress=lambda done, total: print(f"  {done}/{total} projets"))
+    finally:
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
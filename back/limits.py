@@ -0,0 +1,232 @@
+"""
+Limitation de débit et contrôle d'admission.
+
+Seaux à jetons par clé : chaque requête prend un jeton, le seau se remplit
+au rythme du budget jusqu'à sa capacité ; vide, la requête reçoit un 429 avec
+Retry-After (délai avant le prochain jeton). Budgets, "nombre/secondes"
+(RATE_LIMIT_<NOM>, "off" pour en désactiver un, RATE_LIMITS=off pour tous) :
+
+    ip        toute requête HTTP, par adresse                        1200/60
+    user      requête authentifiée, par utilisateur                   600/60
+    list      listes (tableau, tâches, projets, recherche, exports),
+              par utilisateur ou par adresse hors authentification    120/60
+    login     /login et inscription (bcrypt), par adresse              10/60
+    account   échecs de /login, par compte visé et par adresse          5/300
+
+Contrôle d'admission : au plus ADMISSION_MAX_CONCURRENCY requêtes HTTP en
+cours ; au-delà, ADMISSION_QUEUE_SIZE requêtes attendent une place au plus
+ADMISSION_QUEUE_TIMEOUT secondes et les autres reçoivent un 503 : la charge
+est refusée avant que le pool de connexions ne sature (DB_POOL_TIMEOUT).
+
+L'état est celui du worker : une vérification est en O(1), chaque budget
+garde au plus RATE_LIMIT_MAX_KEYS clés et oublie les moins récemment vues
+(une clé oubliée repart d'un seau plein). Avec N workers, un client peut
+obtenir jusqu'à N fois son budget.
+"""
+import os
+import math
+import time
+import asyncio
+from collections import OrderedDict
+
+from fastapi.responses import JSONResponse
+
+from database import DB_POOL_MAX_SIZE
+
+RATE_LIMITS_ENABLED = os.getenv("RATE_LIMITS", "on") != "off"
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+DEFAULT_BUDGETS = {
+    "ip": "1200/60",
+    "user": "600/60",
+    "list": "120/60",
+    "login": "10/60",
+    "account": "5/300",
+}
+
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", str(4 * DB_POOL_MAX_SIZE)))
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", str(8 * DB_POOL_MAX_SIZE)))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "1"))
+# Supervision : jamais refusées
+ADMISSION_EXEMPT = {"/", "/metrics"}
+
+
+class RateLimited(Exception):
+    """Budget épuisé : réessayer dans `retry_after` secondes."""
+
+    def __init__(self, retry_after):
+        self.retry_after = retry_after
+
+
+def retry_after_header(seconds):
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
+
+
+def parse_budget(spec):
+    """"nombre/secondes" -> (capacité, jetons par seconde) ; None pour "off"."""
+    if spec == "off":
+        return None
+    count, _, period = spec.partition("/")
+    return int(count), int(count) / float(period or 1)
+
+
+class TokenBuckets:
+    """Seaux à jetons d'un budget, un par clé, dans une LRU bornée."""
+
+    def __init__(self, capacity, rate, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.capacity = capacity
+        self.rate = rate
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # clé -> (jetons, date de mise à jour)
+        self.rejected = 0
+
+    def take(self, key, cost=1):
+        """0 si les jetons sont pris, sinon secondes à attendre pour qu'ils le soient."""
+        now = time.monotonic()
+        entry = self._buckets.get(key)
+        if entry is None:
+            tokens = self.capacity
+        else:
+            tokens = min(self.capacity, entry[0] + (now - entry[1]) * self.rate)
+            self._buckets.move_to_end(key)
+        wait = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            wait = (cost - tokens) / self.rate
+            self.rejected += 1
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def peek(self, key, cost=1):
+        """Comme take, sans prendre de jeton ni compter de refus."""
+        entry = self._buckets.get(key)
+        if entry is None:
+            return 0.0
+        tokens = min(self.capacity, entry[0] + (time.monotonic() - entry[1]) * self.rate)
+        return 0.0 if tokens >= cost else (cost - tokens) / self.rate
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class RateLimits:
+
+    def __init__(self, budgets=None, enabled=RATE_LIMITS_ENABLED):
+        self.buckets = {}
+        if not enabled:
+            return
+        for name, default in DEFAULT_BUDGETS.items():
+            spec = (budgets or {}).get(name) or os.getenv(f"RATE_LIMIT_{name.upper()}", default)
+            budget = parse_budget(spec)
+            if budget is not None:
+                self.buckets[name] = TokenBuckets(*budget)
+
+    def wait(self, budget, key):
+        """Secondes à attendre avant que `key` puisse dépenser un jeton de `budget` (0 : jeton pris)."""
+        buckets = self.buckets.get(budget)
+        return buckets.take(key) if buckets is not None else 0.0
+
+    def check(self, budget, key):
+        """Prend un jeton ; lève RateLimited si le budget de `key` est épuisé."""
+        wait = self.wait(budget, key)
+        if wait:
+            raise RateLimited(wait)
+
+    def check_remaining(self, budget, key):
+        """Lève RateLimited si le budget de `key` est épuisé, sans prendre de jeton."""
+        buckets = self.buckets.get(budget)
+        wait = buckets.peek(key) if buckets is not None else 0.0
+        if wait:
+            buckets.rejected += 1
+            raise RateLimited(wait)
+
+    def rejected(self):
+        return sum(buckets.rejected for buckets in self.buckets.values())
+
+    def stats(self):
+        return {
+            name: {"capacity": b.capacity, "per_second": round(b.rate, 3), "keys": len(b), "rejected": b.rejected}
+            for name, b in self.buckets.items()
+        }
+
+
+class AdmissionControl:
+    """Nombre borné de requêtes en cours, file d'attente bornée en nombre et en durée."""
+
+    def __init__(self, limit=ADMISSION_MAX_CONCURRENCY, queue_size=ADMISSION_QUEUE_SIZE,
+                 timeout=ADMISSION_QUEUE_TIMEOUT):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(limit)
+        self.in_flight = 0
+        self.waiting = 0
+        self.shed = 0
+
+    async def acquire(self):
+        """Vrai si la requête obtient une place ; faux si elle doit être refusée."""
+        if self._slots.locked():
+            if self.waiting >= self.queue_size:
+                self.shed += 1
+                return False
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                self.shed += 1
+                return False
+            finally:
+                self.waiting -= 1
+        else:
+            await self._slots.acquire()
+        self.in_flight += 1
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+        self._slots.release()
+
+    def stats(self):
+        return {"in_flight": self.in_flight, "limit": self.limit, "waiting": self.waiting,
+                "queue_size": self.queue_size, "shed": self.shed}
+
+
+def client_ip(scope):
+    """Adresse du client (celle du proxy de confiance si uvicorn --proxy-headers la réécrit)."""
+    client = scope.get("client")
+    return client[0] if client else "inconnue"
+
+
+class AdmissionMiddleware:
+    """
+    Middleware ASGI : budget "ip" puis contrôle d'admission de chaque requête
+    HTTP, avant tout traitement (authentification, lecture du corps, base).
+    """
+
+    def __init__(self, app, limits, admission):
+        self.app = app
+        self.limits = limits
+        self.admission = admission
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in ADMISSION_EXEMPT:
+            return await self.app(scope, receive, send)
+        wait = self.limits.wait("ip", client_ip(scope))
+        if wait:
+            response = JSONResponse(status_code=429, content={"detail": "Trop de requêtes, réessayez plus tard"},
+                                    headers=retry_after_header(wait))
+            return await response(scope, receive, send)
+        if not await self.admission.acquire():
+            response = JSONResponse(status_code=503, content={"detail": "Serveur saturé, réessayez plus tard"},
+                                    headers=retry_after_header(1))
+            return await response(scope, receive, send)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.admission.release()
+
+
+limits = RateLimits()
+admission = AdmissionControl()
@@ -1,71 +1,168 @@
 import sys
 from pathlib import Path
-from datetime import datetime, timezone
-from fastapi import FastAPI, HTTPException, Query, Body, Depends
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timezone
+import asyncio
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Query, Body, Depends, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.security import OAuth2PasswordBearer
-import mysql.connector
-from mysql.connector import Error
 
 sys.path.append(str(Path(__file__).parent))
 from db_matching import *
-from Auth import verify_password, get_password_hash, create_access_token, decode_token, JWTError
-
-app = FastAPI()
+from Auth import hasher, HasherBusy, tokens, create_access_token, decode_token
+from database import db, DatabaseError, PoolTimeout
+from pagination import OptionalPageParams, PageParams, paginate
+from filters import TaskFilters
+from cache import cache, query_key, if_none_match
+from events import OVERFLOWED, REVOKED, events
+from responses import FastJSONResponse, trusted
+from metrics import MetricsMiddleware, render as render_metrics
+from export import PROJECT_COLUMNS, TASK_COLUMNS, ExportParams, stream_export
+from importer import ArchiveError, checksum, prepare_import, run_import, running
+from ranking import RankError, needs_rebalance, rebalancer
+from archiving import archiver, completed_before
+from search import search
+from shared import shared
+from limits import AdmissionMiddleware, RateLimited, admission, client_ip, limits, retry_after_header
+from repository import (
+    ArchiveRepository,
+    UserRepository,
+    ProjectRepository,
+    ProjectUserRepository,
+    SearchRepository,
+    TaskRepository,
+    AssignmentRepository,
+    ImportRepository,
+    StatsRepository,
+    VersionConflict,
+)
 
+MAX_BULK_ITEMS = 10_000
+
+users_repo = UserRepository(db)
+projects_repo = ProjectRepository(db)
+project_users_repo = ProjectUserRepository(db)
+tasks_repo = TaskRepository(db)
+assignments_repo = AssignmentRepository(db)
+imports_repo = ImportRepository(db)
+stats_repo = StatsRepository(db)
+archive_repo = ArchiveRepository(db)
+search_repo = SearchRepository(db)
+
+# Déconnexions faites dans les autres workers
+shared.subscribe("revocations", lambda message, seq: tokens.revoke(message))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await shared.open()
+    await db.open()
+    await search.open(search_repo, projects_repo)
+    rebalancer.start(rebalance_column)
+    archiver.start(archive_repo)
+    yield
+    await archiver.close()
+    await rebalancer.close()
+    await db.close()
+    await shared.close()
+    hasher.close()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+
+# Au plus près des routes : les refus (429, 503) passent par CORS et sont mesurés
+app.add_middleware(AdmissionMiddleware, limits=limits, admission=admission)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Link", "X-Next-Cursor", "ETag", "Server-Timing", "Retry-After"],
 )
+app.add_middleware(MetricsMiddleware)
 
-'''
-def get_db_connection():
-    try:
-        connection = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password=X,
-            database="Task_Manager"
-        )
-        return connection
-    except Error as e:
-        print(f"Erreur de connexion à MySQL : {e}")
-        return None
-'''
+# Base locale hors Docker : lancer avec DB_HOST=localhost DB_USER=root DB_PASSWORD=...
+# Sans MySQL : DB_BACKEND=sqlite (schéma init_sqlite.sql créé au démarrage)
 
 
-def get_db_connection():
-    try:
-        connection = mysql.connector.connect(
-            host="db",
-            user="taskuser",
-            password="taskpassword",
-            database="Task_Manager"
-        )
-        return connection
-    except Error as e:
-        print(f"Erreur de connexion à MySQL : {e}")
-        return None
+@app.exception_handler(DatabaseError)
+async def database_error_handler(request: Request, exc: DatabaseError):
+    return JSONResponse(status_code=500, content={"detail": f"Erreur SQL : {exc}"})
+
+
+@app.exception_handler(PoolTimeout)
+async def pool_timeout_handler(request: Request, exc: PoolTimeout):
+    return JSONResponse(status_code=503, content={"detail": "Base de données saturée, réessayez plus tard"})
+
+
+@app.exception_handler(VersionConflict)
+async def version_conflict_handler(request: Request, exc: VersionConflict):
+    return JSONResponse(
+        status_code=409,
+        content={"detail": "Modifié entre-temps par un autre utilisateur", "version": exc.current},
+        headers={"ETag": f'"{exc.current}"'},
+    )
+
+
+@app.exception_handler(HasherBusy)
+async def hasher_busy_handler(request: Request, exc: HasherBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Trop de connexions simultanées, réessayez plus tard"},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(RateLimited)
+async def rate_limited_handler(request: Request, exc: RateLimited):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Trop de requêtes, réessayez plus tard"},
+        headers=retry_after_header(exc.retry_after),
+    )
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
+def get_current_claims(token: str = Depends(oauth2_scheme)):
     """
-    Vérifie le JWT et retourne l'utilisateur courant
+    Vérifie le JWT (cache de tokens déjà validés) et retourne ses claims
     """
-    try:
-        payload = decode_token(token)
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Token invalide")
-        return {"id": int(user_id)}
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Token invalide ou expiré")
+    payload = decode_token(token)
+    if payload is None:
+        raise HTTPException(status_code=401, detail="Token invalide ou expiré",
+                            headers={"WWW-Authenticate": "Bearer"})
+    if payload.get("sub") is None:
+        raise HTTPException(status_code=401, detail="Token invalide", headers={"WWW-Authenticate": "Bearer"})
+    return payload
+
+
+def get_current_user(payload: dict = Depends(get_current_claims)):
+    """
+    Retourne l'utilisateur courant, dans la limite de son budget de requêtes
+    """
+    user_id = int(payload["sub"])
+    limits.check("user", user_id)
+    return {"id": user_id}
+
+
+def list_budget(current_user: dict = Depends(get_current_user)):
+    """Budget des listes (lectures coûteuses) de l'utilisateur courant."""
+    limits.check("list", current_user["id"])
+
+
+def public_list_budget(request: Request):
+    """Budget des listes sans authentification, par adresse."""
+    limits.check("list", client_ip(request.scope))
+
+
+def login_budget(request: Request):
+    """Budget des calculs bcrypt (connexion, inscription), par adresse."""
+    limits.check("login", client_ip(request.scope))
 
 
 @app.get("/")
@@ -78,541 +175,739 @@ async def say_hello(name: str):
     return {"message": f"Hello {name}"}
 
 
-@app.get("/users", response_model=List[User])
-async def get_users():
-    connection = get_db_connection()
-    if not connection:
-        raise HTTPException(status_code=500, detail="Erreur de connexion à la base de données")
+@app.get("/db/pool")
+async def get_pool_stats():
+    return db.pool.stats()
 
-    try:
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM Users")
-        users = cursor.fetchall()
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Erreur SQL : {e}")
-    finally:
-        cursor.close()
-        connection.close()
 
-    return users
+@app.get("/auth/hasher")
+async def get_hasher_stats():
+    return hasher.stats()
 
 
-@app.post("/users", response_model=User, status_code=201)
-async def create_user(user: UserCreate):
-    connection = get_db_connection()
-    if not connection:
-        raise HTTPException(status_code=500, detail="Erreur de connexion à la base de données")
+@app.get("/auth/tokens")
+async def get_token_stats():
+    return tokens.stats()
 
-    try:
-        cursor = connection.cursor()
-        query = """
-        INSERT INTO Users (name, email, password, role)
-        VALUES (%s, %s, %s, %s)
-        """
-        values = (
-            user.name,
-            user.email,
-            get_password_hash(user.password),
-            user.role
-        )
-        cursor.execute(query, values)
-        connection.commit()
-        user_id = cursor.lastrowid
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Erreur SQL : {e}")
-    finally:
-        cursor.close()
-        connection.close()
 
-    return {**user.model_dump(), "id": user_id}
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Mesures au format d'exposition Prometheus."""
+    pool, hashing = db.pool.stats(), hasher.stats()
+    return PlainTextResponse(render_metrics([
+        ("db_pool_size", "Connexions ouvertes", pool["size"]),
+        ("db_pool_in_use", "Connexions empruntées", pool["in_use"]),
+        ("db_pool_waits_total", "Attentes d'une connexion libre", pool["waits"]),
+        ("db_pool_timeouts_total", "Connexions refusées faute de place", pool["timeouts"]),
+        ("cache_hits_total", "Lectures servies par le cache", cache.hits),
+        ("cache_misses_total", "Lectures absentes du cache", cache.misses),
+        ("password_hashing_in_flight", "Calculs bcrypt en cours", hashing["in_flight"]),
+        ("password_hashing_rejected_total", "Calculs bcrypt refusés (503)", hashing["rejected"]),
+        ("events_subscribers", "Abonnés WebSocket", events.stats()["subscribers"]),
+        ("admission_in_flight", "Requêtes HTTP en cours", admission.in_flight),
+        ("admission_waiting", "Requêtes en attente d'admission", admission.waiting),
+        ("admission_shed_total", "Requêtes refusées faute de place (503)", admission.shed),
+        ("rate_limited_total", "Requêtes refusées hors budget (429)", limits.rejected()),
+    ]), media_type="text/plain; version=0.0.4")
 
 
-@app.post("/login", response_model=LoginResponse)
-async def login_user(credentials: LoginRequest):
-    connection = get_db_connection()
-    if not connection:
-        raise HTTPException(status_code=500, detail="Erreur de connexion à la base de données")
+@app.get("/cache/stats")
+async def get_cache_stats():
+    return cache.stats()
 
-    try:
-        cursor = connection.cursor(dictionary=True)
-        query = "SELECT * FROM Users WHERE email = %s"
-        cursor.execute(query, (credentials.email,))
-        user = cursor.fetchone()
-
-        if not user:
-            raise HTTPException(status_code=401, detail="Utilisateur non trouvé")
-
-        if not verify_password(credentials.password, user["password"]):
-            raise HTTPException(status_code=401, detail="Mot de passe incorrect")
-
-        # JWT
-        token = create_access_token({"sub": str(user["id"])})
-
-        return {
-            "id": user["id"],
-            "name": user["name"],
-            "email": user["email"],
-            "role": user["role"],
-            "token": token,
-        }
-
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Erreur SQL : {e}")
-    finally:
-        cursor.close()
-        connection.close()
 
+@app.get("/search/stats")
+async def get_search_stats():
+    return search.stats()
 
-@app.get("/projects", response_model=List[Project])
-async def get_projects():
-    connection = get_db_connection()
-    if not connection:
-        raise HTTPException(status_code=500, detail="Erreur de connexion à la base de données")
 
-    try:
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM Projects")
-        projects = cursor.fetchall()
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Erreur SQL : {e}")
-    finally:
-        cursor.close()
-        connection.close()
+@app.get("/shared/stats")
+async def get_shared_stats():
+    return shared.stats()
 
-    return projects
 
+@app.get("/limits/stats")
+async def get_limits_stats():
+    return {"budgets": limits.stats(), "admission": admission.stats()}
 
-@app.get("/projects/{id}", response_model=List[Project])
-async def get_projects_by_id(id: int):
-    connection = get_db_connection()
-    if not connection:
-        raise HTTPException(status_code=500, detail="Erreur de connexion à la base de données")
 
-    try:
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM Projects WHERE id = %s", (id,))
-        projects = cursor.fetchall()
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Erreur SQL : {e}")
-    finally:
-        cursor.close()
-        connection.close()
+async def check_etag(request: Request, response: Response, scope: str):
+    """
+    Pose l'ETag du périmètre sur la réponse. Retourne une réponse 304 à
+    renvoyer telle quelle si le client a déjà cette version, sinon None.
+    """
+    etag = await cache.etag(scope, query_key(request))
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
 
-    return projects
 
+def expected_version(request: Request, version: Optional[int]):
+    """
+    Version attendue par le client pour une modification : en-tête If-Match
+    ("3" ou W/"3", l'ETag renvoyé par les modifications) ou, à défaut, champ
+    `version` du corps. None (ou If-Match: *) : modification sans condition.
+    """
+    header = request.headers.get("if-match", "").strip()
+    if not header:
+        return version
+    if header == "*":
+        return None
+    tag = header.removeprefix("W/").strip('"')
+    if not tag.isdigit():
+        raise HTTPException(status_code=400, detail="If-Match invalide : version attendue")
+    return int(tag)
 
-@app.post("/projects", response_model=Project, status_code=201)
-async def create_project(project: ProjectCreate, current_user: dict = Depends(get_current_user)):
-    user_id = current_user["id"]
-    connection = get_db_connection()
-    if not connection:
-        raise HTTPException(status_code=500, detail="Erreur de connexion à la base de données")
-    try:
-        cursor = connection.cursor()
-        query = """
-        INSERT INTO Projects (name, description, start_date, end_date, status, owner_id)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        """
-        values = (
-            project.name,
-            project.description,
-            project.start_date,
-            project.end_date,
-            project.status,
-            user_id
-        )
-        cursor.execute(query, values)
-        connection.commit()
-        project_id = cursor.lastrowid
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Erreur SQL : {e}")
-    finally:
-        cursor.close()
-        connection.close()
-    return {**project.model_dump(), "id": project_id, "created_at": datetime.now(timezone.utc).isoformat()}
 
+def version_etag(response: Response, row):
+    response.headers["ETag"] = f'"{row["version"]}"'
 
-@app.put("/projects/{id}", response_model=Project)
-async def update_project(id: int, project: ProjectUpdate = Body(...)):
-    connection = get_db_connection()
-    if not connection:
-        raise HTTPException(status_code=500, detail="Erreur de connexion à la base de données")
-    try:
-        cursor = connection.cursor(dictionary=True)
-
-        cursor.execute("SELECT * FROM Projects WHERE id = %s", (id,))
-        existing_project = cursor.fetchone()
-        if not existing_project:
-            raise HTTPException(status_code=404, detail="Projet non trouvé")
-
-        update_fields = []
-        values = []
-
-        if project.name is not None:
-            update_fields.append("name = %s")
-            values.append(project.name)
-        if project.description is not None:
-            update_fields.append("description = %s")
-            values.append(project.description)
-        if project.start_date is not None:
-            update_fields.append("start_date = %s")
-            values.append(project.start_date)
-        if project.end_date is not None:
-            update_fields.append("end_date = %s")
-            values.append(project.end_date)
-        if project.status is not None:
-            update_fields.append("status = %s")
-            values.append(project.status)
-
-        if not update_fields:
-            raise HTTPException(status_code=400, detail="Aucun champ à mettre à jour")
-
-        query = f"UPDATE Projects SET {', '.join(update_fields)} WHERE id = %s"
-        values.append(id)
-
-        cursor.execute(query, tuple(values))
-        connection.commit()
-
-        cursor.execute("SELECT * FROM Projects WHERE id = %s", (id,))
-        updated_project = cursor.fetchone()
-
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Erreur SQL : {e}")
-    finally:
-        cursor.close()
-        connection.close()
 
-    return updated_project
+async def rebalance_column(project_id, status):
+    await tasks_repo.rebalance(project_id, status)
+    await cache.invalidate(f"project:{project_id}")
 
 
-@app.delete("/projects/{id}", status_code=204)
-async def delete_project(id: int):
-    connection = get_db_connection()
-    if not connection:
-        raise HTTPException(status_code=500, detail="Erreur connexion DB")
+async def invalidate_project(project_id):
+    """Invalide le cache d'un projet et les listes /my-projects de ses membres."""
+    members = await project_users_repo.member_ids(project_id)
+    await cache.invalidate(f"project:{project_id}", *(f"user:{user_id}" for user_id in members))
 
-    try:
-        cursor = connection.cursor()
-        cursor.execute("DELETE FROM Projects WHERE id = %s", (id,))
-        connection.commit()
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Erreur SQL : {e}")
-    finally:
-        cursor.close()
-        connection.close()
 
-    return {"message": f"Projet : {id} supprimé"}
+async def project_access(project_id, user_id, include_archived=False):
+    """Accès d'un utilisateur à un projet (voir ProjectRepository.access), mis en cache par utilisateur."""
+    key = f"access:{project_id}:archived" if include_archived else f"access:{project_id}"
+    return await cache.get_or_load(
+        f"user:{user_id}", key, lambda: projects_repo.access(project_id, user_id, include_archived)
+    )
 
 
-@app.post("/project-users", response_model=ProjectUser, status_code=201)
-async def add_user_to_project(project_user: ProjectUserCreate):
-    connection = get_db_connection()
-    if not connection:
-        raise HTTPException(status_code=500, detail="Erreur connexion DB")
+# Rôles qui peuvent modifier un projet et ses tâches ; "viewer" ne fait que lire
+WRITE_ACCESS = ("owner", "editor")
 
-    try:
-        cursor = connection.cursor()
-        query = """
-        INSERT INTO ProjectUsers (project_id, user_id, role)
-        VALUES (%s, %s, %s)
-        """
-        values = (project_user.project_id, project_user.user_id, project_user.role)
-        cursor.execute(query, values)
-        connection.commit()
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Erreur SQL : {e}")
-    finally:
-        cursor.close()
-        connection.close()
 
-    return project_user
+async def require_project_access(project_id, current_user, owner=False, write=False, include_archived=False):
+    """
+    Lève 404 si le projet n'existe pas (ou n'est plus qu'en archive, sauf avec
+    `include_archived`), 403 si l'utilisateur n'en est ni propriétaire ni
+    membre, n'en est que lecteur quand `write` est demandé, ou n'en est pas
+    propriétaire quand `owner` l'est.
+    """
+    access = await project_access(project_id, current_user["id"], include_archived)
+    if access is None:
+        raise HTTPException(status_code=404, detail="Projet non trouvé")
+    if access == "none" or (owner and access != "owner") or (write and access not in WRITE_ACCESS):
+        raise HTTPException(status_code=403, detail="Accès refusé à ce projet")
 
 
-@app.get("/project-users/{project_id}", response_model=List[ProjectUser])
-async def get_project_users(project_id: int):
-    connection = get_db_connection()
-    if not connection:
-        raise HTTPException(status_code=500, detail="Erreur connexion DB")
+def archive_fields(include_archived):
+    """Champs qui n'existent que dans les lectures d'archives, à refuser dans `fields` sinon."""
+    return () if include_archived else ("archived_at",)
 
-    try:
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM ProjectUsers WHERE project_id = %s", (project_id,))
-        users = cursor.fetchall()
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Erreur SQL : {e}")
-    finally:
-        cursor.close()
-        connection.close()
 
-    return users
+async def require_tasks_access(task_ids, current_user, missing_ok=False, write=False):
+    """
+    Vérifie l'accès aux projets des tâches (en écriture avec `write`) et
+    retourne {task_id: project_id}. Lève 404 si l'une d'elles n'existe pas,
+    sauf avec `missing_ok` (les tâches inexistantes sont alors absentes du résultat).
+    """
+    task_projects = await tasks_repo.project_map(task_ids)
+    if not missing_ok and len(task_projects) < len(set(task_ids)):
+        raise HTTPException(status_code=404, detail="Tâche non trouvée")
+    for project_id in set(task_projects.values()):
+        await require_project_access(project_id, current_user, write=write)
+    return task_projects
+
+
+async def require_users(user_ids):
+    """Lève 404 si l'un des utilisateurs n'existe pas."""
+    if not user_ids:
+        return
+    missing = set(user_ids) - await users_repo.existing_ids(user_ids)
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Utilisateur non trouvé : {', '.join(map(str, sorted(missing)))}")
+
+
+@app.get("/users", response_model=List[User], dependencies=[Depends(public_list_budget)])
+async def get_users(request: Request, response: Response, page: OptionalPageParams = Depends()):
+    if not_modified := await check_etag(request, response, "users"):
+        return not_modified
+    columns = page.columns(User)
+    users = await cache.get_or_load(
+        "users", query_key(request), lambda: users_repo.list(page.after_id, page.limit, columns)
+    )
+    return paginate(request, response, users, page)
+
+
+@app.post("/users", response_model=User, status_code=201, dependencies=[Depends(login_budget)])
+async def create_user(user: UserCreate):
+    user_id = await users_repo.create(user.name, user.email, await hasher.hash(user.password), user.role)
+    await cache.invalidate("users")
+    return {**user.model_dump(), "id": user_id}
 
 
-@app.delete("/project-users/{project_id}/{user_id}", status_code=204)
-async def remove_user_from_project(project_id: int, user_id: int):
-    connection = get_db_connection()
-    if not connection:
-        raise HTTPException(status_code=500, detail="Erreur connexion DB")
+def login_failed(account, detail):
+    """Échec de connexion : un jeton du budget "account" est pris, puis 401."""
+    limits.wait("account", account)
+    return HTTPException(status_code=401, detail=detail)
 
-    try:
-        cursor = connection.cursor()
-        cursor.execute(
-            "DELETE FROM ProjectUsers WHERE project_id = %s AND user_id = %s",
-            (project_id, user_id),
-        )
-        connection.commit()
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Erreur SQL : {e}")
-    finally:
-        cursor.close()
-        connection.close()
 
-    return {"message": "Utilisateur retiré du projet"}
+@app.post("/login", response_model=LoginResponse, dependencies=[Depends(login_budget)])
+async def login_user(request: Request, credentials: LoginRequest):
+    # Échecs par compte visé et par adresse : les essais d'un tiers ne bloquent pas
+    # le titulaire du compte, qui se connecte depuis une autre adresse
+    account = (client_ip(request.scope), credentials.email.lower())
+    limits.check_remaining("account", account)
+    user = await users_repo.get_by_email(credentials.email)
 
+    if not user:
+        raise login_failed(account, "Utilisateur non trouvé")
 
-@app.get("/my-projects", response_model=List[Project])
-async def get_my_projects(current_user: dict = Depends(get_current_user)):
-    connection = get_db_connection()
-    if not connection:
-        raise HTTPException(status_code=500, detail="Erreur connexion DB")
+    valid, new_hash = await hasher.verify_and_update(credentials.password, user["password"])
+    if not valid:
+        raise login_failed(account, "Mot de passe incorrect")
+    if new_hash:
+        await users_repo.update_password(user["id"], new_hash)
 
-    try:
-        cursor = connection.cursor(dictionary=True)
-        query = """
-        SELECT DISTINCT p.*
-        FROM Projects p
-        LEFT JOIN ProjectUsers pu ON p.id = pu.project_id
-        WHERE p.owner_id = %s OR pu.user_id = %s
-        """
-        cursor.execute(query, (current_user["id"], current_user["id"]))
-        projects = cursor.fetchall()
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Erreur SQL : {e}")
-    finally:
-        cursor.close()
-        connection.close()
+    # JWT
+    token = create_access_token({"sub": str(user["id"])})
 
-    return projects
+    return {
+        "id": user["id"],
+        "name": user["name"],
+        "email": user["email"],
+        "role": user["role"],
+        "token": token,
+    }
 
 
-@app.get("/tasks", response_model=List[Task])
-async def get_tasks():
-    connection = get_db_connection()
-    if not connection:
-        raise HTTPException(status_code=500, detail="Erreur de connexion à la base de données")
+@app.post("/logout", status_code=204)
+async def logout_user(payload: dict = Depends(get_current_claims)):
+    """Révoque le token courant jusqu'à son expiration, dans tous les workers."""
+    tokens.revoke(payload)
+    await shared.publish("revocations", {"jti": payload.get("jti"), "exp": payload["exp"]})
 
-    try:
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM Tasks")
-        tasks = cursor.fetchall()
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Erreur SQL : {e}")
-    finally:
-        cursor.close()
-        connection.close()
 
-    return tasks
+@app.get("/projects", response_model=List[Project], dependencies=[Depends(list_budget)])
+async def get_projects(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    include_archived: bool = Query(False, description="Inclure les projets archivés"),
+    current_user: dict = Depends(get_current_user),
+):
+    """Projets dont l'utilisateur est propriétaire ou membre"""
+    columns = page.columns(Project, exclude=archive_fields(include_archived))
+    projects = await projects_repo.list(page.after_id, page.limit, columns, include_archived, current_user["id"])
+    return paginate(request, response, projects, page)
 
 
-@app.get("/projects/{project_id}/tasks", response_model=List[TaskWithUsers])
-async def get_tasks_by_project(project_id: int):
-    connection = get_db_connection()
-    if not connection:
-        raise HTTPException(status_code=500, detail="Erreur connexion DB")
+@app.get("/projects/{id}", response_model=List[Project])
+async def get_projects_by_id(request: Request, response: Response, id: int,
+                             include_archived: bool = Query(False, description="Chercher aussi dans les archives"),
+                             current_user: dict = Depends(get_current_user)):
+    await require_project_access(id, current_user, include_archived=include_archived)
+    if not_modified := await check_etag(request, response, f"project:{id}"):
+        return not_modified
+    project = await cache.get_or_load(
+        f"project:{id}", "project:archived" if include_archived else "project",
+        lambda: projects_repo.get(id, include_archived),
+    )
+    return [project] if project else []
 
-    try:
-        cursor = connection.cursor(dictionary=True)
 
-        # Get tasks
-        cursor.execute("SELECT * FROM Tasks WHERE project_id = %s", (project_id,))
-        tasks = cursor.fetchall()
+@app.post("/projects", response_model=Project, status_code=201)
+async def create_project(project: ProjectCreate, current_user: dict = Depends(get_current_user)):
+    project_id = await projects_repo.create(project, current_user["id"])
+    await cache.invalidate(f"user:{current_user['id']}")
+    await search.projects_changed([project_id])
+    return {**project.model_dump(), "id": project_id, "created_at": datetime.now(timezone.utc).isoformat()}
 
-        enriched_tasks = []
-        for task in tasks:
-            # Get assigned users
-            cursor.execute("""
-                SELECT u.id, u.name, u.email
-                FROM Users u
-                JOIN AssignedTasks a ON u.id = a.user_id
-                WHERE a.task_id = %s
-            """, (task["id"],))
-            users = cursor.fetchall()
-
-            task["users"] = users  # attach list of user dicts
-            enriched_tasks.append(task)
-
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Erreur SQL : {e}")
-    finally:
-        cursor.close()
-        connection.close()
 
-    return enriched_tasks
+@app.put("/projects/{id}", response_model=Project)
+async def update_project(id: int, request: Request, response: Response, project: ProjectUpdate = Body(...),
+                         current_user: dict = Depends(get_current_user)):
+    await require_project_access(id, current_user, write=True)
+    changes = project.model_dump(exclude_none=True)
+    changes.pop("owner_id", None)
+    version = expected_version(request, changes.pop("version", None))
+    if not changes:
+        raise HTTPException(status_code=400, detail="Aucun champ à mettre à jour")
+
+    updated_project = await projects_repo.update(id, changes, version)
+    if not updated_project:
+        raise HTTPException(status_code=404, detail="Projet non trouvé")
+    version_etag(response, updated_project)
+    await invalidate_project(id)
+    # Archivé ou réactivé : ses tâches sortent de la recherche ou y reviennent
+    await search.projects_changed([id], with_tasks="status" in changes)
+    return updated_project
 
 
-@app.post("/tasks", response_model=Task, status_code=201)
-async def create_task(task: TaskCreate):
-    connection = get_db_connection()
-    if not connection:
-        raise HTTPException(status_code=500, detail="Erreur de connexion à la base de données")
+@app.delete("/projects/{id}", status_code=204)
+async def delete_project(id: int, current_user: dict = Depends(get_current_user)):
+    await require_project_access(id, current_user, owner=True)
+    # Membres lus avant la suppression en cascade
+    await invalidate_project(id)
+    await projects_repo.delete(id)
+    await cache.invalidate(f"project:{id}")
+    await search.projects_changed([id])
+    await events.revoke(id)
+    return {"message": f"Projet : {id} supprimé"}
 
-    try:
-        cursor = connection.cursor()
-        query = """
-        INSERT INTO Tasks (title, description, due_date, status, priority, project_id)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        """
-        values = (
-            task.title,
-            task.description,
-            task.due_date,
-            task.status,
-            task.priority,
-            task.project_id
-        )
-        cursor.execute(query, values)
-        connection.commit()
-        task_id = cursor.lastrowid
-
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Erreur SQL : {e}")
-    finally:
-        cursor.close()
-        connection.close()
 
-    return {**task.model_dump(), "id": task_id, "created_at": datetime.now(timezone.utc).isoformat()}
+@app.post("/projects/{id}/restore", response_model=Project)
+async def restore_project(id: int, current_user: dict = Depends(get_current_user)):
+    """
+    Ramène un projet archivé, ses membres et ses tâches (sauf celles terminées
+    depuis plus de ARCHIVE_TASKS_AFTER_DAYS jours) ; il repasse au statut "actif"
+    """
+    await require_project_access(id, current_user, owner=True, include_archived=True)
+    project, members = await archive_repo.restore_project(id, completed_before())
+    if project is None:
+        raise HTTPException(status_code=409, detail="Projet non archivé")
+    await cache.invalidate(f"project:{id}", *(f"user:{user_id}" for user_id in members))
+    await search.projects_changed([id], with_tasks=True)
+    return project
 
 
-@app.put("/tasks/{id}", response_model=Task)
-async def update_task(id: int, task: TaskUpdate = Body(...)):
-    connection = get_db_connection()
-    if not connection:
-        raise HTTPException(status_code=500, detail="Erreur de connexion à la base de données")
-    try:
-        cursor = connection.cursor(dictionary=True)
-
-        cursor.execute("SELECT * FROM Tasks WHERE id = %s", (id,))
-        existing_task = cursor.fetchone()
-        if not existing_task:
-            raise HTTPException(status_code=404, detail="Tâche non trouvée")
-
-        update_fields = []
-        values = []
-
-        if task.title is not None:
-            update_fields.append("title = %s")
-            values.append(task.title)
-        if task.description is not None:
-            update_fields.append("description = %s")
-            values.append(task.description)
-        if task.due_date is not None:
-            update_fields.append("due_date = %s")
-            values.append(task.due_date)
-        if task.status is not None:
-            update_fields.append("status = %s")
-            values.append(task.status)
-        if task.status is not None:
-            update_fields.append("status = %s")
-            values.append(task.status)
-        if task.priority is not None:
-            update_fields.append("priority = %s")
-            values.append(task.priority)
-
-        if not update_fields:
-            raise HTTPException(status_code=400, detail="Aucun champ à mettre à jour")
-
-        query = f"UPDATE Tasks SET {', '.join(update_fields)} WHERE id = %s"
-        values.append(id)
-
-        cursor.execute(query, tuple(values))
-        connection.commit()
-
-        cursor.execute("SELECT * FROM Tasks WHERE id = %s", (id,))
-        updated_task = cursor.fetchone()
-
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Erreur SQL : {e}")
-    finally:
-        cursor.close()
-        connection.close()
+@app.post("/project-users", response_model=ProjectUser, status_code=201)
+async def add_user_to_project(project_user: ProjectUserCreate, current_user: dict = Depends(get_current_user)):
+    await require_project_access(project_user.project_id, current_user, owner=True)
+    await require_users([project_user.user_id])
+    if not await project_users_repo.add(project_user.project_id, project_user.user_id, project_user.role):
+        raise HTTPException(status_code=409, detail="Utilisateur déjà membre du projet")
+    await cache.invalidate(f"user:{project_user.user_id}")
+    return project_user
 
-    return updated_task
 
+@app.get("/project-users/{project_id}", response_model=List[ProjectUser])
+async def get_project_users(project_id: int, current_user: dict = Depends(get_current_user)):
+    await require_project_access(project_id, current_user)
+    return await project_users_repo.list(project_id)
 
-@app.delete("/tasks/{id}")
-async def delete_task_by_id(id: int):
-    connection = get_db_connection()
-    if not connection:
-        raise HTTPException(status_code=500, detail="Erreur connexion DB")
 
-    try:
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("DELETE FROM Tasks WHERE id = %s", (id,))
-        connection.commit()
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Erreur SQL : {e}")
-    finally:
-        cursor.close()
-        connection.close()
+@app.delete("/project-users/{project_id}/{user_id}", status_code=204)
+async def remove_user_from_project(project_id: int, user_id: int, current_user: dict = Depends(get_current_user)):
+    await require_project_access(project_id, current_user, owner=True)
+    await project_users_repo.remove(project_id, user_id)
+    await cache.invalidate(f"user:{user_id}")
+    await events.revoke(project_id, user_id)
+    return {"message": "Utilisateur retiré du projet"}
 
-    return {"message": f"Tâche : {id} supprimée"}
+
+@app.get("/my-projects", response_model=List[ProjectWithStats], dependencies=[Depends(list_budget)])
+async def get_my_projects(
+    request: Request,
+    response: Response,
+    page: OptionalPageParams = Depends(),
+    with_stats: bool = Query(False, description="Joindre à chaque projet son tableau de bord"),
+    include_archived: bool = Query(False, description="Inclure les projets archivés"),
+    current_user: dict = Depends(get_current_user),
+):
+    # Les statistiques changent avec les tâches, hors du périmètre de l'utilisateur : pas d'ETag
+    if not with_stats and (not_modified := await check_etag(request, response, f"user:{current_user['id']}")):
+        return not_modified
+    columns = page.columns(Project, exclude=archive_fields(include_archived))
+    projects = await cache.get_or_load(
+        f"user:{current_user['id']}", f"my-projects?{query_key(request)}",
+        lambda: projects_repo.list_for_user(current_user["id"], page.after_id, page.limit, columns, include_archived),
+    )
+    if with_stats:
+        stats = await stats_repo.for_projects([project["id"] for project in projects], date.today())
+        for project in projects:
+            project["stats"] = stats[project["id"]]
+    return paginate(request, response, projects, page)
+
+
+@app.get("/projects/{id}/stats", response_model=ProjectStats)
+async def get_project_stats(id: int, current_user: dict = Depends(get_current_user)):
+    """
+    Tâches par statut, avancement, retards et tâches par assigné, lus dans les
+    compteurs maintenus à chaque écriture (voir reconcile.py)
+    """
+    await require_project_access(id, current_user)
+    today = date.today()
+    return await cache.get_or_load(f"project:{id}", f"stats:{today}", lambda: stats_repo.for_project(id, today))
+
+
+@app.get("/tasks", response_model=List[Task], dependencies=[Depends(list_budget)])
+async def get_tasks(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    filters: TaskFilters = Depends(),
+    include_archived: bool = Query(False, description="Inclure les tâches archivées"),
+    current_user: dict = Depends(get_current_user),
+):
+    """Tâches des projets dont l'utilisateur est propriétaire ou membre"""
+    columns = page.columns(Task, keys=dict.fromkeys(("id", filters.sort)), exclude=archive_fields(include_archived))
+    tasks = await tasks_repo.list(filters, page.after_id, page.limit, columns, include_archived, current_user["id"])
+    return paginate(request, response, tasks, page, cursor=filters.cursor)
+
+
+@app.get("/projects/{project_id}/tasks", response_model=List[TaskWithUsers], dependencies=[Depends(list_budget)])
+async def get_tasks_by_project(
+    request: Request,
+    response: Response,
+    project_id: int,
+    filters: TaskFilters = Depends(),
+    include_archived: bool = Query(False, description="Inclure les tâches archivées (et les projets archivés)"),
+    current_user: dict = Depends(get_current_user),
+):
+    await require_project_access(project_id, current_user, include_archived=include_archived)
+    if not_modified := await check_etag(request, response, f"project:{project_id}"):
+        return not_modified
+    tasks = await cache.get_or_load_json(
+        f"project:{project_id}", f"tasks?{query_key(request)}",
+        lambda: tasks_repo.list_by_project(project_id, filters, include_archived),
+    )
+    return trusted(tasks, response)
+
+
+@app.get("/search", response_model=SearchResults, dependencies=[Depends(list_budget)])
+async def search_tasks(
+    q: str = Query(..., min_length=1, max_length=200, description="Termes, le dernier pouvant être incomplet"),
+    limit: int = Query(20, ge=1, le=100, description="Résultats au plus, par type (projets, tâches)"),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Tâches (titre, description) et projets (nom, description) contenant tous
+    les termes, parmi les projets de /my-projects, les plus pertinents d'abord
+    """
+    return await search.search(current_user["id"], q, limit)
+
+
+@app.post("/tasks", response_model=Task, status_code=201)
+async def create_task(task: TaskCreate, current_user: dict = Depends(get_current_user)):
+    await require_project_access(task.project_id, current_user, write=True)
+    created = await tasks_repo.create(task)
+    await cache.invalidate(f"project:{task.project_id}")
+    await search.tasks_changed([created["id"]])
+    await events.publish(task.project_id, "task.created", task={**created, "users": []})
+    return created
 
 
-@app.get("/tasks/assigned", response_model=List[AssignedTask])
-async def get_assigned_tasks():
-    connection = get_db_connection()
-    if not connection:
-        raise HTTPException(status_code=500, detail="Erreur connexion DB")
+@app.post("/tasks/bulk", response_model=TaskBulkResponse)
+async def bulk_tasks(payload: TaskBulkRequest, current_user: dict = Depends(get_current_user)):
+    """
+    Crée, modifie et supprime des tâches en une seule transaction
+    (import de backlog, déplacement de plusieurs cartes)
+    """
+    if len(payload.create) + len(payload.update) + len(payload.delete) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Au plus {MAX_BULK_ITEMS} éléments par requête")
+    task_projects = await require_tasks_access(
+        [task.id for task in payload.update] + payload.delete, current_user, missing_ok=True, write=True
+    )
+    for project_id in {task.project_id for task in payload.create}:
+        # Projet inexistant : signalé élément par élément dans les résultats
+        access = await project_access(project_id, current_user["id"])
+        if access is not None and access not in WRITE_ACCESS:
+            raise HTTPException(status_code=403, detail="Accès refusé à ce projet")
+    project_ids = {task.project_id for task in payload.create} | set(task_projects.values())
+    results = await tasks_repo.bulk(payload.create, payload.update, payload.delete)
+    await cache.invalidate(*(f"project:{project_id}" for project_id in project_ids))
+    await search.tasks_changed([result["id"] for result in results if result.get("id") is not None])
+    await publish_bulk_events(payload, results, task_projects)
+    return {"results": results}
+
+
+async def publish_bulk_events(payload, results, task_projects):
+    for result in results:
+        if result["status"] == "created":
+            task = payload.create[result["index"]]
+            await events.publish(task.project_id, "task.created",
+                                 task={**task.model_dump(), "id": result["id"], "users": []})
+        elif result["status"] == "updated":
+            changes = payload.update[result["index"]].model_dump(exclude_none=True, exclude={"project_id", "version"})
+            await events.publish(task_projects[result["id"]],
+                                 "task.moved" if "status" in changes else "task.updated", task=changes)
+        elif result["status"] == "deleted":
+            await events.publish(task_projects[result["id"]], "task.deleted", task={"id": result["id"]})
+
 
+@app.put("/tasks/{id}", response_model=Task)
+async def update_task(id: int, request: Request, response: Response, task: TaskUpdate = Body(...),
+                      current_user: dict = Depends(get_current_user)):
+    await require_tasks_access([id], current_user, write=True)
+    changes = task.model_dump(exclude_none=True)
+    changes.pop("project_id", None)
+    version = expected_version(request, changes.pop("version", None))
+    if not changes:
+        raise HTTPException(status_code=400, detail="Aucun champ à mettre à jour")
+    return await apply_task_update(id, changes, version, response)
+
+
+@app.patch("/tasks/{id}/move", response_model=Task)
+async def move_task(id: int, request: Request, response: Response, move: TaskMove,
+                    current_user: dict = Depends(get_current_user)):
+    """
+    Déplacement d'une carte du tableau (glisser-déposer) vers une colonne,
+    entre deux cartes (after_id / before_id) ou en fin de colonne.
+    Une seule ligne modifiée : le statut et le rang de la carte.
+    """
+    project_id = (await require_tasks_access([id], current_user, write=True))[id]
+    version = expected_version(request, move.version)
     try:
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM AssignedTasks")
-        assigned = cursor.fetchall()
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Erreur SQL : {e}")
-    finally:
-        cursor.close()
-        connection.close()
+        moved = await tasks_repo.move(id, project_id, move.status, move.after_id, move.before_id, version)
+    except RankError:
+        # Voisins déplacés entre-temps ou ex aequo : la colonne sera renumérotée
+        rebalancer.mark(project_id, move.status)
+        raise HTTPException(status_code=409, detail="Position invalide, rechargez le tableau")
+    if moved and needs_rebalance(moved["position"]):
+        rebalancer.mark(project_id, move.status)
+    return await task_updated(moved, {"status": move.status}, response)
+
+
+async def apply_task_update(task_id, changes, version, response):
+    updated_task = await tasks_repo.update(task_id, changes, version)
+    if updated_task and changes.keys() & {"title", "description"}:
+        await search.tasks_changed([task_id])
+    return await task_updated(updated_task, changes, response)
+
+
+async def task_updated(updated_task, changes, response):
+    if not updated_task:
+        raise HTTPException(status_code=404, detail="Tâche non trouvée")
+    version_etag(response, updated_task)
+    await cache.invalidate(f"project:{updated_task['project_id']}")
+    await events.publish(
+        updated_task["project_id"], "task.moved" if "status" in changes else "task.updated", task=updated_task
+    )
+    return updated_task
 
-    return assigned
+
+@app.delete("/tasks/{id}")
+async def delete_task_by_id(id: int, current_user: dict = Depends(get_current_user)):
+    await require_tasks_access([id], current_user, write=True)
+    project_id = await tasks_repo.delete(id)
+    if project_id is None:
+        raise HTTPException(status_code=404, detail="Tâche non trouvée")
+    await cache.invalidate(f"project:{project_id}")
+    await search.tasks_changed([id])
+    await events.publish(project_id, "task.deleted", task={"id": id})
+    return {"message": f"Tâche : {id} supprimée"}
+
+
+@app.post("/tasks/{id}/restore", response_model=Task)
+async def restore_task(id: int, response: Response, current_user: dict = Depends(get_current_user)):
+    """Ramène une tâche archivée sur le tableau de son projet, qui doit être actif"""
+    project_id = await archive_repo.archived_task_project(id)
+    if project_id is None:
+        raise HTTPException(status_code=404, detail="Tâche archivée non trouvée")
+    await require_project_access(project_id, current_user, write=True, include_archived=True)
+    if await projects_repo.get(project_id) is None:
+        raise HTTPException(status_code=409, detail="Projet archivé : restaurez d'abord le projet")
+    task = await archive_repo.restore_task(id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Tâche archivée non trouvée")
+    version_etag(response, task)
+    await cache.invalidate(f"project:{project_id}")
+    await search.tasks_changed([id])
+    users = await assignments_repo.users_for_task(id)
+    await events.publish(project_id, "task.created", task={**task, "users": users})
+    return task
+
+
+@app.get("/tasks/assigned", response_model=List[AssignedTask], dependencies=[Depends(list_budget)])
+async def get_assigned_tasks(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    after_user_id: Optional[int] = Query(None, description="Curseur : user_id de la dernière ligne reçue"),
+    current_user: dict = Depends(get_current_user),
+):
+    """Assignations des tâches des projets dont l'utilisateur est propriétaire ou membre"""
+    columns = page.columns(AssignedTask, keys=("task_id", "user_id"))
+    after = (page.after_id, after_user_id) if page.after_id is not None else None
+    assigned = await assignments_repo.list(after, page.limit, columns, current_user["id"])
+    return paginate(
+        request, response, assigned, page,
+        cursor=lambda row: {"after_id": row["task_id"], "after_user_id": row["user_id"]},
+    )
 
 
 @app.get("/tasks/{task_id}/users")
-async def get_task_users(task_id: int):
-    connection = get_db_connection()
-    if not connection:
-        raise HTTPException(status_code=500, detail="Erreur DB")
-    try:
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT u.id, u.name, u.email
-            FROM Users u
-            JOIN AssignedTasks a ON u.id = a.user_id
-            WHERE a.task_id = %s
-        """, (task_id,))
-        users = cursor.fetchall()
-    finally:
-        cursor.close()
-        connection.close()
-    return users
+async def get_task_users(task_id: int, current_user: dict = Depends(get_current_user)):
+    await require_tasks_access([task_id], current_user)
+    return await assignments_repo.users_for_task(task_id)
+
+
+@app.get("/export/tasks", dependencies=[Depends(list_budget)])
+async def export_tasks(
+    export: ExportParams = Depends(),
+    filters: TaskFilters = Depends(),
+    project_id: Optional[int] = Query(None),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Tâches des projets de l'utilisateur (ou d'un seul projet) en NDJSON ou CSV,
+    diffusées en flux
+    """
+    conditions, params = export.where()
+    member_id = current_user["id"]
+    if project_id is not None:
+        await require_project_access(project_id, current_user)
+        conditions.append("project_id = %s")
+        params.append(project_id)
+        member_id = None
+    batches = tasks_repo.stream(filters, conditions, params, TASK_COLUMNS, member_id)
+    return stream_export(batches, export, "tasks", TASK_COLUMNS)
+
+
+@app.get("/export/projects", dependencies=[Depends(list_budget)])
+async def export_projects(
+    export: ExportParams = Depends(),
+    status: Optional[Literal["actif", "archivé"]] = Query(None),
+    current_user: dict = Depends(get_current_user),
+):
+    conditions, params = export.where()
+    if status:
+        conditions.append("status = %s")
+        params.append(status)
+    batches = projects_repo.stream(conditions, params, PROJECT_COLUMNS, current_user["id"])
+    return stream_export(batches, export, "projects", PROJECT_COLUMNS)
+
+
+async def publish_assignments(diff, user_ids):
+    """Invalide le cache et diffuse task.assigned pour les tâches dont les assignés ont changé."""
+    task_projects = await tasks_repo.project_map(diff)
+    users = await users_repo.get_many(user_ids)
+    await cache.invalidate(*(f"project:{p}" for p in set(task_projects.values())))
+    for task_id, project_id in task_projects.items():
+        await events.publish(project_id, "task.assigned", task={"id": task_id, "users": users, **diff[task_id]})
 
 
 @app.post("/tasks/{task_id}/assign-users")
-async def assign_users_to_task(task_id: int, payload: AssignUsersRequest):
-    connection = get_db_connection()
-    if not connection:
-        raise HTTPException(status_code=500, detail="Erreur DB")
+async def assign_users_to_task(task_id: int, payload: AssignUsersRequest,
+                               current_user: dict = Depends(get_current_user)):
+    await require_tasks_access([task_id], current_user, write=True)
+    await require_users(payload.user_ids)
+    diff = await assignments_repo.replace(task_id, payload.user_ids)
+    if diff["added"] or diff["removed"]:
+        await publish_assignments({task_id: diff}, payload.user_ids)
+    return {"task_id": task_id, "assigned_users": payload.user_ids, **diff}
+
+
+@app.post("/tasks/assign-users")
+async def assign_users_to_tasks(payload: AssignUsersBatchRequest, current_user: dict = Depends(get_current_user)):
+    """
+    Même effet que /tasks/{task_id}/assign-users pour plusieurs tâches à la fois
+    """
+    if len(payload.task_ids) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Au plus {MAX_BULK_ITEMS} tâches par requête")
+    await require_tasks_access(payload.task_ids, current_user, write=True)
+    await require_users(payload.user_ids)
+    diff = await assignments_repo.replace_many(payload.task_ids, payload.user_ids)
+    changed = {task_id: changes for task_id, changes in diff.items() if changes["added"] or changes["removed"]}
+    if changed:
+        await publish_assignments(changed, payload.user_ids)
+    return {
+        "assigned_users": payload.user_ids,
+        "tasks": [{"task_id": task_id, **changes} for task_id, changes in diff.items()],
+    }
+
+
+@app.post("/imports", response_model=ImportJob, status_code=202)
+async def create_import(request: Request, background_tasks: BackgroundTasks,
+                        current_user: dict = Depends(get_current_user)):
+    """
+    Importe une archive NDJSON/JSON de projets (voir importer.py). L'archive est
+    entièrement validée avant la réponse ; l'écriture se poursuit en arrière-plan.
+    """
+    data = await request.body()
+    try:
+        projects, user_ids = await prepare_import(data, users_repo)
+    except ArchiveError as e:
+        raise HTTPException(status_code=422, detail=e.errors)
+    digest = await run_in_threadpool(checksum, data)
+    job_id = await imports_repo.create(current_user["id"], digest, len(projects))
+    background_tasks.add_task(run_import, imports_repo, job_id, projects, current_user["id"], user_ids)
+    return await imports_repo.get(job_id)
+
+
+async def get_own_import(job_id, current_user):
+    job = await imports_repo.get(job_id)
+    if not job or job["user_id"] != current_user["id"]:
+        raise HTTPException(status_code=404, detail="Import non trouvé")
+    return job
+
+
+@app.get("/imports/{job_id}", response_model=ImportJob)
+async def get_import(job_id: int, current_user: dict = Depends(get_current_user)):
+    return await get_own_import(job_id, current_user)
+
+
+@app.post("/imports/{job_id}/resume", response_model=ImportJob, status_code=202)
+async def resume_import(job_id: int, request: Request, background_tasks: BackgroundTasks,
+                        current_user: dict = Depends(get_current_user)):
+    """Reprend un import interrompu au premier lot non écrit ; le corps doit être la même archive."""
+    job = await get_own_import(job_id, current_user)
+    if job["status"] == "terminé" or await running(job_id):
+        raise HTTPException(status_code=409, detail="Import déjà terminé ou en cours")
+    data = await request.body()
+    if await run_in_threadpool(checksum, data) != job["checksum"]:
+        raise HTTPException(status_code=409, detail="L'archive ne correspond pas à cet import")
     try:
-        cursor = connection.cursor()
-        cursor.execute("DELETE FROM AssignedTasks WHERE task_id = %s", (task_id,))
-        for user_id in payload.user_ids:
-            cursor.execute(
-                "INSERT INTO AssignedTasks (task_id, user_id) VALUES (%s, %s)",
-                (task_id, user_id),
-            )
-        connection.commit()
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Erreur SQL : {e}")
+        projects, user_ids = await prepare_import(data, users_repo)
+    except ArchiveError as e:
+        raise HTTPException(status_code=422, detail=e.errors)
+    background_tasks.add_task(
+        run_import, imports_repo, job_id, projects, current_user["id"], user_ids, start=job["done"]
+    )
+    return job
+
+
+@app.websocket("/ws/projects/{project_id}")
+async def project_events(websocket: WebSocket, project_id: int, token: str = Query(...),
+                         since: Optional[int] = Query(None)):
+    """
+    Flux des modifications du tableau. Le JWT passe en paramètre `token`,
+    les navigateurs ne permettant pas d'en-tête Authorization sur un WebSocket.
+    """
+    payload = decode_token(token)
+    if not payload or payload.get("sub") is None:
+        await websocket.close(code=1008, reason="Token invalide ou expiré")
+        return
+    user_id = int(payload["sub"])
+    # Inscrit avant la vérification d'accès : un retrait entre les deux n'est pas manqué
+    subscriber = events.subscribe(project_id, since, user_id)
+    if await project_access(project_id, user_id) in (None, "none"):
+        events.unsubscribe(project_id, subscriber)
+        await websocket.close(code=1008, reason="Accès refusé à ce projet")
+        return
+    await websocket.accept()
+
+    async def forward():
+        while True:
+            event = await subscriber.queue.get()
+            if event is OVERFLOWED:
+                # Abonné trop lent : il se reconnectera avec `since`
+                await websocket.close(code=1013, reason="Retard trop important, reprendre avec since")
+                return
+            if event is REVOKED:
+                # Membre retiré ou projet supprimé : la reconnexion sera refusée
+                await websocket.close(code=1008, reason="Accès refusé à ce projet")
+                return
+            await websocket.send_json(event)
+
+    async def drain():
+        # Détecte la déconnexion du client (les messages reçus sont ignorés)
+        while True:
+            await websocket.receive_text()
+
+    tasks = [asyncio.create_task(forward()), asyncio.create_task(drain())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
     finally:
-        cursor.close()
-        connection.close()
-    return {"task_id": task_id, "assigned_users": payload.user_ids}
+        for task in tasks:
+            task.cancel()
+        events.unsubscribe(project_id, subscriber)
+    # Fin du flux : déconnexion du client (WebSocketDisconnect) ou fermeture par forward() ;
+    # toute autre erreur de l'une des deux tâches remonte
+    for task in done:
+        error = task.exception()
+        if error is not None and not isinstance(error, WebSocketDisconnect):
+            raise error
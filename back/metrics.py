@@ -0,0 +1,175 @@
+"""
+Mesures de performance par requête, exposées au format Prometheus sur /metrics.
+
+Pour chaque route : latence, temps passé en base, nombre de requêtes SQL et de
+lignes lues. Chaque réponse porte aussi un en-tête Server-Timing :
+
+    Server-Timing: db;dur=12.4;desc="7 req, 250 lignes", app;dur=3.1
+
+Une route dont le nombre de requêtes SQL grandit avec la taille des données
+(une requête par tâche, par exemple) se voit donc tout de suite.
+
+Les requêtes SQL plus lentes que DB_SLOW_QUERY_MS sont journalisées, sans la
+valeur de leurs paramètres.
+"""
+import os
+import re
+import time
+import logging
+from contextvars import ContextVar
+
+logger = logging.getLogger(__name__)
+
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500, 1000, 10000, 100000)
+
+
+class RequestStats:
+    __slots__ = ("queries", "rows", "db_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+        self.db_time = 0.0
+
+
+_current = ContextVar("request_stats", default=None)
+
+
+class Counter:
+
+    def __init__(self, name, help):
+        self.name, self.help = name, help
+        self.values = {}
+
+    def inc(self, labels=(), amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in self.values.items():
+            yield f"{self.name}{_labels(labels)} {value}"
+
+
+class Histogram:
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS):
+        self.name, self.help = name, help
+        self.buckets = buckets
+        self.series = {}  # labels -> [compteurs par seuil..., somme, total]
+
+    def observe(self, value, labels=()):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, series in self.series.items():
+            for bound, count in zip(self.buckets, series):
+                yield f"{self.name}_bucket{_labels(labels + (('le', _number(bound)),))} {count}"
+            yield f"{self.name}_bucket{_labels(labels + (('le', '+Inf'),))} {series[-1]}"
+            yield f"{self.name}_sum{_labels(labels)} {_number(series[-2])}"
+            yield f"{self.name}_count{_labels(labels)} {series[-1]}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in labels)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + "}"
+
+
+http_requests = Counter("http_requests_total", "Requêtes HTTP traitées")
+http_latency = Histogram("http_request_duration_seconds", "Durée des requêtes HTTP")
+http_db_time = Histogram("http_request_db_seconds", "Temps passé en base par requête HTTP")
+http_db_queries = Histogram("http_request_db_queries", "Requêtes SQL par requête HTTP", COUNT_BUCKETS)
+http_db_rows = Histogram("http_request_db_rows", "Lignes lues en base par requête HTTP", COUNT_BUCKETS)
+db_latency = Histogram("db_query_duration_seconds", "Durée des requêtes SQL")
+db_slow_queries = Counter("db_slow_queries_total", "Requêtes SQL plus lentes que DB_SLOW_QUERY_MS")
+
+METRICS = (http_requests, http_latency, http_db_time, http_db_queries, http_db_rows, db_latency, db_slow_queries)
+
+
+def _redacted(params):
+    return "(" + ", ".join(type(value).__name__ for value in params) + ")"
+
+
+def record_query(query, params, duration, rows=0):
+    """Appelé par la couche d'accès aux données après chaque requête SQL."""
+    db_latency.observe(duration)
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.rows += rows
+        stats.db_time += duration
+    if duration * 1000 >= DB_SLOW_QUERY_MS:
+        db_slow_queries.inc()
+        logger.warning(
+            "Requête lente (%.0f ms, %d lignes) : %s params=%s",
+            duration * 1000, rows, re.sub(r"\s+", " ", query).strip()[:1000], _redacted(params),
+        )
+
+
+class MetricsMiddleware:
+    """Middleware ASGI : mesure chaque requête HTTP et pose l'en-tête Server-Timing."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                total = (time.perf_counter() - start) * 1000
+                timing = (
+                    f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} req, {stats.rows} lignes", '
+                    f"app;dur={total - stats.db_time * 1000:.1f}"
+                )
+                message["headers"] = [*message.get("headers", []), (b"server-timing", timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            # Gabarit de la route, pas le chemin réel : nombre de séries borné
+            labels = (("method", scope["method"]), ("route", route.path if route else "non routée"))
+            http_requests.inc(labels + (("status", status),))
+            http_latency.observe(time.perf_counter() - start, labels)
+            http_db_time.observe(stats.db_time, labels)
+            http_db_queries.observe(stats.queries, labels)
+            http_db_rows.observe(stats.rows, labels)
+
+
+def render(gauges=()):
+    """Texte d'exposition Prometheus ; `gauges` : (nom, aide, valeur) calculés au moment de la lecture."""
+    lines = []
+    for metric in METRICS:
+        lines += metric.render()
+    for name, help, value in gauges:
+        kind = "counter" if name.endswith("_total") else "gauge"
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}", f"{name} {_number(value)}"]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,141 @@
+"""
+Mise à niveau des bases créées avant les colonnes, tables et index ajoutés
+depuis (versions, rang des cartes, date de fin des tâches, compteurs du
+tableau de bord, archives, imports, index de filtre et de recherche).
+
+Exécutée à l'ouverture de la base (Database.open) et idempotente : sur une
+base à jour elle ne fait que lire le catalogue. Les colonnes ajoutées sont
+remplies :
+
+    Tasks.position       rangs des cartes de chaque colonne, dans l'ordre des ids
+    Tasks.completed_at   date de la migration pour les tâches déjà terminées
+    compteurs            recalculés comme par reconcile.py
+
+Le schéma de référence reste init.sql (MySQL) et init_sqlite.sql : les tables
+et index absents en sont tirés.
+"""
+import re
+import logging
+
+logger = logging.getLogger("migrations")
+
+# Colonnes ajoutées aux tables d'origine : (table, colonne, définition MySQL, définition SQLite)
+COLUMNS = (
+    ("Projects", "version", "INT NOT NULL DEFAULT 1", "INT NOT NULL DEFAULT 1"),
+    ("Tasks", "version", "INT NOT NULL DEFAULT 1", "INT NOT NULL DEFAULT 1"),
+    ("Tasks", "position", "VARCHAR(64) CHARACTER SET ascii COLLATE ascii_bin NOT NULL DEFAULT 'a0'",
+     "TEXT NOT NULL DEFAULT 'a0'"),
+    ("Tasks", "completed_at", "DATETIME NULL", "DATETIME"),
+)
+STATS_TABLES = {"ProjectTaskStats", "ProjectDueStats", "ProjectAssigneeStats"}
+DONE_STATUS = "terminé"
+
+_TABLE = re.compile(r"^\s*create\s+table\s+(?:if\s+not\s+exists\s+)?(\w+)\s*\((.*)\)\s*$", re.I | re.S)
+_INDEX = re.compile(r"^\s*((?:fulltext\s+)?index)\s+(\w+)\s*(\([^)]*\))", re.I | re.M)
+
+
+def parse_schema(script):
+    """[(table, CREATE TABLE IF NOT EXISTS ..., [(index, ADD ... INDEX ...)])] d'un script init.sql."""
+    script = "\n".join(line for line in script.splitlines() if not line.lstrip().startswith("--"))
+    tables = []
+    for statement in script.split(";"):
+        match = _TABLE.match(statement)
+        if not match:
+            continue
+        table, body = match.groups()
+        indexes = [(name, f"ADD {kind.upper()} {name} {columns}") for kind, name, columns in _INDEX.findall(body)]
+        tables.append((table, f"CREATE TABLE IF NOT EXISTS {table} ({body})", indexes))
+    return tables
+
+
+async def _tables(conn, dialect):
+    if dialect == "mysql":
+        rows = await conn.fetch_all(
+            "SELECT TABLE_NAME AS name FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE()"
+        )
+    else:
+        rows = await conn.fetch_all("SELECT name FROM sqlite_master WHERE type = 'table'")
+    return {row["name"] for row in rows}
+
+
+async def _columns(conn, dialect, table):
+    if dialect == "mysql":
+        rows = await conn.fetch_all(
+            "SELECT COLUMN_NAME AS name FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", (table,)
+        )
+    else:
+        rows = await conn.fetch_all("SELECT name FROM pragma_table_info(%s)", (table,))
+    return {row["name"] for row in rows}
+
+
+async def _indexes(conn, table):
+    rows = await conn.fetch_all(
+        "SELECT DISTINCT INDEX_NAME AS name FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", (table,)
+    )
+    return {row["name"] for row in rows}
+
+
+async def add_columns(conn, dialect, tables):
+    """Ajoute aux tables existantes les colonnes absentes ; retourne {(table, colonne)} ajoutées."""
+    added = set()
+    for table, column, mysql, sqlite in COLUMNS:
+        if table not in tables or column in await _columns(conn, dialect, table):
+            continue
+        await conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {mysql if dialect == 'mysql' else sqlite}")
+        logger.warning("Migration : colonne %s.%s ajoutée", table, column)
+        added.add((table, column))
+    return added
+
+
+async def create_mysql_schema(conn, script):
+    """Tables absentes de la base, puis index absents des tables existantes, d'après init.sql."""
+    tables = await _tables(conn, "mysql")
+    for table, create, indexes in parse_schema(script):
+        if table not in tables:
+            await conn.execute(create)
+            continue
+        existing = await _indexes(conn, table)
+        for name, add in indexes:
+            if name not in existing:
+                await conn.execute(f"ALTER TABLE {table} {add}")
+                logger.warning("Migration : index %s.%s ajouté", table, name)
+
+
+async def migrate(db, create_schema):
+    """
+    Met la base de `db` au niveau du schéma. `create_schema(conn)` crée les
+    tables et index absents ; les colonnes manquantes sont ajoutées avant, les
+    index du schéma pouvant porter sur elles.
+    """
+    async with db.acquire() as conn:
+        tables = await _tables(conn, db.dialect)
+        added = await add_columns(conn, db.dialect, tables)
+        await create_schema(conn)
+    if ("Tasks", "position") in added:
+        await _rank_cards(db)
+    if ("Tasks", "completed_at") in added:
+        async with db.transaction() as conn:
+            await conn.execute("UPDATE Tasks SET completed_at = CURRENT_TIMESTAMP WHERE status = %s", (DONE_STATUS,))
+    if "Projects" in tables and STATS_TABLES - tables:
+        await _count_stats(db)
+
+
+async def _rank_cards(db):
+    """Rangs distincts dans chaque colonne, qui sinon partageraient tous le rang par défaut."""
+    from repository import TaskRepository
+
+    tasks_repo = TaskRepository(db)
+    columns = await db.fetch_all("SELECT DISTINCT project_id, status FROM Tasks")
+    for column in columns:
+        await tasks_repo.rebalance(column["project_id"], column["status"])
+    logger.warning("Migration : cartes de %d colonnes classées", len(columns))
+
+
+async def _count_stats(db):
+    from repository import StatsRepository
+    from reconcile import reconcile_all
+
+    drift = await reconcile_all(StatsRepository(db))
+    logger.warning("Migration : compteurs du tableau de bord calculés (%d valeurs)", len(drift))
@@ -0,0 +1,85 @@
+"""
+Pagination par clé (keyset) et projection de champs pour les endpoints de liste.
+
+    GET /tasks?limit=100                     -> 100 premières tâches, triées par id
+    GET /tasks?after_id=100&limit=100        -> page suivante
+    GET /tasks?fields=id,title,status        -> seulement ces colonnes
+
+La page suivante est annoncée par les en-têtes `Link: <...>; rel="next"` et
+`X-Next-Cursor` ; le corps reste une liste JSON.
+
+Les listes que le frontend lit en entier (/users, /my-projects) ne sont
+paginées qu'à la demande, avec `limit` ou un curseur (OptionalPageParams).
+"""
+from fastapi import HTTPException, Query, Request, Response
+
+from responses import trusted
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class PageParams:
+    """Dépendance FastAPI regroupant after_id, limit et fields."""
+
+    def __init__(
+        self,
+        after_id: int | None = Query(None, description="Curseur : id de la dernière ligne reçue"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        fields: str | None = Query(None, description="Colonnes à renvoyer, séparées par des virgules"),
+    ):
+        self.after_id = after_id
+        self.limit = limit
+        self.fields = fields
+
+    def columns(self, model, keys=("id",), exclude=()):
+        """
+        Colonnes demandées, validées contre les champs du modèle Pydantic
+        (donc jamais `password`) hors `exclude`. Les clés de pagination sont
+        toujours incluses.
+        """
+        if not self.fields:
+            return None
+        allowed = model.model_fields.keys() - set(exclude)
+        requested = [f.strip() for f in self.fields.split(",") if f.strip()]
+        unknown = [f for f in requested if f not in allowed]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Champs inconnus : {', '.join(unknown)}")
+        return list(keys) + [f for f in dict.fromkeys(requested) if f not in keys]
+
+
+class OptionalPageParams(PageParams):
+    """Comme PageParams, mais sans `limit` ni curseur la liste est complète (limit None)."""
+
+    def __init__(
+        self,
+        after_id: int | None = Query(None, description="Curseur : id de la dernière ligne reçue"),
+        limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Pagination à la demande"),
+        fields: str | None = Query(None, description="Colonnes à renvoyer, séparées par des virgules"),
+    ):
+        if limit is None and after_id is not None:
+            limit = DEFAULT_PAGE_SIZE
+        super().__init__(after_id, limit, fields)
+
+
+def paginate(request: Request, response: Response, rows, page: PageParams, cursor=None):
+    """
+    Les dépôts lisent limit + 1 lignes : la ligne en trop signale une page suivante.
+
+    Les lignes viennent de la base : la page est sérialisée telle quelle, sans
+    repasser par le response_model de la route (qui ne s'appliquerait de toute
+    façon pas à une projection).
+    """
+    if page.limit is None:
+        return trusted(rows, response)
+    cursor = cursor or (lambda row: {"after_id": row["id"]})
+    rows, has_more = rows[:page.limit], len(rows) > page.limit
+    if has_more:
+        next_cursor = cursor(rows[-1])
+        # Un champ de curseur à None (valeur NULL) doit disparaître de l'URL
+        next_url = request.url.remove_query_params(list(next_cursor)).include_query_params(
+            **{k: v for k, v in next_cursor.items() if v is not None}
+        )
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+        response.headers["X-Next-Cursor"] = ",".join("" if v is None else str(v) for v in next_cursor.values())
+    return trusted(rows, response)
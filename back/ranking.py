@@ -0,0 +1,202 @@
+"""
+Position des cartes dans une colonne du tableau : rangs lexicographiques.
+
+Un rang est une chaîne comparée octet par octet (ordre ASCII, donc index SQL
+ordinaire) ; entre deux rangs il en existe toujours un troisième, si bien que
+déplacer une carte ne modifie qu'une ligne. Un rang se compose d'une partie
+entière de longueur variable (un caractère de tête donne sa longueur) et d'une
+partie fractionnaire : les ajouts en fin de colonne incrémentent la partie
+entière et restent courts, les insertions entre deux cartes allongent la
+partie fractionnaire. Les colonnes dont les rangs deviennent trop longs sont
+renumérotées en tâche de fond (Rebalancer).
+"""
+import os
+import asyncio
+import logging
+
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+FIRST_RANK = "a0"
+
+# Au-delà de cette longueur, la colonne est renumérotée
+RANK_MAX_LENGTH = int(os.getenv("RANK_MAX_LENGTH", "24"))
+# Secondes entre deux passes de renumérotation
+RANK_REBALANCE_INTERVAL = float(os.getenv("RANK_REBALANCE_INTERVAL", "30"))
+
+logger = logging.getLogger("ranking")
+
+
+class RankError(ValueError):
+    """Bornes incohérentes (égales ou inversées) : la colonne doit être renumérotée."""
+
+
+def _integer_length(head):
+    if "a" <= head <= "z":
+        return ord(head) - ord("a") + 2
+    if "A" <= head <= "Z":
+        return ord("Z") - ord(head) + 2
+    raise RankError(f"rang invalide : {head!r}")
+
+
+def _split(rank):
+    """(partie entière, partie fractionnaire)"""
+    length = _integer_length(rank[0])
+    if len(rank) < length:
+        raise RankError(f"rang invalide : {rank!r}")
+    return rank[:length], rank[length:]
+
+
+def _midpoint(low, high):
+    """Fraction strictement entre low et high (None : pas de borne haute)."""
+    if high is not None:
+        # Préfixe commun (low complété par des zéros)
+        n = 0
+        while n < len(high) and (low[n] if n < len(low) else "0") == high[n]:
+            n += 1
+        if n:
+            return high[:n] + _midpoint(low[n:], high[n:])
+    digit_low = DIGITS.index(low[0]) if low else 0
+    digit_high = DIGITS.index(high[0]) if high is not None else len(DIGITS)
+    if digit_high - digit_low > 1:
+        return DIGITS[(digit_low + digit_high + 1) // 2]
+    if high is not None and len(high) > 1:
+        return high[0]
+    return DIGITS[digit_low] + _midpoint(low[1:], None)
+
+
+def _increment(integer):
+    head, digits = integer[0], list(integer[1:])
+    for i in reversed(range(len(digits))):
+        value = DIGITS.index(digits[i]) + 1
+        if value < len(DIGITS):
+            digits[i] = DIGITS[value]
+            return head + "".join(digits)
+        digits[i] = "0"
+    if head == "Z":
+        return "a0"
+    if head == "z":
+        return None
+    head = chr(ord(head) + 1)
+    if head > "a":
+        digits.append("0")
+    else:
+        digits.pop()
+    return head + "".join(digits)
+
+
+def _decrement(integer):
+    head, digits = integer[0], list(integer[1:])
+    for i in reversed(range(len(digits))):
+        value = DIGITS.index(digits[i]) - 1
+        if value >= 0:
+            digits[i] = DIGITS[value]
+            return head + "".join(digits)
+        digits[i] = DIGITS[-1]
+    if head == "a":
+        return "Z" + DIGITS[-1]
+    if head == "A":
+        return None
+    head = chr(ord(head) - 1)
+    if head < "Z":
+        digits.append(DIGITS[-1])
+    else:
+        digits.pop()
+    return head + "".join(digits)
+
+
+def rank_between(low=None, high=None):
+    """
+    Rang strictement entre low et high ; None désigne le début ou la fin de
+    la colonne. Lève RankError si low >= high.
+    """
+    if low is not None and high is not None and low >= high:
+        raise RankError(f"{low!r} >= {high!r}")
+    if low is None and high is None:
+        return FIRST_RANK
+    if low is None:
+        integer, fraction = _split(high)
+        if fraction:
+            return integer
+        smaller = _decrement(integer)
+        return smaller if smaller is not None else integer + _midpoint("", fraction)
+    if high is None:
+        integer, fraction = _split(low)
+        larger = _increment(integer)
+        return larger if larger is not None else integer + _midpoint(fraction, None)
+    low_integer, low_fraction = _split(low)
+    high_integer, high_fraction = _split(high)
+    if low_integer == high_integer:
+        return low_integer + _midpoint(low_fraction, high_fraction)
+    larger = _increment(low_integer)
+    if larger is not None and larger < high:
+        return larger
+    return low_integer + _midpoint(low_fraction, None)
+
+
+def ranks_between(count, low=None, high=None):
+    """`count` rangs croissants strictement entre low et high, aussi courts que possible."""
+    if count <= 0:
+        return []
+    if high is None:
+        ranks, rank = [], low
+        for _ in range(count):
+            rank = rank_between(rank, None)
+            ranks.append(rank)
+        return ranks
+    if low is None:
+        ranks, rank = [], high
+        for _ in range(count):
+            rank = rank_between(None, rank)
+            ranks.append(rank)
+        return ranks[::-1]
+    middle = count // 2
+    rank = rank_between(low, high)
+    return [*ranks_between(middle, low, rank), rank, *ranks_between(count - middle - 1, rank, high)]
+
+
+def needs_rebalance(rank):
+    return len(rank) > RANK_MAX_LENGTH
+
+
+class Rebalancer:
+    """
+    Renumérote en tâche de fond les colonnes (projet, statut) signalées par
+    mark() : rangs trop longs ou ex aequo après des déplacements concurrents.
+    """
+
+    def __init__(self, interval=RANK_REBALANCE_INTERVAL):
+        self.interval = interval
+        self.pending = set()
+        self._task = None
+
+    def mark(self, project_id, status):
+        self.pending.add((project_id, status))
+
+    def start(self, rebalance):
+        """`rebalance(project_id, status)` : coroutine qui renumérote une colonne."""
+        self._task = asyncio.create_task(self._run(rebalance))
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, rebalance):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush(rebalance)
+
+    async def flush(self, rebalance):
+        columns, self.pending = self.pending, set()
+        for project_id, status in columns:
+            try:
+                await rebalance(project_id, status)
+            except Exception:
+                logger.exception("Renumérotation de la colonne %s/%s impossible", project_id, status)
+                self.pending.add((project_id, status))
+
+
+rebalancer = Rebalancer()
@@ -0,0 +1,71 @@
+"""
+Réconciliation des compteurs du tableau de bord (ProjectTaskStats,
+ProjectDueStats, ProjectAssigneeStats) avec les tâches.
+
+Les compteurs sont tenus à jour par chaque écriture de tâche ou d'assignation ;
+ce job les recalcule entièrement, par lots de projets, et signale tout écart
+(écriture faite hors de l'API, import SQL, bug) :
+
+    python back/reconcile.py                    # vérifie et corrige tous les projets
+    python back/reconcile.py --check            # vérifie seulement : code de sortie 1 en cas d'écart
+    python back/reconcile.py --project 3 --project 7
+"""
+import os
+import asyncio
+import argparse
+
+RECONCILE_BATCH_SIZE = int(os.getenv("RECONCILE_BATCH_SIZE", "100"))
+
+
+async def reconcile_all(stats_repo, fix=True, batch_size=RECONCILE_BATCH_SIZE, progress=None):
+    """
+    Réconcilie tous les projets des tables chaudes (les projets archivés n'ont
+    pas de compteurs), un lot (et une transaction) à la fois ; retourne les écarts.
+    """
+    drift, after_id, done = [], None, 0
+    while True:
+        rows = await stats_repo.project_ids(after_id, batch_size)
+        project_ids = rows[:batch_size]
+        if project_ids:
+            drift += await stats_repo.reconcile(project_ids, fix)
+            done += len(project_ids)
+            if progress:
+                progress(done, len(drift))
+        if len(rows) <= batch_size:
+            return drift
+        after_id = project_ids[-1]
+
+
+async def main(argv=None):
+    from database import db
+    from repository import StatsRepository
+
+    parser = argparse.ArgumentParser(description="Recalcul des compteurs du tableau de bord")
+    parser.add_argument("--check", action="store_true", help="Signaler les écarts sans corriger")
+    parser.add_argument("--project", type=int, action="append", help="Projet à réconcilier (répétable)")
+    parser.add_argument("--batch-size", type=int, default=RECONCILE_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    await db.open()
+    try:
+        stats_repo = StatsRepository(db)
+        if args.project:
+            drift = await stats_repo.reconcile(args.project, fix=not args.check)
+        else:
+            drift = await reconcile_all(
+                stats_repo, not args.check, args.batch_size,
+                progress=lambda done, found: print(f"  {done} projets, {found} écarts", end="\r", flush=True),
+            )
+            print()
+        for table, key, expected, found in drift:
+            print(f"{table} {key}: attendu {expected}, trouvé {found}")
+        action = "signalés" if args.check else "corrigés"
+        print(f"{len(drift)} écarts {action}")
+    finally:
+        await db.close()
+    if drift and args.check:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
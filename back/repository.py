@@ -0,0 +1,1336 @@
+"""
+Couche d'accès aux données : chaque endpoint passe par un de ces dépôts,
+jamais directement par le pilote SQL.
+"""
+
+from collections import Counter
+
+from database import chunked, in_clause
+from filters import TASK_STATUSES
+from ranking import RankError, rank_between, ranks_between
+
+PROJECT_UPDATABLE_FIELDS = ("name", "description", "start_date", "end_date", "status")
+TASK_UPDATABLE_FIELDS = ("title", "description", "due_date", "status", "priority")
+TASK_INSERT_FIELDS = ("title", "description", "due_date", "status", "priority", "project_id")
+DONE_STATUS = "terminé"
+ARCHIVED_STATUS = "archivé"
+# Champs dont dépendent les compteurs du tableau de bord
+STATS_FIELDS = {"status", "due_date"}
+# Colonnes du tableau dans l'ordre (rang de l'ENUM en MySQL), puis cartes : index idx_tasks_board
+BOARD_ORDER = "status, position, id"
+# Projets dont l'utilisateur (deux fois en paramètre) est propriétaire ou membre
+MEMBER_PROJECTS = """(
+    SELECT id FROM Projects WHERE owner_id = %s
+    UNION SELECT project_id FROM ProjectUsers WHERE user_id = %s
+)"""
+# Les mêmes, projets archivés compris (quatre fois l'utilisateur en paramètre)
+MEMBER_PROJECTS_WITH_ARCHIVES = """(
+    SELECT id FROM Projects WHERE owner_id = %s
+    UNION SELECT project_id FROM ProjectUsers WHERE user_id = %s
+    UNION SELECT id FROM ArchivedProjects WHERE owner_id = %s
+    UNION SELECT project_id FROM ArchivedProjectUsers WHERE user_id = %s
+)"""
+# Colonnes communes aux tables chaudes et à leurs archives Archived<table> (voir archiving.py)
+ARCHIVE_COLUMNS = {
+    "Projects": ("id", "name", "description", "start_date", "end_date", "status", "owner_id", "created_at",
+                 "version"),
+    "ProjectUsers": ("project_id", "user_id", "role"),
+    "Tasks": ("id", "title", "description", "due_date", "status", "priority", "project_id", "created_at",
+              "version", "position", "completed_at"),
+    "AssignedTasks": ("task_id", "user_id"),
+}
+# Tâches à archiver : terminées avant la date limite (date de création pour celles
+# terminées avant l'ajout de completed_at) ; lecture de l'index idx_tasks_completed
+ARCHIVABLE_TASKS = "status = %s AND (completed_at < %s OR (completed_at IS NULL AND created_at < %s))"
+
+
+def _set_clause(changes, allowed):
+    fields = [f for f in allowed if f in changes]
+    return ", ".join(f"{f} = %s" for f in fields), [changes[f] for f in fields]
+
+
+def _completion(status):
+    """Affectation de completed_at accompagnant un passage au statut `status`."""
+    if status == DONE_STATUS:
+        # Déjà terminée (déplacement dans la colonne) : la date d'origine est conservée
+        return "completed_at = COALESCE(completed_at, CURRENT_TIMESTAMP)"
+    return "completed_at = NULL"
+
+
+def _task_set_clause(changes):
+    """
+    _set_clause des tâches, completed_at compris quand le statut change, et
+    position quand un changement de colonne en a attribué une (_new_column_rank).
+    """
+    set_clause, values = _set_clause(changes, (*TASK_UPDATABLE_FIELDS, "position"))
+    if "status" in changes:
+        set_clause += f", {_completion(changes['status'])}"
+    return set_clause, values
+
+
+def _source(table, include_archived=False, alias="", where=""):
+    """
+    `table`, ou avec `include_archived` la réunion de la table et de son
+    archive, exposée sous le même nom (ou `alias`) : une requête s'écrit de la
+    même façon dans les deux cas. archived_at vaut NULL pour les lignes chaudes.
+    Les lectures par défaut n'ouvrent jamais les archives.
+    La réunion n'est lue par index que filtrée : conditions de la requête
+    (reportées dans chaque branche) ou `where`, répété dans chaque branche.
+    """
+    if not include_archived:
+        return f"{table} {alias}" if alias else table
+    columns = ", ".join(ARCHIVE_COLUMNS[table])
+    where = f" WHERE {where}" if where else ""
+    # Archive en premier : SQLite déduit le type déclaré (dates) de la première branche
+    return (f"(SELECT {columns}, archived_at FROM Archived{table}{where} "
+            f"UNION ALL SELECT {columns}, NULL FROM {table}{where}) {alias or table}")
+
+
+def _assignment_tables(include_archived):
+    return ("AssignedTasks", "ArchivedAssignedTasks") if include_archived else ("AssignedTasks",)
+
+
+async def _copy(conn, source, target, columns, condition, params):
+    """Copie dans `target` les lignes de `source` vérifiant `condition`, ids compris."""
+    columns = ", ".join(columns)
+    await conn.execute(f"INSERT INTO {target} ({columns}) SELECT {columns} FROM {source} WHERE {condition}", params)
+
+
+class VersionConflict(Exception):
+    """La ligne a été modifiée depuis la version attendue par le client."""
+
+    def __init__(self, current):
+        super().__init__(f"version actuelle : {current}")
+        self.current = current
+
+
+async def _update_versioned(conn, table, row_id, set_clause, values, version=None):
+    """
+    UPDATE qui incrémente la version de la ligne, conditionné à `version` si
+    elle est donnée. Une seule requête dans le cas nominal (UPDATE ... RETURNING,
+    sinon UPDATE puis relecture) : l'existence se déduit du nombre de lignes
+    modifiées, toujours exact puisque la version change.
+    Retourne la ligne mise à jour, None si elle n'existe pas ; lève
+    VersionConflict si elle existe dans une autre version.
+    """
+    conditions, params = "id = %s", [row_id]
+    if version is not None:
+        conditions += " AND version = %s"
+        params.append(version)
+    query = f"UPDATE {table} SET {set_clause}, version = version + 1 WHERE {conditions}"
+    if conn.supports_returning:
+        row = await conn.fetch_one(f"{query} RETURNING *", (*values, *params))
+    else:
+        updated, _ = await conn.execute(query, (*values, *params))
+        row = await conn.fetch_one(f"SELECT * FROM {table} WHERE id = %s", (row_id,)) if updated else None
+    if row is not None or version is None:
+        return row
+    current = await conn.fetch_one(f"SELECT version FROM {table} WHERE id = %s", (row_id,))
+    if current is None:
+        return None
+    raise VersionConflict(current["version"])
+
+
+def _select(columns, default="*", alias=""):
+    """Liste de colonnes (déjà validée côté API) ou colonnes par défaut."""
+    if not columns:
+        return default
+    return ", ".join(f"{alias}{c}" for c in columns)
+
+
+def _keyset(conditions, params, key, after_id, limit):
+    """
+    Clause WHERE / ORDER BY / LIMIT d'une pagination par clé.
+    Lit limit + 1 lignes pour que l'appelant sache s'il existe une page suivante.
+    """
+    conditions, params = list(conditions), list(params)
+    if after_id is not None:
+        conditions.append(f"{key} > %s")
+        params.append(after_id)
+    clause = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+    clause += f"ORDER BY {key}"
+    if limit is not None:
+        clause += " LIMIT %s"
+        params.append(limit + 1)
+    return clause, tuple(params)
+
+
+def _filtered(filters, after_id=None, limit=None, conditions=(), params=(), alias="",
+              assignments=("AssignedTasks",)):
+    """Comme _keyset, mais avec les filtres et le tri d'un TaskFilters."""
+    filter_conditions, filter_params = filters.where(alias, assignments)
+    conditions = [*conditions, *filter_conditions]
+    params = [*params, *filter_params]
+    cursor, cursor_params, order = filters.keyset(after_id, alias)
+    if cursor:
+        conditions.append(cursor)
+        params += cursor_params
+    clause = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+    clause += f"ORDER BY {order}"
+    if limit is not None:
+        clause += " LIMIT %s"
+        params.append(limit + 1)
+    return clause, tuple(params)
+
+
+def _member_condition(column, member_id, include_archived=False):
+    """Condition « `column` est un projet dont `member_id` est propriétaire ou membre », et ses paramètres."""
+    if include_archived:
+        return [f"{column} IN {MEMBER_PROJECTS_WITH_ARCHIVES}"], [member_id] * 4
+    return [f"{column} IN {MEMBER_PROJECTS}"], [member_id] * 2
+
+
+async def _existing_ids(conn, table, ids):
+    """Sous-ensemble de `ids` présents dans `table`, lu par lots."""
+    found = set()
+    for batch in chunked(ids):
+        rows = await conn.fetch_all(f"SELECT id FROM {table} WHERE id IN {in_clause(batch)}", batch)
+        found.update(row["id"] for row in rows)
+    return found
+
+
+async def _task_states(conn, task_ids):
+    """
+    {id: ligne (project_id, status, due_date)} des tâches existantes parmi
+    `task_ids`, verrouillées jusqu'à la fin de la transaction.
+    """
+    states = {}
+    for batch in chunked(list(task_ids)):
+        rows = await conn.fetch_all(
+            f"SELECT id, project_id, status, due_date FROM Tasks WHERE id IN {in_clause(batch)}{conn.locking_read}",
+            batch,
+        )
+        states.update((row["id"], row) for row in rows)
+    return states
+
+
+async def _assignments(conn, task_ids):
+    """Lignes (task_id, user_id) des assignations des tâches."""
+    rows = []
+    for batch in chunked(list(task_ids)):
+        rows += await conn.fetch_all(
+            f"SELECT task_id, user_id FROM AssignedTasks WHERE task_id IN {in_clause(batch)}", batch
+        )
+    return rows
+
+
+class _StatsDelta:
+    """
+    Variations des compteurs du tableau de bord (ProjectTaskStats,
+    ProjectDueStats, ProjectAssigneeStats) accumulées pendant une transaction
+    d'écriture, puis appliquées par un INSERT multi-lignes par table.
+    """
+
+    def __init__(self):
+        self.status, self.due, self.assignee = Counter(), Counter(), Counter()
+
+    def add(self, task, sign=1):
+        """Compte (ou décompte, sign=-1) une tâche : mapping avec project_id, status, due_date."""
+        self.status[(task["project_id"], task["status"])] += sign
+        if task["due_date"] is not None and task["status"] != DONE_STATUS:
+            self.due[(task["project_id"], task["due_date"])] += sign
+
+    def change(self, old, new):
+        self.add(old, -1)
+        self.add(new)
+
+    def assign(self, project_id, user_id, sign=1):
+        self.assignee[(project_id, user_id)] += sign
+
+    def remove(self, tasks, assignments):
+        """Décompte des tâches supprimées ({id: état}) et de leurs assignations."""
+        for task in tasks.values():
+            self.add(task, -1)
+        for row in assignments:
+            self.assign(tasks[row["task_id"]]["project_id"], row["user_id"], -1)
+
+    async def apply(self, conn):
+        for table, keys, counter in (
+            ("ProjectTaskStats", ("project_id", "status"), self.status),
+            ("ProjectDueStats", ("project_id", "due_date"), self.due),
+            ("ProjectAssigneeStats", ("project_id", "user_id"), self.assignee),
+        ):
+            rows = [(*key, delta) for key, delta in counter.items() if delta]
+            if rows:
+                await conn.increment(table, keys, "tasks", rows)
+
+
+async def _mark_completed(conn, task_ids, rows):
+    """Date de fin des tâches insérées (lignes dans l'ordre de TASK_INSERT_FIELDS) au statut "terminé"."""
+    status = TASK_INSERT_FIELDS.index("status")
+    done = [task_id for task_id, row in zip(task_ids, rows) if row[status] == DONE_STATUS]
+    for batch in chunked(done):
+        await conn.execute(f"UPDATE Tasks SET completed_at = CURRENT_TIMESTAMP WHERE id IN {in_clause(batch)}", batch)
+
+
+def _changes_column(state, changes):
+    """Vrai si `changes` fait passer la tâche (ligne de _task_states) dans une autre colonne."""
+    return "status" in changes and changes["status"] != state["status"]
+
+
+async def _column_end(conn, project_id, status, exclude_id=None):
+    """Rang de la dernière carte de la colonne (lecture d'index), None si elle est vide."""
+    query = "SELECT position FROM Tasks WHERE project_id = %s AND status = %s"
+    params = [project_id, status]
+    if exclude_id is not None:
+        query += " AND id <> %s"
+        params.append(exclude_id)
+    row = await conn.fetch_one(f"{query} ORDER BY position DESC LIMIT 1", params)
+    return row["position"] if row else None
+
+
+def _attach_users(tasks, assignees):
+    """Rattache à chaque tâche ses utilisateurs à partir de lignes (task_id, id, name, email)."""
+    users_by_task = {task["id"]: [] for task in tasks}
+    for row in assignees:
+        users = users_by_task.get(row.pop("task_id"))
+        if users is not None:
+            users.append(row)
+    for task in tasks:
+        task["users"] = users_by_task[task["id"]]
+    return tasks
+
+
+class Repository:
+
+    def __init__(self, db):
+        self.db = db
+
+
+# =========================================================
+# USERS
+# =========================================================
+class UserRepository(Repository):
+
+    async def list(self, after_id=None, limit=None, columns=None):
+        clause, params = _keyset([], [], "id", after_id, limit)
+        return await self.db.fetch_all(
+            f"SELECT {_select(columns, 'id, name, email, role')} FROM Users {clause}", params
+        )
+
+    async def get_many(self, user_ids):
+        users = []
+        async with self.db.acquire() as conn:
+            for batch in chunked(set(user_ids)):
+                users += await conn.fetch_all(
+                    f"SELECT id, name, email, role FROM Users WHERE id IN {in_clause(batch)}", batch
+                )
+        return users
+
+    async def existing_ids(self, user_ids):
+        """Ids des utilisateurs existants parmi `user_ids`."""
+        found = set()
+        async with self.db.acquire() as conn:
+            for batch in chunked(set(user_ids)):
+                rows = await conn.fetch_all(f"SELECT id FROM Users WHERE id IN {in_clause(batch)}", batch)
+                found.update(row["id"] for row in rows)
+        return found
+
+    async def ids_by_email(self, emails):
+        """{email: id} des utilisateurs existants parmi `emails`, lus par lots."""
+        ids = {}
+        async with self.db.acquire() as conn:
+            for batch in chunked(list(set(emails))):
+                rows = await conn.fetch_all(f"SELECT id, email FROM Users WHERE email IN {in_clause(batch)}", batch)
+                ids.update((row["email"], row["id"]) for row in rows)
+        return ids
+
+    async def get_by_email(self, email):
+        return await self.db.fetch_one("SELECT * FROM Users WHERE email = %s", (email,))
+
+    async def create(self, name, email, password_hash, role):
+        async with self.db.transaction() as conn:
+            _, user_id = await conn.execute(
+                "INSERT INTO Users (name, email, password, role) VALUES (%s, %s, %s, %s)",
+                (name, email, password_hash, role),
+            )
+        return user_id
+
+    async def update_password(self, user_id, password_hash):
+        async with self.db.acquire() as conn:
+            await conn.execute("UPDATE Users SET password = %s WHERE id = %s", (password_hash, user_id))
+
+
+# =========================================================
+# PROJECTS
+# =========================================================
+class ProjectRepository(Repository):
+
+    async def list(self, after_id=None, limit=None, columns=None, include_archived=False, member_id=None):
+        """
+        Projets hors statut "archivé" ; tous, archives comprises, avec
+        `include_archived`. Avec `member_id`, seulement ceux dont cet
+        utilisateur est propriétaire ou membre.
+        """
+        conditions, params = ([], []) if include_archived else (["status <> %s"], [ARCHIVED_STATUS])
+        if member_id is not None:
+            member_conditions, member_params = _member_condition("id", member_id, include_archived)
+            conditions, params = conditions + member_conditions, params + member_params
+        clause, params = _keyset(conditions, params, "id", after_id, limit)
+        return await self.db.fetch_all(
+            f"SELECT {_select(columns)} FROM {_source('Projects', include_archived)} {clause}", params
+        )
+
+    async def get(self, project_id, include_archived=False):
+        project = await self.db.fetch_one("SELECT * FROM Projects WHERE id = %s", (project_id,))
+        if project is None and include_archived:
+            project = await self.db.fetch_one("SELECT * FROM ArchivedProjects WHERE id = %s", (project_id,))
+        return project
+
+    def stream(self, conditions=(), params=(), columns=None, member_id=None):
+        """
+        Tous les projets correspondant aux conditions, par lots (export) ;
+        avec `member_id`, seulement ceux dont cet utilisateur est propriétaire ou membre.
+        """
+        if member_id is not None:
+            conditions, params = [*conditions, f"id IN {MEMBER_PROJECTS}"], [*params, member_id, member_id]
+        clause, params = _keyset(conditions, params, "id", None, None)
+        return self.db.stream(f"SELECT {_select(columns)} FROM Projects {clause}", params)
+
+    async def list_for_user(self, user_id, after_id=None, limit=None, columns=None, include_archived=False):
+        """
+        Projets possédés ou partagés : union de deux lectures d'index
+        (Projects.owner_id, ProjectUsers.user_id) plutôt qu'un OR sur une jointure.
+        Le curseur est appliqué dans chaque branche pour ne lire que la page.
+        Les projets "archivé" n'en font partie qu'avec `include_archived`, qui
+        ajoute les mêmes lectures sur les archives.
+        """
+        params = [user_id]
+        owned, shared = "owner_id = %s", "user_id = %s"
+        if after_id is not None:
+            owned += " AND id > %s"
+            shared += " AND project_id > %s"
+            params = [user_id, after_id]
+        if not include_archived:
+            clause, page_params = _keyset(["p.status <> %s"], [ARCHIVED_STATUS], "p.id", None, limit)
+            query = f"""
+            SELECT {_select(columns, "p.*", alias="p.")}
+            FROM (
+                SELECT id AS project_id FROM Projects WHERE {owned}
+                UNION
+                SELECT project_id FROM ProjectUsers WHERE {shared}
+            ) m
+            JOIN Projects p ON p.id = m.project_id
+            {clause}
+            """
+            return await self.db.fetch_all(query, (*params, *params, *page_params))
+        # Les mêmes lectures d'index sur les archives, dans chacune des deux branches de la réunion
+        members = f"""id IN (
+            SELECT id FROM Projects WHERE {owned}
+            UNION SELECT project_id FROM ProjectUsers WHERE {shared}
+            UNION SELECT id FROM ArchivedProjects WHERE {owned}
+            UNION SELECT project_id FROM ArchivedProjectUsers WHERE {shared}
+        )"""
+        clause, page_params = _keyset([], [], "p.id", None, limit)
+        query = f"SELECT {_select(columns, 'p.*', alias='p.')} FROM {_source('Projects', True, 'p', members)} {clause}"
+        return await self.db.fetch_all(query, (*(params * 8), *page_params))
+
+    async def access(self, project_id, user_id, include_archived=False):
+        """
+        Accès de l'utilisateur au projet : "owner", le rôle de membre
+        ("owner", "editor", "viewer"), "none", ou None si le projet n'existe pas
+        (ou n'est plus qu'en archive, sauf avec `include_archived`).
+        """
+        query = """
+            SELECT p.owner_id, pu.role
+            FROM {projects} p
+            LEFT JOIN {members} pu ON pu.project_id = p.id AND pu.user_id = %s
+            WHERE p.id = %s
+        """
+        row = await self.db.fetch_one(query.format(projects="Projects", members="ProjectUsers"), (user_id, project_id))
+        if row is None and include_archived:
+            row = await self.db.fetch_one(
+                query.format(projects="ArchivedProjects", members="ArchivedProjectUsers"), (user_id, project_id)
+            )
+        if row is None:
+            return None
+        if row["owner_id"] == user_id:
+            return "owner"
+        return row["role"] or "none"
+
+    async def create(self, project, owner_id):
+        query = """
+        INSERT INTO Projects (name, description, start_date, end_date, status, owner_id)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        """
+        values = (
+            project.name,
+            project.description,
+            project.start_date,
+            project.end_date,
+            project.status,
+            owner_id,
+        )
+        async with self.db.transaction() as conn:
+            _, project_id = await conn.execute(query, values)
+        return project_id
+
+    async def update(self, project_id, changes, version=None):
+        """
+        Retourne le projet mis à jour, ou None s'il n'existe pas.
+        Lève VersionConflict s'il n'est plus dans la version attendue.
+        """
+        set_clause, values = _set_clause(changes, PROJECT_UPDATABLE_FIELDS)
+        async with self.db.transaction() as conn:
+            return await _update_versioned(conn, "Projects", project_id, set_clause, values, version)
+
+    async def delete(self, project_id):
+        """Supprime le projet et, faute de clé étrangère vers Projects, ses tâches archivées."""
+        async with self.db.transaction() as conn:
+            await conn.execute("DELETE FROM Projects WHERE id = %s", (project_id,))
+            await conn.execute(
+                "DELETE FROM ArchivedAssignedTasks "
+                "WHERE task_id IN (SELECT id FROM ArchivedTasks WHERE project_id = %s)",
+                (project_id,),
+            )
+            await conn.execute("DELETE FROM ArchivedTasks WHERE project_id = %s", (project_id,))
+
+
+# =========================================================
+# PROJECT USERS
+# =========================================================
+class ProjectUserRepository(Repository):
+
+    async def list(self, project_id):
+        return await self.db.fetch_all("SELECT * FROM ProjectUsers WHERE project_id = %s", (project_id,))
+
+    async def add(self, project_id, user_id, role):
+        """Faux si l'utilisateur est déjà membre du projet."""
+        async with self.db.transaction() as conn:
+            if await conn.fetch_one(
+                "SELECT 1 FROM ProjectUsers WHERE project_id = %s AND user_id = %s", (project_id, user_id)
+            ):
+                return False
+            await conn.execute(
+                "INSERT INTO ProjectUsers (project_id, user_id, role) VALUES (%s, %s, %s)",
+                (project_id, user_id, role),
+            )
+        return True
+
+    async def member_ids(self, project_id):
+        """Propriétaire et membres du projet."""
+        rows = await self.db.fetch_all("""
+            SELECT owner_id AS user_id FROM Projects WHERE id = %s AND owner_id IS NOT NULL
+            UNION
+            SELECT user_id FROM ProjectUsers WHERE project_id = %s
+        """, (project_id, project_id))
+        return [row["user_id"] for row in rows]
+
+    async def remove(self, project_id, user_id):
+        async with self.db.transaction() as conn:
+            await conn.execute(
+                "DELETE FROM ProjectUsers WHERE project_id = %s AND user_id = %s",
+                (project_id, user_id),
+            )
+
+
+# =========================================================
+# TASKS
+# =========================================================
+class TaskRepository(Repository):
+
+    async def list(self, filters=None, after_id=None, limit=None, columns=None, include_archived=False,
+                   member_id=None):
+        """Tâches, des seuls projets dont `member_id` est propriétaire ou membre s'il est donné."""
+        conditions, params = [], []
+        if member_id is not None:
+            conditions, params = _member_condition("project_id", member_id, include_archived)
+        if filters is None:
+            clause, params = _keyset(conditions, params, "id", after_id, limit)
+        else:
+            clause, params = _filtered(filters, after_id, limit, conditions, params,
+                                       assignments=_assignment_tables(include_archived))
+        return await self.db.fetch_all(
+            f"SELECT {_select(columns)} FROM {_source('Tasks', include_archived)} {clause}", params
+        )
+
+    def stream(self, filters, conditions=(), params=(), columns=None, member_id=None):
+        """
+        Toutes les tâches correspondant aux filtres, par lots (export) ; avec
+        `member_id`, seulement celles des projets dont cet utilisateur est
+        propriétaire ou membre.
+        """
+        if member_id is not None:
+            conditions, params = [*conditions, f"project_id IN {MEMBER_PROJECTS}"], [*params, member_id, member_id]
+        clause, params = _filtered(filters, conditions=conditions, params=params)
+        return self.db.stream(f"SELECT {_select(columns)} FROM Tasks {clause}", params)
+
+    async def list_by_project(self, project_id, filters=None, include_archived=False):
+        """
+        Tâches du projet, chacune avec la liste de ses utilisateurs assignés.
+        Deux requêtes quel que soit le nombre de tâches. Sans tri demandé, les
+        tâches viennent colonne par colonne, dans l'ordre des cartes.
+        `include_archived` y ajoute les tâches archivées, sur le même index.
+        """
+        assignments = _assignment_tables(include_archived)
+        if filters is not None and not filters.default_order:
+            clause, params = _filtered(
+                filters, conditions=["project_id = %s"], params=[project_id], assignments=assignments
+            )
+        else:
+            conditions, params = filters.where(assignments=assignments) if filters is not None else ([], [])
+            clause = f"WHERE {' AND '.join(['project_id = %s', *conditions])} ORDER BY {BOARD_ORDER}"
+            params = (project_id, *params)
+        async with self.db.acquire() as conn:
+            tasks = await conn.fetch_all(f"SELECT * FROM {_source('Tasks', include_archived)} {clause}", params)
+            query = """
+                SELECT a.task_id, u.id, u.name, u.email, u.role
+                FROM {assignments} a
+                JOIN {tasks} t ON t.id = a.task_id
+                JOIN Users u ON u.id = a.user_id
+                WHERE t.project_id = %s
+            """
+            tables = [("AssignedTasks", "Tasks")]
+            if include_archived:
+                tables.append(("ArchivedAssignedTasks", "ArchivedTasks"))
+            assignees = await conn.fetch_all(
+                " UNION ALL ".join(query.format(assignments=a, tasks=t) for a, t in tables), (project_id,) * len(tables)
+            )
+        return _attach_users(tasks, assignees)
+
+    async def create(self, task):
+        """
+        Crée la tâche en fin de colonne, compteurs compris. Retourne la ligne
+        enregistrée : rang, dates et version posés par la base.
+        """
+        query = f"""
+        INSERT INTO Tasks (title, description, due_date, status, priority, project_id, position, completed_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, {'CURRENT_TIMESTAMP' if task.status == DONE_STATUS else 'NULL'})
+        """
+        async with self.db.transaction() as conn:
+            position = rank_between(await _column_end(conn, task.project_id, task.status), None)
+            values = (
+                task.title,
+                task.description,
+                task.due_date,
+                task.status,
+                task.priority,
+                task.project_id,
+                position,
+            )
+            if conn.supports_returning:
+                row = await conn.fetch_one(f"{query} RETURNING *", values)
+            else:
+                _, task_id = await conn.execute(query, values)
+                row = await conn.fetch_one("SELECT * FROM Tasks WHERE id = %s", (task_id,))
+            stats = _StatsDelta()
+            stats.add(task.model_dump())
+            await stats.apply(conn)
+        return row
+
+    async def update(self, task_id, changes, version=None):
+        """
+        Retourne la tâche mise à jour, ou None si elle n'existe pas.
+        Lève VersionConflict si elle n'est plus dans la version attendue.
+        """
+        async with self.db.transaction() as conn:
+            # Ancien état lu seulement si les compteurs ou le rang en dépendent
+            old = await _task_states(conn, [task_id]) if STATS_FIELDS & changes.keys() else {}
+            if task_id in old and _changes_column(old[task_id], changes):
+                # En fin de la colonne d'arrivée : sinon ex aequo avec l'une de ses cartes
+                end = await _column_end(conn, old[task_id]["project_id"], changes["status"])
+                changes = {**changes, "position": rank_between(end, None)}
+            set_clause, values = _task_set_clause(changes)
+            task = await _update_versioned(conn, "Tasks", task_id, set_clause, values, version)
+            if task is not None and old:
+                stats = _StatsDelta()
+                stats.change(old[task_id], task)
+                await stats.apply(conn)
+            return task
+
+    async def move(self, task_id, project_id, status, after_id=None, before_id=None, version=None):
+        """
+        Place la tâche dans la colonne `status`, juste après la carte `after_id`
+        et/ou juste avant `before_id` (en fin de colonne sans l'une ni l'autre).
+        Seule la ligne déplacée est modifiée : son rang est pris entre ceux de
+        ses nouveaux voisins. Retourne la tâche, None si elle n'existe pas ;
+        lève VersionConflict, ou RankError si les voisins ne sont pas (ou plus)
+        dans cette colonne ou sont ex aequo.
+        """
+        async with self.db.transaction() as conn:
+            # La tâche (état avant déplacement) et ses voisins en une lecture
+            neighbours = [i for i in (after_id, before_id) if i is not None]
+            ids = [task_id, *neighbours]
+            rows = await conn.fetch_all(
+                f"SELECT id, project_id, status, due_date, position FROM Tasks "
+                f"WHERE project_id = %s AND id IN {in_clause(ids)}{conn.locking_read}",
+                (project_id, *ids),
+            )
+            rows = {row["id"]: row for row in rows}
+            old = rows.pop(task_id, None)
+            if old is None:
+                return None
+            positions = {i: row["position"] for i, row in rows.items() if row["status"] == status}
+            if len(positions) < len(set(neighbours)):
+                raise RankError("voisin absent de la colonne")
+            low, high = positions.get(after_id), positions.get(before_id)
+            if before_id is None and after_id is not None:
+                row = await conn.fetch_one(
+                    "SELECT position FROM Tasks WHERE project_id = %s AND status = %s AND position > %s "
+                    "AND id <> %s ORDER BY position LIMIT 1",
+                    (project_id, status, low, task_id),
+                )
+                high = row["position"] if row else None
+            elif after_id is None and before_id is not None:
+                row = await conn.fetch_one(
+                    "SELECT position FROM Tasks WHERE project_id = %s AND status = %s AND position < %s "
+                    "AND id <> %s ORDER BY position DESC LIMIT 1",
+                    (project_id, status, high, task_id),
+                )
+                low = row["position"] if row else None
+            elif after_id is None:
+                low = await _column_end(conn, project_id, status, exclude_id=task_id)
+            position = rank_between(low, high)
+            task = await _update_versioned(
+                conn, "Tasks", task_id, f"status = %s, position = %s, {_completion(status)}", [status, position],
+                version,
+            )
+            if task is not None and old["status"] != status:
+                stats = _StatsDelta()
+                stats.change(old, task)
+                await stats.apply(conn)
+            return task
+
+    async def rebalance(self, project_id, status):
+        """Renumérote les rangs d'une colonne dans son ordre actuel : rangs courts, sans ex aequo."""
+        async with self.db.transaction() as conn:
+            rows = await conn.fetch_all(
+                "SELECT id FROM Tasks WHERE project_id = %s AND status = %s ORDER BY position, id",
+                (project_id, status),
+            )
+            await conn.execute_many(
+                "UPDATE Tasks SET position = %s WHERE id = %s",
+                [(position, row["id"]) for position, row in zip(ranks_between(len(rows)), rows)],
+            )
+
+    async def delete(self, task_id):
+        """Retourne le projet de la tâche supprimée, ou None si elle n'existait pas."""
+        async with self.db.transaction() as conn:
+            tasks = await _task_states(conn, [task_id])
+            if not tasks:
+                return None
+            assignments = await _assignments(conn, [task_id])
+            await conn.execute("DELETE FROM Tasks WHERE id = %s", (task_id,))
+            stats = _StatsDelta()
+            stats.remove(tasks, assignments)
+            await stats.apply(conn)
+        return tasks[task_id]["project_id"]
+
+    async def project_map(self, task_ids):
+        """{task_id: project_id} pour les tâches existantes parmi `task_ids`."""
+        found = {}
+        async with self.db.acquire() as conn:
+            for batch in chunked(set(task_ids)):
+                rows = await conn.fetch_all(
+                    f"SELECT id, project_id FROM Tasks WHERE id IN {in_clause(batch)}", batch
+                )
+                found.update((row["id"], row["project_id"]) for row in rows)
+        return found
+
+    async def bulk(self, creates, updates, deletes):
+        """
+        Créations, modifications et suppressions en une seule transaction :
+        INSERT multi-lignes, un UPDATE ... WHERE id IN (...) par jeu de
+        modifications identique (cas du déplacement de colonne) et un DELETE
+        ... WHERE id IN (...). Une modification accompagnée de sa version
+        attendue est appliquée seule et signalée "conflict" si la tâche a changé.
+        Modifications et suppressions portent sur des tâches existant avant la
+        requête ; une tâche changée de colonne passe en fin de celle-ci, après
+        les créations, dans l'ordre de la requête. Retourne un résultat par élément ; les compteurs du tableau de
+        bord suivent l'état de chaque tâche au fil des écritures.
+        """
+        results, stats = [], _StatsDelta()
+        async with self.db.transaction() as conn:
+            project_ids = {task.project_id for task in creates}
+            known_projects = await _existing_ids(conn, "Projects", project_ids)
+            touched_ids = {task.id for task in updates} | set(deletes)
+            known_tasks = await _task_states(conn, touched_ids)
+
+            rows, row_indexes, column_ends = [], [], {}
+            for index, task in enumerate(creates):
+                if task.project_id not in known_projects:
+                    results.append({"action": "create", "index": index, "status": "invalid",
+                                    "detail": "Projet non trouvé"})
+                    continue
+                # En fin de colonne, dans l'ordre de la requête
+                column = (task.project_id, task.status)
+                if column not in column_ends:
+                    column_ends[column] = await _column_end(conn, *column)
+                column_ends[column] = rank_between(column_ends[column], None)
+                rows.append((*(getattr(task, f) for f in TASK_INSERT_FIELDS), column_ends[column]))
+                row_indexes.append(index)
+                stats.add(task.model_dump())
+            task_ids = await conn.insert_many("Tasks", (*TASK_INSERT_FIELDS, "position"), rows)
+            await _mark_completed(conn, task_ids, rows)
+            for index, task_id in zip(row_indexes, task_ids):
+                results.append({"action": "create", "index": index, "id": task_id, "status": "created"})
+
+            groups, moved = {}, []
+            for index, task in enumerate(updates):
+                changes = {f: v for f, v in task.model_dump(exclude_none=True).items() if f in TASK_UPDATABLE_FIELDS}
+                if task.id not in known_tasks:
+                    results.append({"action": "update", "index": index, "id": task.id, "status": "not_found"})
+                elif not changes:
+                    results.append({"action": "update", "index": index, "id": task.id, "status": "invalid",
+                                    "detail": "Aucun champ à mettre à jour"})
+                elif task.version is not None:
+                    # Version attendue : UPDATE conditionnel propre à la tâche
+                    if _changes_column(known_tasks[task.id], changes):
+                        changes["position"] = await self._column_rank(conn, column_ends, known_tasks[task.id],
+                                                                      changes["status"])
+                    set_clause, values = _task_set_clause(changes)
+                    updated, _ = await conn.execute(
+                        f"UPDATE Tasks SET {set_clause}, version = version + 1 WHERE id = %s AND version = %s",
+                        (*values, task.id, task.version),
+                    )
+                    results.append({"action": "update", "index": index, "id": task.id,
+                                    "status": "updated" if updated else "conflict"})
+                    if updated:
+                        self._track(stats, known_tasks, task.id, changes)
+                else:
+                    groups.setdefault(tuple(sorted(changes.items())), []).append((index, task.id))
+                    if _changes_column(known_tasks[task.id], changes):
+                        # Rang propre à chaque tâche : écrit après l'UPDATE groupé
+                        position = await self._column_rank(conn, column_ends, known_tasks[task.id], changes["status"])
+                        moved.append((position, task.id))
+            for changes, items in groups.items():
+                set_clause, values = _task_set_clause(dict(changes))
+                for batch in chunked([task_id for _, task_id in items]):
+                    await conn.execute(
+                        f"UPDATE Tasks SET {set_clause}, version = version + 1 WHERE id IN {in_clause(batch)}",
+                        (*values, *batch),
+                    )
+                for index, task_id in items:
+                    results.append({"action": "update", "index": index, "id": task_id, "status": "updated"})
+                    self._track(stats, known_tasks, task_id, dict(changes))
+            if moved:
+                await conn.execute_many("UPDATE Tasks SET position = %s WHERE id = %s", moved)
+
+            deleted = [task_id for task_id in dict.fromkeys(deletes) if task_id in known_tasks]
+            stats.remove({task_id: known_tasks[task_id] for task_id in deleted}, await _assignments(conn, deleted))
+            for batch in chunked(deleted):
+                await conn.execute(f"DELETE FROM Tasks WHERE id IN {in_clause(batch)}", batch)
+            await stats.apply(conn)
+            for index, task_id in enumerate(deletes):
+                status = "deleted" if task_id in known_tasks else "not_found"
+                results.append({"action": "delete", "index": index, "id": task_id, "status": status})
+        order = {"create": 0, "update": 1, "delete": 2}
+        return sorted(results, key=lambda r: (order[r["action"]], r["index"]))
+
+    @staticmethod
+    async def _column_rank(conn, column_ends, state, status):
+        """Rang suivant la fin de la colonne (project_id de `state`, `status`), tenue dans `column_ends`."""
+        column = (state["project_id"], status)
+        if column not in column_ends:
+            column_ends[column] = await _column_end(conn, *column)
+        column_ends[column] = rank_between(column_ends[column], None)
+        return column_ends[column]
+
+    @staticmethod
+    def _track(stats, states, task_id, changes):
+        """Reporte une modification appliquée sur l'état connu de la tâche et sur les compteurs."""
+        new = {**states[task_id], **changes}
+        stats.change(states[task_id], new)
+        states[task_id] = new
+
+
+# =========================================================
+# ASSIGNED TASKS
+# =========================================================
+class AssignmentRepository(Repository):
+
+    async def list(self, after=None, limit=None, columns=None, member_id=None):
+        """
+        Paginé sur la clé primaire (task_id, user_id). `after` vaut None, ou un
+        couple (task_id, user_id) dont user_id peut être None pour sauter toute la tâche.
+        Avec `member_id`, seulement les tâches des projets de cet utilisateur.
+        """
+        conditions, params = [], []
+        if member_id is not None:
+            member_conditions, params = _member_condition("project_id", member_id)
+            conditions.append(f"task_id IN (SELECT id FROM Tasks WHERE {member_conditions[0]})")
+        if after is not None and after[1] is None:
+            conditions.append("task_id > %s")
+            params.append(after[0])
+        elif after is not None:
+            conditions.append("(task_id > %s OR (task_id = %s AND user_id > %s))")
+            params += [after[0], after[0], after[1]]
+        clause = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        clause += "ORDER BY task_id, user_id"
+        if limit is not None:
+            clause += " LIMIT %s"
+            params.append(limit + 1)
+        return await self.db.fetch_all(f"SELECT {_select(columns)} FROM AssignedTasks {clause}", tuple(params))
+
+    async def users_for_task(self, task_id):
+        return await self.db.fetch_all("""
+            SELECT u.id, u.name, u.email
+            FROM Users u
+            JOIN AssignedTasks a ON u.id = a.user_id
+            WHERE a.task_id = %s
+        """, (task_id,))
+
+    async def replace(self, task_id, user_ids):
+        """Remplace les assignés d'une tâche ; retourne {"added": [...], "removed": [...]}."""
+        return (await self.replace_many([task_id], user_ids))[task_id]
+
+    async def replace_many(self, task_ids, user_ids):
+        """
+        Donne à chaque tâche exactement `user_ids` comme assignés. Seul l'écart
+        avec l'existant est écrit, en une transaction : un DELETE et un INSERT
+        multi-lignes par lot, rien du tout si les assignés n'ont pas changé.
+        Les tâches et leurs assignations sont verrouillées à la lecture : deux
+        remplacements concurrents sur une tâche s'appliquent l'un après l'autre.
+        """
+        task_ids = list(dict.fromkeys(task_ids))
+        wanted = set(user_ids)
+        async with self.db.transaction() as conn:
+            current, projects = {task_id: set() for task_id in task_ids}, {}
+            for batch in chunked(task_ids):
+                rows = await conn.fetch_all(f"""
+                    SELECT t.id AS task_id, t.project_id, a.user_id
+                    FROM Tasks t
+                    LEFT JOIN AssignedTasks a ON a.task_id = t.id
+                    WHERE t.id IN {in_clause(batch)}{conn.locking_read}
+                """, batch)
+                for row in rows:
+                    projects[row["task_id"]] = row["project_id"]
+                    if row["user_id"] is not None:
+                        current[row["task_id"]].add(row["user_id"])
+
+            diff, to_delete, to_insert, stats = {}, [], [], _StatsDelta()
+            for task_id in task_ids:
+                added = sorted(wanted - current[task_id])
+                removed = sorted(current[task_id] - wanted)
+                diff[task_id] = {"added": added, "removed": removed}
+                to_insert += [(task_id, user_id) for user_id in added]
+                to_delete += [(task_id, user_id) for user_id in removed]
+                if task_id in projects:
+                    for user_id in added:
+                        stats.assign(projects[task_id], user_id)
+                    for user_id in removed:
+                        stats.assign(projects[task_id], user_id, -1)
+
+            deleted = 0
+            for batch in chunked(to_delete):
+                pairs = ", ".join(["(%s, %s)"] * len(batch))
+                count, _ = await conn.execute(
+                    f"DELETE FROM AssignedTasks WHERE (task_id, user_id) IN ({pairs})",
+                    [value for pair in batch for value in pair],
+                )
+                deleted += count
+            await conn.insert_many("AssignedTasks", ("task_id", "user_id"), to_insert, with_ids=False)
+            if deleted == len(to_delete):
+                await stats.apply(conn)
+            else:
+                # Assignations retirées hors de ce verrou : compteurs recomptés plutôt que décrémentés
+                await _reconcile(conn, sorted(set(projects.values())), True)
+        return diff
+
+
+# =========================================================
+# STATS
+# =========================================================
+class StatsRepository(Repository):
+
+    async def for_projects(self, project_ids, today):
+        """
+        {project_id: tableau de bord} lu dans les compteurs, jamais dans Tasks :
+        tâches par statut, avancement (% terminé), tâches non terminées dont
+        l'échéance est passée à la date `today`, tâches par assigné.
+        """
+        stats = {
+            project_id: {"project_id": project_id, "total": 0, "by_status": dict.fromkeys(TASK_STATUSES, 0),
+                         "progress": 0.0, "overdue": 0, "by_assignee": []}
+            for project_id in project_ids
+        }
+        async with self.db.acquire() as conn:
+            for batch in chunked(list(stats)):
+                projects = in_clause(batch)
+                rows = await conn.fetch_all(
+                    f"SELECT project_id, status, tasks FROM ProjectTaskStats WHERE project_id IN {projects}", batch
+                )
+                for row in rows:
+                    stats[row["project_id"]]["by_status"][row["status"]] = row["tasks"]
+                rows = await conn.fetch_all(f"""
+                    SELECT project_id, SUM(tasks) AS tasks FROM ProjectDueStats
+                    WHERE project_id IN {projects} AND due_date < %s
+                    GROUP BY project_id
+                """, (*batch, today))
+                for row in rows:
+                    stats[row["project_id"]]["overdue"] = int(row["tasks"])
+                rows = await conn.fetch_all(f"""
+                    SELECT s.project_id, s.user_id, u.name, s.tasks
+                    FROM ProjectAssigneeStats s
+                    JOIN Users u ON u.id = s.user_id
+                    WHERE s.project_id IN {projects} AND s.tasks > 0
+                    ORDER BY s.tasks DESC, s.user_id
+                """, batch)
+                for row in rows:
+                    stats[row.pop("project_id")]["by_assignee"].append(row)
+        for project in stats.values():
+            total = project["total"] = sum(project["by_status"].values())
+            project["progress"] = round(100 * project["by_status"][DONE_STATUS] / total, 1) if total else 0.0
+        return stats
+
+    async def for_project(self, project_id, today):
+        return (await self.for_projects([project_id], today))[project_id]
+
+    async def project_ids(self, after_id=None, limit=None):
+        """Ids des projets dotés de compteurs (tables chaudes), par page."""
+        clause, params = _keyset([], [], "id", after_id, limit)
+        return [row["id"] for row in await self.db.fetch_all(f"SELECT id FROM Projects {clause}", params)]
+
+    async def reconcile(self, project_ids, fix=True):
+        """
+        Recalcule depuis les tâches et les assignations (archivées comprises)
+        les compteurs des projets et les compare aux compteurs maintenus.
+        Retourne les écarts [(table, clé, attendu, trouvé)] ; avec `fix`, les
+        compteurs en écart sont remplacés par les valeurs recalculées, dans la
+        même transaction.
+        """
+        async with self.db.transaction() as conn:
+            return await _reconcile(conn, project_ids, fix)
+
+
+async def _reconcile(conn, project_ids, fix):
+    """StatsRepository.reconcile dans la transaction de l'appelant."""
+    projects = in_clause(project_ids)
+    counters = (
+        ("ProjectTaskStats", ("project_id", "status"), f"""
+            SELECT project_id, status, COUNT(*) AS tasks FROM {{tasks}}
+            WHERE project_id IN {projects}
+            GROUP BY project_id, status
+        """, project_ids),
+        ("ProjectDueStats", ("project_id", "due_date"), f"""
+            SELECT project_id, due_date, COUNT(*) AS tasks FROM {{tasks}}
+            WHERE project_id IN {projects} AND status <> %s AND due_date IS NOT NULL
+            GROUP BY project_id, due_date
+        """, (*project_ids, DONE_STATUS)),
+        ("ProjectAssigneeStats", ("project_id", "user_id"), f"""
+            SELECT t.project_id, a.user_id, COUNT(*) AS tasks
+            FROM {{assignments}} a
+            JOIN {{tasks}} t ON t.id = a.task_id
+            WHERE t.project_id IN {projects}
+            GROUP BY t.project_id, a.user_id
+        """, project_ids),
+    )
+    drift = []
+    for table, keys, query, params in counters:
+        # Les tâches archivées restent comptées : une requête par niveau, sommées ici
+        expected = Counter()
+        for tasks, assignments in (("Tasks", "AssignedTasks"), ("ArchivedTasks", "ArchivedAssignedTasks")):
+            rows = await conn.fetch_all(
+                f"{query.format(tasks=tasks, assignments=assignments)}{conn.locking_read}", params
+            )
+            expected.update({tuple(row[k] for k in keys): row["tasks"] for row in rows})
+        rows = await conn.fetch_all(
+            f"SELECT {', '.join(keys)}, tasks FROM {table} WHERE project_id IN {projects}{conn.locking_read}",
+            project_ids,
+        )
+        found = {tuple(row[k] for k in keys): row["tasks"] for row in rows}
+        table_drift = [
+            (table, key, expected.get(key, 0), found.get(key, 0))
+            for key in sorted(expected.keys() | found.keys())
+            if expected.get(key, 0) != found.get(key, 0)
+        ]
+        if fix and table_drift:
+            await conn.execute(f"DELETE FROM {table} WHERE project_id IN {projects}", project_ids)
+            await conn.insert_many(
+                table, (*keys, "tasks"), [(*key, count) for key, count in expected.items()], with_ids=False
+            )
+        drift += table_drift
+    return drift
+
+
+# =========================================================
+# IMPORTS
+# =========================================================
+class ImportRepository(Repository):
+
+    async def create(self, user_id, checksum, total):
+        async with self.db.transaction() as conn:
+            _, job_id = await conn.execute(
+                "INSERT INTO ImportJobs (user_id, checksum, total) VALUES (%s, %s, %s)",
+                (user_id, checksum, total),
+            )
+        return job_id
+
+    async def get(self, job_id):
+        return await self.db.fetch_one("SELECT * FROM ImportJobs WHERE id = %s", (job_id,))
+
+    async def set_status(self, job_id, status, error=None):
+        async with self.db.acquire() as conn:
+            await conn.execute(
+                "UPDATE ImportJobs SET status = %s, error = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s",
+                (status, error, job_id),
+            )
+
+    async def import_chunk(self, job_id, projects, owner_id, user_ids):
+        """
+        Écrit un lot de projets avec leurs membres, tâches et assignations par
+        INSERT multi-lignes, et avance la progression du job dans la même
+        transaction : après un échec, `done` compte exactement les projets en base.
+        """
+        async with self.db.transaction() as conn:
+            project_ids = await conn.insert_many(
+                "Projects", (*PROJECT_UPDATABLE_FIELDS, "owner_id"),
+                [(*(getattr(project, f) for f in PROJECT_UPDATABLE_FIELDS), owner_id) for project in projects],
+            )
+            members, tasks, assignees, stats = [], [], [], _StatsDelta()
+            for project, project_id in zip(projects, project_ids):
+                members += [(project_id, user_ids[member.email], member.role) for member in project.members]
+                column_ends = {}  # projet neuf : cartes dans l'ordre de l'archive
+                for task in project.tasks:
+                    column_ends[task.status] = rank_between(column_ends.get(task.status), None)
+                    tasks.append((*(getattr(task, f) for f in TASK_INSERT_FIELDS[:-1]), project_id,
+                                  column_ends[task.status]))
+                    assignees.append(task.assignees)
+                    stats.add({"project_id": project_id, "status": task.status, "due_date": task.due_date})
+                    for email in task.assignees:
+                        stats.assign(project_id, user_ids[email])
+            await conn.insert_many("ProjectUsers", ("project_id", "user_id", "role"), members, with_ids=False)
+            task_ids = await conn.insert_many("Tasks", (*TASK_INSERT_FIELDS, "position"), tasks)
+            await _mark_completed(conn, task_ids, tasks)
+            await conn.insert_many(
+                "AssignedTasks", ("task_id", "user_id"),
+                [(task_id, user_ids[email]) for task_id, emails in zip(task_ids, assignees) for email in emails],
+                with_ids=False,
+            )
+            await stats.apply(conn)
+            await conn.execute(
+                "UPDATE ImportJobs SET done = done + %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s",
+                (len(projects), job_id),
+            )
+        return project_ids
+
+
+# =========================================================
+# ARCHIVES
+# =========================================================
+class ArchiveRepository(Repository):
+    """
+    Déplacement vers les tables Archived* (mêmes colonnes, mêmes ids) des
+    projets "archivé" et des tâches terminées depuis longtemps, par lots d'une
+    transaction, et restauration. Une tâche archivée reste comptée dans les
+    compteurs de son projet ; un projet archivé perd les siens (clé étrangère),
+    recalculés à la restauration.
+    """
+
+    async def archivable_projects(self, limit):
+        rows = await self.db.fetch_all(
+            "SELECT id FROM Projects WHERE status = %s ORDER BY id LIMIT %s", (ARCHIVED_STATUS, limit)
+        )
+        return [row["id"] for row in rows]
+
+    async def archivable_tasks(self, completed_before, limit):
+        rows = await self.db.fetch_all(
+            f"SELECT id FROM Tasks WHERE {ARCHIVABLE_TASKS} LIMIT %s",
+            (DONE_STATUS, completed_before, completed_before, limit),
+        )
+        return [row["id"] for row in rows]
+
+    async def archive_projects(self, project_ids):
+        """
+        Archive les projets encore au statut "archivé" parmi `project_ids`, avec
+        leurs membres, tâches et assignations. Retourne {project_id: [ids du
+        propriétaire et des membres]} des projets archivés.
+        """
+        async with self.db.transaction() as conn:
+            rows = await conn.fetch_all(
+                f"SELECT id, owner_id FROM Projects WHERE id IN {in_clause(project_ids)} AND status = %s"
+                f"{conn.locking_read}",
+                (*project_ids, ARCHIVED_STATUS),
+            )
+            members = {row["id"]: {row["owner_id"]} - {None} for row in rows}
+            if not members:
+                return {}
+            ids = list(members)
+            projects = in_clause(ids)
+            rows = await conn.fetch_all(
+                f"SELECT project_id, user_id FROM ProjectUsers WHERE project_id IN {projects}", ids
+            )
+            for row in rows:
+                members[row["project_id"]].add(row["user_id"])
+            # Tâches verrouillées : aucune modification ne peut se perdre entre la copie et la suppression
+            await conn.fetch_all(f"SELECT id FROM Tasks WHERE project_id IN {projects}{conn.locking_read}", ids)
+            tasks = f"task_id IN (SELECT id FROM Tasks WHERE project_id IN {projects})"
+            for table, condition in (("Projects", f"id IN {projects}"), ("ProjectUsers", f"project_id IN {projects}"),
+                                     ("Tasks", f"project_id IN {projects}"), ("AssignedTasks", tasks)):
+                await _copy(conn, table, f"Archived{table}", ARCHIVE_COLUMNS[table], condition, ids)
+            # Membres, tâches, assignations et compteurs suivent en cascade
+            await conn.execute(f"DELETE FROM Projects WHERE id IN {projects}", ids)
+        return {project_id: sorted(users) for project_id, users in members.items()}
+
+    async def archive_tasks(self, task_ids, completed_before):
+        """
+        Archive les tâches de `task_ids` toujours archivables, avec leurs
+        assignations ; les compteurs ne changent pas. Retourne les projets
+        concernés et le nombre de tâches effectivement archivées.
+        """
+        archived = 0
+        async with self.db.transaction() as conn:
+            rows = await conn.fetch_all(
+                f"SELECT id, project_id FROM Tasks WHERE id IN {in_clause(task_ids)} AND {ARCHIVABLE_TASKS}"
+                f"{conn.locking_read}",
+                (*task_ids, DONE_STATUS, completed_before, completed_before),
+            )
+            ids = [row["id"] for row in rows]
+            if ids:
+                tasks = in_clause(ids)
+                await _copy(conn, "Tasks", "ArchivedTasks", ARCHIVE_COLUMNS["Tasks"], f"id IN {tasks}", ids)
+                await _copy(conn, "AssignedTasks", "ArchivedAssignedTasks", ARCHIVE_COLUMNS["AssignedTasks"],
+                            f"task_id IN {tasks}", ids)
+                archived, _ = await conn.execute(f"DELETE FROM Tasks WHERE id IN {tasks}", ids)
+        return {row["project_id"] for row in rows}, archived
+
+    async def restore_project(self, project_id, completed_before):
+        """
+        Ramène le projet (repassé au statut "actif"), ses membres et ses tâches
+        dans les tables chaudes, et recalcule ses compteurs. Les tâches
+        terminées avant `completed_before` restent en archive. Retourne le
+        projet restauré et ses membres, (None, []) s'il n'est pas en archive.
+        """
+        async with self.db.transaction() as conn:
+            project = await conn.fetch_one(
+                f"SELECT owner_id FROM ArchivedProjects WHERE id = %s{conn.locking_read}", (project_id,)
+            )
+            if project is None:
+                return None, []
+            rows = await conn.fetch_all(
+                "SELECT id FROM ArchivedTasks WHERE project_id = %s "
+                "AND NOT (status = %s AND COALESCE(completed_at, created_at) < %s)",
+                (project_id, DONE_STATUS, completed_before),
+            )
+            task_ids = [row["id"] for row in rows]
+            await _copy(conn, "ArchivedProjects", "Projects", ARCHIVE_COLUMNS["Projects"], "id = %s", (project_id,))
+            await _copy(conn, "ArchivedProjectUsers", "ProjectUsers", ARCHIVE_COLUMNS["ProjectUsers"],
+                        "project_id = %s", (project_id,))
+            for batch in chunked(task_ids):
+                tasks = in_clause(batch)
+                await _copy(conn, "ArchivedTasks", "Tasks", ARCHIVE_COLUMNS["Tasks"], f"id IN {tasks}", batch)
+                await _copy(conn, "ArchivedAssignedTasks", "AssignedTasks", ARCHIVE_COLUMNS["AssignedTasks"],
+                            f"task_id IN {tasks}", batch)
+                await conn.execute(f"DELETE FROM ArchivedAssignedTasks WHERE task_id IN {tasks}", batch)
+                await conn.execute(f"DELETE FROM ArchivedTasks WHERE id IN {tasks}", batch)
+            members = await conn.fetch_all(
+                "SELECT user_id FROM ArchivedProjectUsers WHERE project_id = %s", (project_id,)
+            )
+            await conn.execute("DELETE FROM ArchivedProjectUsers WHERE project_id = %s", (project_id,))
+            await conn.execute("DELETE FROM ArchivedProjects WHERE id = %s", (project_id,))
+            restored = await _update_versioned(conn, "Projects", project_id, "status = %s", ["actif"])
+            await _reconcile(conn, [project_id], fix=True)
+        users = {project["owner_id"]} | {row["user_id"] for row in members}
+        return restored, sorted(users - {None})
+
+    async def archived_task_project(self, task_id):
+        """Projet d'une tâche archivée, None si elle n'est pas en archive."""
+        row = await self.db.fetch_one("SELECT project_id FROM ArchivedTasks WHERE id = %s", (task_id,))
+        return row["project_id"] if row else None
+
+    async def restore_task(self, task_id):
+        """
+        Ramène une tâche archivée et ses assignations dans les tables chaudes ;
+        sa date de fin repart de maintenant pour qu'elle ne soit pas aussitôt
+        réarchivée. Retourne la tâche, None si elle n'est pas (ou plus) en
+        archive. Son projet doit être dans les tables chaudes.
+        """
+        async with self.db.transaction() as conn:
+            row = await conn.fetch_one(f"SELECT id FROM ArchivedTasks WHERE id = %s{conn.locking_read}", (task_id,))
+            if row is None:
+                return None
+            await _copy(conn, "ArchivedTasks", "Tasks", ARCHIVE_COLUMNS["Tasks"], "id = %s", (task_id,))
+            await _copy(conn, "ArchivedAssignedTasks", "AssignedTasks", ARCHIVE_COLUMNS["AssignedTasks"],
+                        "task_id = %s", (task_id,))
+            await conn.execute("DELETE FROM ArchivedAssignedTasks WHERE task_id = %s", (task_id,))
+            await conn.execute("DELETE FROM ArchivedTasks WHERE id = %s", (task_id,))
+            return await _update_versioned(
+                conn, "Tasks", task_id, "completed_at = CASE WHEN status = %s THEN CURRENT_TIMESTAMP END", [DONE_STATUS]
+            )
+
+
+class SearchRepository(Repository):
+    """Lectures de la recherche plein texte (search.py)."""
+
+    async def fulltext(self, user_id, query, limit):
+        """
+        (projets, tâches) correspondant à `query` (syntaxe booléenne de MATCH
+        ... AGAINST) parmi les projets de l'utilisateur hors archives, avec leur
+        score de pertinence, les meilleurs d'abord. MySQL seulement : index
+        FULLTEXT ft_projects et ft_tasks.
+        """
+        projects = await self.db.fetch_all(
+            f"""
+            SELECT id, name, description, MATCH(name, description) AGAINST (%s IN BOOLEAN MODE) AS score
+            FROM Projects
+            WHERE MATCH(name, description) AGAINST (%s IN BOOLEAN MODE)
+              AND status <> %s AND id IN {MEMBER_PROJECTS}
+            ORDER BY score DESC, id
+            LIMIT %s
+            """,
+            (query, query, ARCHIVED_STATUS, user_id, user_id, limit),
+        )
+        tasks = await self.db.fetch_all(
+            f"""
+            SELECT t.id, t.project_id, t.title, t.description,
+                   MATCH(t.title, t.description) AGAINST (%s IN BOOLEAN MODE) AS score
+            FROM Tasks t
+            JOIN Projects p ON p.id = t.project_id
+            WHERE MATCH(t.title, t.description) AGAINST (%s IN BOOLEAN MODE)
+              AND p.status <> %s AND t.project_id IN {MEMBER_PROJECTS}
+            ORDER BY score DESC, t.id
+            LIMIT %s
+            """,
+            (query, query, ARCHIVED_STATUS, user_id, user_id, limit),
+        )
+        return projects, tasks
+
+    # Index en mémoire (SQLite) : les projets archivés et leurs tâches n'y figurent pas
+
+    def stream_projects(self):
+        return self.db.stream("SELECT id, name, description FROM Projects WHERE status <> %s", (ARCHIVED_STATUS,))
+
+    def stream_tasks(self):
+        return self.db.stream(
+            """
+            SELECT t.id, t.project_id, t.title, t.description
+            FROM Tasks t JOIN Projects p ON p.id = t.project_id
+            WHERE p.status <> %s
+            """,
+            (ARCHIVED_STATUS,),
+        )
+
+    async def projects(self, project_ids):
+        rows = []
+        for batch in chunked(project_ids):
+            rows += await self.db.fetch_all(
+                f"SELECT id, name, description FROM Projects WHERE id IN {in_clause(batch)} AND status <> %s",
+                (*batch, ARCHIVED_STATUS),
+            )
+        return rows
+
+    async def tasks(self, task_ids):
+        rows = []
+        for batch in chunked(task_ids):
+            rows += await self.db.fetch_all(
+                f"""
+                SELECT t.id, t.project_id, t.title, t.description
+                FROM Tasks t JOIN Projects p ON p.id = t.project_id
+                WHERE t.id IN {in_clause(batch)} AND p.status <> %s
+                """,
+                (*batch, ARCHIVED_STATUS),
+            )
+        return rows
+
+    async def project_tasks(self, project_ids):
+        rows = []
+        for batch in chunked(project_ids):
+            rows += await self.db.fetch_all(
+                f"""
+                SELECT t.id, t.project_id, t.title, t.description
+                FROM Tasks t JOIN Projects p ON p.id = t.project_id
+                WHERE t.project_id IN {in_clause(batch)} AND p.status <> %s
+                """,
+                (*batch, ARCHIVED_STATUS),
+            )
+        return rows
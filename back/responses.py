@@ -0,0 +1,53 @@
+"""
+Sérialisation rapide des réponses JSON.
+
+Les lignes lues en base ont déjà la forme et les types des modèles de
+db_matching ; les faire revalider par le response_model de la route puis
+ré-encoder par jsonable_encoder coûte plus cher que la requête elle-même sur un
+gros tableau. Une route qui retourne directement une FastJSONResponse (voir
+`trusted`) garde son response_model pour le schéma OpenAPI, mais FastAPI ne
+l'applique plus à la réponse.
+
+orjson est utilisé s'il est installé, sinon le module json standard.
+"""
+import json
+from datetime import date, datetime
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Type non sérialisable : {type(value).__name__}")
+
+
+def dumps(content):
+    """JSON compact encodé en UTF-8 ; dates au format ISO comme avec Pydantic."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(JSONResponse):
+
+    def render(self, content):
+        return dumps(content)
+
+
+def trusted(content, response=None, status_code=200):
+    """
+    Réponse construite sans revalidation, pour des lignes lues en base (ou en
+    cache) déjà conformes au response_model. Les en-têtes posés sur `response`
+    (pagination, ETag) sont recopiés. `content` peut être du JSON déjà encodé.
+    """
+    headers = dict(response.headers) if response is not None else None
+    if isinstance(content, bytes):
+        return Response(content, status_code=status_code, headers=headers, media_type="application/json")
+    return FastJSONResponse(content, status_code=status_code, headers=headers)
@@ -0,0 +1,325 @@
+"""
+Recherche plein texte dans les tâches (titre, description) et les projets
+(nom, description) accessibles à l'utilisateur :
+
+    GET /search?q=maquette login
+
+Tous les termes doivent être présents, le dernier pouvant n'être que le début
+d'un mot (saisie en cours). En MySQL, la recherche passe par les index
+FULLTEXT (MATCH ... AGAINST en mode booléen). En SQLite, un index inversé en
+mémoire, chargé au démarrage puis tenu à jour par les écritures de l'API
+(tasks_changed / projects_changed, relayés aux autres workers par l'état
+partagé), en tient lieu. Dans les deux cas les
+termes sont comparés sans casse ni accents, et les positions des mots trouvés
+sont renvoyées pour la mise en évidence.
+"""
+import os
+import re
+import math
+import bisect
+import heapq
+import unicodedata
+from collections import Counter
+
+from cache import cache
+from shared import shared
+
+SEARCH_MAX_TERMS = int(os.getenv("SEARCH_MAX_TERMS", "8"))
+# Même valeur que innodb_ft_min_token_size (docker-compose.yml)
+MIN_TERM_LENGTH = 2
+# Un terme du titre pèse autant que TITLE_WEIGHT occurrences dans la description
+TITLE_WEIGHT = 3
+SNIPPET_LENGTH = 160
+# Préfixe seul (index en mémoire) : candidats pris dans ses complétions les plus fréquentes seulement
+SEARCH_MAX_EXPANSIONS = int(os.getenv("SEARCH_MAX_EXPANSIONS", "64"))
+
+WORD = re.compile(r"\w+")
+
+
+def normalize(word):
+    """Minuscules sans accents ("Équipe" -> "equipe"), comme les collations _ai_ci de MySQL."""
+    return "".join(c for c in unicodedata.normalize("NFKD", word.lower()) if not unicodedata.combining(c))
+
+
+def terms(text):
+    words = (normalize(match.group()) for match in WORD.finditer(text or ""))
+    return [word for word in words if len(word) >= MIN_TERM_LENGTH]
+
+
+def parse_query(q):
+    """
+    (termes, préfixe) : termes distincts de la requête ; `préfixe` indique que
+    le dernier peut n'être qu'un début de mot (pas d'espace après lui).
+    """
+    query_terms = list(dict.fromkeys(terms(q)))[:SEARCH_MAX_TERMS]
+    return query_terms, bool(query_terms) and not q[-1:].isspace()
+
+
+def boolean_query(query_terms, prefix):
+    """Requête MATCH ... AGAINST (... IN BOOLEAN MODE) : tous les termes requis."""
+    words = [f"+{term}" for term in query_terms]
+    if prefix:
+        words[-1] += "*"
+    return " ".join(words)
+
+
+def _matcher(query_terms, prefix):
+    exact, last = set(query_terms), query_terms[-1]
+    return lambda word: word in exact or (prefix and word.startswith(last))
+
+
+def highlights(text, matches):
+    """Positions [début, fin) dans `text` des mots retenus par `matches`."""
+    return [[m.start(), m.end()] for m in WORD.finditer(text or "") if matches(normalize(m.group()))]
+
+
+def snippet(text, matches):
+    """
+    Extrait de `text` d'au plus SNIPPET_LENGTH caractères autour du premier
+    mot trouvé, avec ses positions ; (None, []) sans texte.
+    """
+    if not text:
+        return None, []
+    spans = highlights(text, matches)
+    start = max(0, spans[0][0] - SNIPPET_LENGTH // 4) if spans else 0
+    end = min(len(text), start + SNIPPET_LENGTH)
+    lead = "…" if start > 0 else ""
+    excerpt = lead + text[start:end] + ("…" if end < len(text) else "")
+    shift = len(lead) - start
+    return excerpt, [[a + shift, b + shift] for a, b in spans if a >= start and b <= end]
+
+
+def hit(row, score, matches):
+    """Résultat d'une tâche ({id, project_id, title, description}) ou d'un projet (name)."""
+    title = row["title"] if "title" in row else row["name"]
+    excerpt, excerpt_spans = snippet(row["description"], matches)
+    return {
+        "id": row["id"],
+        "project_id": row.get("project_id", row["id"]),
+        "title": title,
+        "snippet": excerpt,
+        "highlights": {"title": highlights(title, matches), "snippet": excerpt_spans},
+        "score": round(float(score), 4),
+    }
+
+
+class InvertedIndex:
+    """
+    Index inversé en mémoire d'un type de documents (tâches ou projets) :
+    terme -> {id: poids}. Le vocabulaire trié sert aux recherches par préfixe,
+    l'index par projet à restreindre la recherche aux projets accessibles.
+    """
+
+    def __init__(self):
+        self.postings = {}  # terme -> {doc_id: poids}
+        self.docs = {}  # doc_id -> (project_id, {terme: poids}, ligne)
+        self.by_project = {}  # project_id -> {doc_id}
+        self.vocabulary = []
+
+    def __len__(self):
+        return len(self.docs)
+
+    def put(self, doc_id, project_id, row, title, description):
+        self.remove(doc_id)
+        weights = Counter()
+        for term in terms(title):
+            weights[term] += TITLE_WEIGHT
+        for term in terms(description):
+            weights[term] += 1
+        for term, weight in weights.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                bisect.insort(self.vocabulary, term)
+            postings[doc_id] = weight
+        self.docs[doc_id] = (project_id, weights, row)
+        self.by_project.setdefault(project_id, set()).add(doc_id)
+
+    def remove(self, doc_id):
+        doc = self.docs.pop(doc_id, None)
+        if doc is None:
+            return
+        project_id, weights, _ = doc
+        for term in weights:
+            postings = self.postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self.postings[term]
+                del self.vocabulary[bisect.bisect_left(self.vocabulary, term)]
+        ids = self.by_project[project_id]
+        ids.discard(doc_id)
+        if not ids:
+            del self.by_project[project_id]
+
+    def remove_project(self, project_id):
+        for doc_id in list(self.by_project.get(project_id, ())):
+            self.remove(doc_id)
+
+    def _completions(self, start):
+        """Mots du vocabulaire qui commencent par `start`."""
+        i = j = bisect.bisect_left(self.vocabulary, start)
+        while j < len(self.vocabulary) and self.vocabulary[j].startswith(start):
+            j += 1
+        return self.vocabulary[i:j]
+
+    def search(self, query_terms, prefix, project_ids, limit):
+        """
+        [(score, ligne)] des documents des projets `project_ids` contenant tous
+        les termes, les plus pertinents d'abord (poids du terme x rareté).
+        Les candidats sont pris dans la plus petite des listes : documents du
+        terme complet le plus rare ou des projets accessibles ; le préfixe est
+        alors vérifié sur les termes de chaque candidat plutôt qu'en fusionnant
+        les listes de toutes ses complétions. Un préfixe seul prend ses
+        candidats dans ses SEARCH_MAX_EXPANSIONS complétions les plus fréquentes.
+        """
+        exact = query_terms[:-1] if prefix else query_terms
+        postings = sorted((self.postings.get(term, {}) for term in exact), key=len)
+        if not all(postings):
+            return []
+        total = len(self.docs)
+        idf = [math.log(1 + total / len(p)) for p in postings]
+        start = query_terms[-1] if prefix else None
+        if start is not None:
+            words = self._completions(start)
+            found = min(total, sum(len(self.postings[word]) for word in words))
+            if not found:
+                return []
+            start_idf = math.log(1 + total / found)
+        in_projects = sum(len(self.by_project.get(project_id, ())) for project_id in project_ids)
+        merged = None  # {doc_id: poids du préfixe}, déjà connu quand les candidats viennent de ses complétions
+        if postings and len(postings[0]) <= in_projects:
+            candidates = (d for d in postings[0] if self.docs[d][0] in project_ids)
+        elif postings or in_projects <= found:
+            candidates = (d for p in project_ids for d in self.by_project.get(p, ()))
+        else:
+            merged = {}
+            for word in heapq.nlargest(SEARCH_MAX_EXPANSIONS, words, key=lambda word: len(self.postings[word])):
+                for doc_id, weight in self.postings[word].items():
+                    if weight > merged.get(doc_id, 0):
+                        merged[doc_id] = weight
+            candidates = (d for d in merged if self.docs[d][0] in project_ids)
+
+        def scored():
+            for doc_id in candidates:
+                if not all(doc_id in p for p in postings):
+                    continue
+                score = sum(p[doc_id] * w for p, w in zip(postings, idf))
+                if merged is not None:
+                    score += merged[doc_id] * start_idf
+                elif start is not None:
+                    weights = self.docs[doc_id][1]
+                    weight = max((w for term, w in weights.items() if term.startswith(start)), default=0)
+                    if not weight:
+                        continue
+                    score += weight * start_idf
+                yield score, -doc_id
+
+        return [(score, self.docs[-neg_id][2]) for score, neg_id in heapq.nlargest(limit, scored())]
+
+
+class Search:
+    """
+    Point d'entrée de la recherche : FULLTEXT en MySQL, index en mémoire en
+    SQLite. Les méthodes *_changed sont sans effet en MySQL (index tenus par
+    la base) et doivent suivre toute écriture de tâche ou de projet sinon.
+    """
+
+    def __init__(self):
+        self.repo = None
+        self.projects_repo = None
+        self.tasks = None  # InvertedIndex, en SQLite seulement
+        self.projects = None
+        shared.subscribe("search", self._changed_elsewhere)
+
+    async def open(self, search_repo, projects_repo):
+        self.repo, self.projects_repo = search_repo, projects_repo
+        if search_repo.db.dialect != "sqlite":
+            return
+        self.tasks, self.projects = InvertedIndex(), InvertedIndex()
+        async for rows in search_repo.stream_projects():
+            self._put_projects(rows)
+        async for rows in search_repo.stream_tasks():
+            self._put_tasks(rows)
+
+    def _put_tasks(self, rows):
+        for row in rows:
+            self.tasks.put(row["id"], row["project_id"], row, row["title"], row["description"])
+
+    def _put_projects(self, rows):
+        for row in rows:
+            self.projects.put(row["id"], row["id"], row, row["name"], row["description"])
+
+    async def tasks_changed(self, task_ids):
+        """Réindexe les tâches (créées, modifiées ou supprimées), ici puis dans les autres workers."""
+        if self.tasks is None or not task_ids:
+            return
+        await self._reindex_tasks(task_ids)
+        await shared.publish("search", {"origin": shared.node, "tasks": list(task_ids)})
+
+    async def projects_changed(self, project_ids, with_tasks=False):
+        """
+        Réindexe les projets ; un projet disparu (supprimé, archivé) emporte
+        ses tâches. `with_tasks` : toutes ses tâches sont aussi relues (import,
+        restauration).
+        """
+        if self.projects is None or not project_ids:
+            return
+        await self._reindex_projects(project_ids, with_tasks)
+        message = {"origin": shared.node, "projects": list(project_ids), "with_tasks": with_tasks}
+        await shared.publish("search", message)
+
+    async def _changed_elsewhere(self, message, seq):
+        if self.tasks is None or message["origin"] == shared.node:
+            return
+        if "tasks" in message:
+            await self._reindex_tasks(message["tasks"])
+        else:
+            await self._reindex_projects(message["projects"], message["with_tasks"])
+
+    async def _reindex_tasks(self, task_ids):
+        rows = await self.repo.tasks(task_ids)
+        for task_id in set(task_ids) - {row["id"] for row in rows}:
+            self.tasks.remove(task_id)
+        self._put_tasks(rows)
+
+    async def _reindex_projects(self, project_ids, with_tasks):
+        rows = await self.repo.projects(project_ids)
+        for project_id in set(project_ids) - {row["id"] for row in rows}:
+            self.projects.remove(project_id)
+            self.tasks.remove_project(project_id)
+        self._put_projects(rows)
+        if with_tasks:
+            for project_id in project_ids:
+                self.tasks.remove_project(project_id)
+            self._put_tasks(await self.repo.project_tasks(project_ids))
+
+    async def search(self, user_id, q, limit):
+        query_terms, prefix = parse_query(q)
+        if not query_terms:
+            return {"projects": [], "tasks": []}
+        if self.tasks is None:
+            projects, tasks = await self.repo.fulltext(user_id, boolean_query(query_terms, prefix), limit)
+            projects = [(row.pop("score"), row) for row in projects]
+            tasks = [(row.pop("score"), row) for row in tasks]
+        else:
+            # Même périmètre que /my-projects, en cache avec lui
+            rows = await cache.get_or_load(
+                f"user:{user_id}", "project-ids", lambda: self.projects_repo.list_for_user(user_id, columns=["id"])
+            )
+            project_ids = {row["id"] for row in rows}
+            projects = self.projects.search(query_terms, prefix, project_ids, limit)
+            tasks = self.tasks.search(query_terms, prefix, project_ids, limit)
+        matches = _matcher(query_terms, prefix)
+        return {
+            "projects": [hit(row, score, matches) for score, row in projects],
+            "tasks": [hit(row, score, matches) for score, row in tasks],
+        }
+
+    def stats(self):
+        if self.tasks is None:
+            return {"backend": "fulltext"}
+        return {"backend": "memory", "tasks": len(self.tasks), "projects": len(self.projects),
+                "terms": len(self.tasks.vocabulary) + len(self.projects.vocabulary)}
+
+
+search = Search()
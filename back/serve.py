@@ -0,0 +1,89 @@
+"""
+Lancement de l'API en production, sur plusieurs workers uvicorn.
+
+    python back/serve.py                        # un worker par cœur (ou WEB_CONCURRENCY)
+    python back/serve.py --workers 4 --port 8000
+    SHARED_BACKEND=redis python back/serve.py   # obligatoire au-delà d'un worker
+
+La base est ouverte une fois par le lanceur (schéma SQLite), puis chaque
+worker est un processus démarré à neuf, sans connexion héritée du parent :
+son lifespan ouvre son propre pool de connexions, pré-rempli à
+DB_POOL_MIN_SIZE, et charge ce qui doit l'être avant d'accepter la première
+requête. Le total des connexions de tous les workers reste sous
+DB_MAX_CONNECTIONS : DB_POOL_MAX_SIZE est réparti entre eux s'il n'est pas fixé.
+
+Caches, invalidations, événements des tableaux et révocations de tokens
+passent par l'état partagé (shared.py), qui doit être sur un serveur Redis
+dès qu'il y a plus d'un worker. Plusieurs serveurs peuvent ainsi servir la
+même API derrière un répartiteur de charge.
+"""
+import os
+import sys
+import asyncio
+import secrets
+import argparse
+from pathlib import Path
+
+from shared import SHARED_BACKEND
+
+# Connexions à la base pour l'ensemble des workers (max_connections de MySQL : 151 par défaut)
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "120"))
+
+
+def default_workers():
+    if os.getenv("WEB_CONCURRENCY"):
+        return int(os.environ["WEB_CONCURRENCY"])
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    return max(1, cores or 1)
+
+
+def worker_environment(workers, environ=os.environ):
+    """Variables transmises aux workers : clé de signature commune, taille de pool répartie entre eux."""
+    if workers > 1 and SHARED_BACKEND != "redis":
+        raise SystemExit("Plusieurs workers nécessitent SHARED_BACKEND=redis (état partagé, voir shared.py)")
+    env = {}
+    if "JWT_KEYS" not in environ:
+        # Tirée à chaque lancement : fixer JWT_KEYS pour garder les tokens d'un redémarrage
+        # à l'autre ou les partager entre serveurs
+        env["JWT_KEYS"] = f"k1:{secrets.token_urlsafe(32)}"
+    if "DB_POOL_MAX_SIZE" not in environ:
+        # Au moins DB_POOL_MIN_SIZE (2 par défaut)
+        env["DB_POOL_MAX_SIZE"] = str(max(2, DB_MAX_CONNECTIONS // workers))
+    return env
+
+
+async def prepare():
+    """
+    Ouverture de la base une fois, dans le processus parent, avant les
+    workers : le schéma SQLite n'est pas créé par plusieurs d'entre eux à la
+    fois. Aucune connexion n'est gardée.
+    """
+    from database import db
+
+    await db.open()
+    await db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="API sur plusieurs workers uvicorn")
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--log-level", default="warning")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    # Héritées par les workers, qui lisent leur configuration à l'import
+    os.environ.update(worker_environment(args.workers))
+    asyncio.run(prepare())
+    print(f"{args.workers} workers, pool de {os.environ['DB_POOL_MAX_SIZE']} connexions chacun",
+          file=sys.stderr)
+    uvicorn.run(
+        "main:app", app_dir=str(Path(__file__).resolve().parent), host=args.host, port=args.port,
+        workers=args.workers, log_level=args.log_level, access_log=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
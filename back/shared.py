@@ -0,0 +1,234 @@
+"""
+État partagé entre les workers de l'API : clés-valeurs (compteurs, baux) et
+publication/abonnement.
+
+    SHARED_BACKEND=memory   un seul processus (par défaut) : tout reste en mémoire
+    SHARED_BACKEND=redis    plusieurs workers ou serveurs : un serveur compatible
+                            Redis (Redis, Valkey, KeyDB) à SHARED_REDIS_URL
+
+Passent par cet état : les générations du cache (invalidations et ETag), la
+diffusion des événements des tableaux, les révocations de tokens, la mise à
+jour de l'index de recherche en mémoire, les baux de l'archivage et des
+imports. Un message publié est aussi reçu par le worker qui l'a publié.
+"""
+import os
+import json
+import time
+import uuid
+import asyncio
+import inspect
+import logging
+
+from responses import dumps
+
+# Un CACHE_BACKEND=redis existant vaut partage sur le même serveur
+SHARED_BACKEND = os.getenv("SHARED_BACKEND", "redis" if os.getenv("CACHE_BACKEND") == "redis" else "memory")
+SHARED_REDIS_URL = os.getenv("SHARED_REDIS_URL", os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0"))
+
+logger = logging.getLogger(__name__)
+
+# Numérotation et diffusion en une opération atomique : les abonnés reçoivent
+# les messages d'un compteur dans l'ordre de leurs numéros
+PUBLISH_SEQUENCED = """
+local seq = redis.call('INCR', KEYS[1])
+redis.call('PUBLISH', ARGV[1], seq .. '\\t' .. ARGV[2])
+return seq
+"""
+# Prise ou prolongation d'un bail par son détenteur
+LEASE = """
+local holder = redis.call('GET', KEYS[1])
+if holder and holder ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+return 1
+"""
+
+
+class _Subscriptions:
+    """
+    Abonnés locaux : `handler(message, seq)`, fonction ou coroutine. En
+    mémoire tous reçoivent le même objet : un abonné ne modifie pas le message.
+    """
+
+    def __init__(self):
+        self.handlers = {}  # canal -> [handler]
+
+    def subscribe(self, channel, handler):
+        """À appeler avant open() (à l'import des modules)."""
+        self.handlers.setdefault(channel, []).append(handler)
+
+    async def _dispatch(self, channel, message, seq):
+        for handler in self.handlers.get(channel, ()):
+            try:
+                result = handler(message, seq)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                logger.exception("Message du canal %s non traité", channel)
+
+
+class MemoryShared(_Subscriptions):
+    """
+    État d'un seul processus. Les valeurs à durée de vie (baux, imports en
+    cours) sont en petit nombre et purgées à la lecture.
+    """
+
+    def __init__(self):
+        super().__init__()
+        # Les compteurs repartent de zéro au redémarrage : le jeton distingue les processus
+        self.token = uuid.uuid4().hex[:8]
+        self.node = self.token
+        self._counters = {}
+        self._values = {}  # clé -> (valeur, date d'expiration)
+
+    async def open(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def get(self, key):
+        entry = self._values.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._values[key]
+            return None
+        return value
+
+    async def set(self, key, value, ttl):
+        self._values[key] = (value, time.monotonic() + ttl)
+
+    async def delete(self, key):
+        self._values.pop(key, None)
+
+    async def get_counter(self, key):
+        return self._counters.get(key, 0)
+
+    async def incr(self, key):
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+    async def lease(self, key, ttl):
+        """Vrai si le bail `key` est libre, expiré ou déjà à nous : il est (re)pris pour `ttl` secondes."""
+        holder = await self.get(key)
+        if holder is not None and holder != self.node:
+            return False
+        await self.set(key, self.node, ttl)
+        return True
+
+    async def publish(self, channel, message, counter=None):
+        """
+        Transmet `message` (sérialisable en JSON) aux abonnés du canal dans tous
+        les workers. Avec `counter`, le message est numéroté par incrément de
+        ce compteur et les abonnés le reçoivent dans l'ordre des numéros ;
+        retourne le numéro.
+        """
+        seq = await self.incr(counter) if counter else None
+        await self._dispatch(channel, message, seq)
+        return seq
+
+    def stats(self):
+        return {"backend": "memory", "counters": len(self._counters), "values": len(self._values)}
+
+
+class RedisShared(_Subscriptions):
+    """
+    Même interface sur un serveur compatible Redis. Une tâche de fond par
+    worker écoute les canaux abonnés ; les messages publiés pendant une
+    coupure sont perdus (les abonnés WebSocket se resynchronisent par `since`).
+    """
+
+    def __init__(self, url=SHARED_REDIS_URL):
+        super().__init__()
+        try:
+            import redis.asyncio as redis
+            from redis.exceptions import ConnectionError, TimeoutError
+        except ImportError:
+            raise RuntimeError("SHARED_BACKEND=redis nécessite le paquet redis (pip install redis)")
+        self.client = redis.from_url(url)
+        self._connection_errors = (ConnectionError, TimeoutError, OSError)
+        self.token = "r"
+        self.node = uuid.uuid4().hex
+        self._publish_sequenced = self.client.register_script(PUBLISH_SEQUENCED)
+        self._lease = self.client.register_script(LEASE)
+        self._listener = None
+        self.received = 0
+
+    async def open(self):
+        # Scripts chargés d'avance : pas d'aller-retour NOSCRIPT à leur première utilisation
+        for script in (self._publish_sequenced, self._lease):
+            await self.client.script_load(script.script)
+        if self.handlers and self._listener is None:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            await pubsub.subscribe(*self.handlers)
+            self._listener = asyncio.create_task(self._listen(pubsub))
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        await self.client.aclose()
+
+    async def _listen(self, pubsub):
+        try:
+            while True:
+                try:
+                    message = await pubsub.get_message(timeout=None)
+                except self._connection_errors as e:
+                    # Réabonnement automatique à la reconnexion
+                    logger.warning("Abonnements interrompus : %s", e)
+                    await asyncio.sleep(1)
+                    continue
+                if message is None or message["type"] != "message":
+                    continue
+                self.received += 1
+                seq, _, body = message["data"].partition(b"\t")
+                await self._dispatch(message["channel"].decode(), json.loads(body), int(seq) if seq else None)
+        finally:
+            await pubsub.aclose()
+
+    async def get(self, key):
+        value = await self.client.get(key)
+        return value.decode() if value is not None else None
+
+    async def set(self, key, value, ttl):
+        await self.client.set(key, value, px=int(ttl * 1000))
+
+    async def delete(self, key):
+        await self.client.delete(key)
+
+    async def get_counter(self, key):
+        value = await self.client.get(key)
+        return int(value) if value is not None else 0
+
+    async def incr(self, key):
+        return await self.client.incr(key)
+
+    async def lease(self, key, ttl):
+        return bool(await self._lease(keys=[key], args=[self.node, int(ttl * 1000)]))
+
+    async def publish(self, channel, message, counter=None):
+        body = dumps(message)
+        if counter is None:
+            await self.client.publish(channel, b"\t" + body)
+            return None
+        return int(await self._publish_sequenced(keys=[counter], args=[channel, body]))
+
+    def stats(self):
+        return {"backend": "redis", "received": self.received}
+
+
+def create_shared():
+    if SHARED_BACKEND == "redis":
+        return RedisShared()
+    return MemoryShared()
+
+
+shared = create_shared()
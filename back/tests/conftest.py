@@ -0,0 +1,65 @@
+"""
+Tests de l'API sur SQLite, sans serveur : une base temporaire par session,
+application chargée en processus (TestClient).
+
+    python -m pytest
+"""
+import os
+import sys
+import uuid
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Configuration lue à l'import des modules de l'application
+os.environ["DB_BACKEND"] = "sqlite"
+os.environ["DB_SQLITE_PATH"] = str(Path(tempfile.mkdtemp()) / "tests.db")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ["RATE_LIMITS"] = "off"
+os.environ["CACHE_BACKEND"] = "memory"
+os.environ["SHARED_BACKEND"] = "memory"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="session")
+def client():
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture
+def user(client):
+    """Nouvel utilisateur connecté : {"id", "email", "headers"}."""
+    return signup(client)
+
+
+def signup(client, name="test"):
+    email = f"{name}-{uuid.uuid4().hex[:8]}@test.fr"
+    response = client.post("/users", json={"name": name, "email": email, "password": "pw"})
+    assert response.status_code == 201, response.text
+    token = client.post("/login", json={"email": email, "password": "pw"}).json()["token"]
+    return {"id": response.json()["id"], "email": email, "headers": {"Authorization": f"Bearer {token}"}}
+
+
+def create_project(client, user, **fields):
+    response = client.post("/projects", json={"name": "Projet", **fields}, headers=user["headers"])
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def create_tasks(client, user, project_id, count, **fields):
+    tasks = [{"title": f"Tâche {i}", "project_id": project_id, **fields} for i in range(count)]
+    response = client.post("/tasks/bulk", json={"create": tasks}, headers=user["headers"])
+    assert response.status_code == 200, response.text
+    return [result["id"] for result in response.json()["results"]]
+
+
+def query_count(response):
+    """Requêtes SQL de la requête HTTP, lues dans l'en-tête Server-Timing (metrics.py)."""
+    timing = response.headers["server-timing"]
+    return int(timing.split('desc="', 1)[1].split(" req", 1)[0])
@@ -0,0 +1,82 @@
+"""Tâches, utilisateurs et membres inconnus : 404 ou 409, jamais une erreur SQL."""
+from conftest import create_project, create_tasks, signup
+
+
+def test_missing_task(client, user):
+    assert client.delete("/tasks/999999", headers=user["headers"]).status_code == 404
+    response = client.post("/tasks/999999/assign-users", json={"user_ids": [user["id"]]}, headers=user["headers"])
+    assert response.status_code == 404
+    assert client.put("/tasks/999999", json={"status": "todo"}, headers=user["headers"]).status_code == 404
+
+
+def test_assign_unknown_user(client, user):
+    project = create_project(client, user)
+    [task_id] = create_tasks(client, user, project["id"], 1)
+    response = client.post(f"/tasks/{task_id}/assign-users", json={"user_ids": [user["id"], 999999]},
+                           headers=user["headers"])
+    assert response.status_code == 404
+    assert "999999" in response.json()["detail"]
+    response = client.post("/tasks/assign-users", json={"task_ids": [task_id], "user_ids": [999999]},
+                           headers=user["headers"])
+    assert response.status_code == 404
+
+
+def test_project_members(client, user):
+    project = create_project(client, user)
+    other = signup(client)
+    member = {"project_id": project["id"], "user_id": other["id"], "role": "editor"}
+    assert client.post("/project-users", json=member, headers=user["headers"]).status_code == 201
+    assert client.post("/project-users", json=member, headers=user["headers"]).status_code == 409
+    unknown = {**member, "user_id": 999999}
+    assert client.post("/project-users", json=unknown, headers=user["headers"]).status_code == 404
+
+
+def test_bulk_reports_missing_tasks(client, user):
+    response = client.post("/tasks/bulk", json={"delete": [999999]}, headers=user["headers"])
+    assert response.status_code == 200
+    assert response.json()["results"][0]["status"] == "not_found"
+
+
+def test_project_member_role(client, user):
+    project = create_project(client, user)
+    member = {"project_id": project["id"], "user_id": signup(client)["id"], "role": "member"}
+    assert client.post("/project-users", json=member, headers=user["headers"]).status_code == 422
+
+
+def test_viewer_cannot_write(client, user):
+    project = create_project(client, user)
+    [task_id] = create_tasks(client, user, project["id"], 1)
+    viewer = signup(client, "lecteur")
+    member = {"project_id": project["id"], "user_id": viewer["id"], "role": "viewer"}
+    assert client.post("/project-users", json=member, headers=user["headers"]).status_code == 201
+    headers = viewer["headers"]
+
+    assert client.get(f"/projects/{project['id']}/tasks", headers=headers).status_code == 200
+    writes = [
+        client.put(f"/projects/{project['id']}", json={"name": "Renommé"}, headers=headers),
+        client.post("/tasks", json={"title": "T", "project_id": project["id"]}, headers=headers),
+        client.put(f"/tasks/{task_id}", json={"status": "en cours"}, headers=headers),
+        client.patch(f"/tasks/{task_id}/move", json={"status": "terminé"}, headers=headers),
+        client.post(f"/tasks/{task_id}/assign-users", json={"user_ids": [viewer["id"]]}, headers=headers),
+        client.post("/tasks/assign-users", json={"task_ids": [task_id], "user_ids": [viewer["id"]]},
+                    headers=headers),
+        client.post("/tasks/bulk", json={"create": [{"title": "T", "project_id": project["id"]}]}, headers=headers),
+        client.post("/tasks/bulk", json={"delete": [task_id]}, headers=headers),
+        client.delete(f"/tasks/{task_id}", headers=headers),
+    ]
+    assert [response.status_code for response in writes] == [403] * len(writes)
+
+
+def test_lists_are_scoped_to_member_projects(client):
+    owner = signup(client, "propriétaire")
+    project = create_project(client, owner)
+    [task_id] = create_tasks(client, owner, project["id"], 1)
+    client.post(f"/tasks/{task_id}/assign-users", json={"user_ids": [owner["id"]]}, headers=owner["headers"])
+    outsider = signup(client, "externe")
+    for path in ("/projects", "/tasks", "/tasks/assigned"):
+        assert client.get(path).status_code == 401
+    assert client.get("/projects", headers=outsider["headers"]).json() == []
+    assert client.get("/tasks", headers=outsider["headers"]).json() == []
+    assert client.get("/tasks/assigned", headers=outsider["headers"]).json() == []
+    own = client.get("/tasks", headers=owner["headers"]).json()
+    assert [task["id"] for task in own] == [task_id]
@@ -0,0 +1,37 @@
+"""Passe d'archivage : nombre de tâches effectivement déplacées."""
+from datetime import datetime, timedelta
+
+import main
+from archiving import archive_pass
+from conftest import create_project, create_tasks
+
+
+class Candidates:
+    """Dépôt d'archives dont les candidats sont `task_ids`, lus une fois : les autres tests n'archivent rien."""
+
+    def __init__(self, task_ids):
+        self.task_ids = task_ids
+
+    async def archivable_projects(self, batch_size):
+        return []
+
+    async def archivable_tasks(self, cutoff, batch_size):
+        task_ids, self.task_ids = self.task_ids, []
+        return task_ids
+
+    async def archive_tasks(self, task_ids, cutoff):
+        return await main.archive_repo.archive_tasks(task_ids, cutoff)
+
+
+def test_archive_pass_counts_moved_tasks(client, user):
+    project_id = create_project(client, user)["id"]
+    done = create_tasks(client, user, project_id, 3, status="terminé")
+    # Candidate rouverte entre la lecture et l'archivage
+    reopened = create_tasks(client, user, project_id, 1)
+
+    cutoff = datetime.utcnow() + timedelta(days=1)
+    projects, tasks = client.portal.call(archive_pass, Candidates(done + reopened), 10, cutoff)
+    assert (projects, tasks) == (0, 3)
+
+    response = client.get(f"/projects/{project_id}/tasks", headers=user["headers"])
+    assert [task["id"] for task in response.json()] == reopened
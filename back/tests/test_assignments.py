@@ -0,0 +1,36 @@
+"""Remplacement des assignés : compteurs du tableau de bord exacts malgré une écriture concurrente."""
+import main
+from database import SQLiteConnection
+from conftest import create_project, create_tasks
+
+
+def assignee_count(client, project_id, user_id):
+    row = client.portal.call(
+        main.db.fetch_one, "SELECT tasks FROM ProjectAssigneeStats WHERE project_id = %s AND user_id = %s",
+        (project_id, user_id),
+    )
+    return row["tasks"] if row else 0
+
+
+def test_concurrent_unassign_does_not_drift(client, user, monkeypatch):
+    project_id = create_project(client, user)["id"]
+    [task_id] = create_tasks(client, user, project_id, 1)
+    client.post(f"/tasks/{task_id}/assign-users", json={"user_ids": [user["id"]]}, headers=user["headers"])
+    assert assignee_count(client, project_id, user["id"]) == 1
+
+    fetch_all = SQLiteConnection.fetch_all
+
+    async def racing(self, query, params=()):
+        rows = await fetch_all(self, query, params)
+        if "LEFT JOIN AssignedTasks" in query:
+            # Le même retrait, validé par une autre requête entre la lecture et le DELETE
+            await self.execute("DELETE FROM AssignedTasks WHERE task_id = %s", (task_id,))
+            await self.execute("UPDATE ProjectAssigneeStats SET tasks = tasks - 1 WHERE project_id = %s",
+                               (project_id,))
+        return rows
+
+    monkeypatch.setattr(SQLiteConnection, "fetch_all", racing)
+    diff = client.portal.call(main.assignments_repo.replace, task_id, [])
+    monkeypatch.undo()
+    assert diff == {"added": [], "removed": [user["id"]]}
+    assert assignee_count(client, project_id, user["id"]) == 0
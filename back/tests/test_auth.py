@@ -0,0 +1,27 @@
+"""Vérification des JWT : seules les clés de JWT_KEYS signent."""
+from datetime import datetime, timedelta
+
+import pytest
+from jose import JWTError, jwt
+
+from Auth import ALGORITHM, TokenVerifier
+
+
+def forge(user, key, headers=None):
+    claims = {"sub": str(user["id"]), "exp": datetime.utcnow() + timedelta(minutes=5)}
+    return jwt.encode(claims, key, algorithm=ALGORITHM, headers=headers)
+
+
+@pytest.mark.parametrize("headers", [None, {"kid": "inconnue"}])
+def test_token_without_known_kid_is_rejected(client, user, headers):
+    # Ancienne clé codée en dur dans le dépôt : plus acceptée
+    token = forge(user, "Timothée", headers)
+    response = client.get("/my-projects", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+
+
+def test_legacy_tokens_need_explicit_key(user):
+    token = forge(user, "ancienne")
+    with pytest.raises(JWTError):
+        TokenVerifier(keys={"k1": "clé"}).verify(token)
+    assert TokenVerifier(keys={"k1": "clé"}, legacy_key="ancienne").verify(token)["sub"] == str(user["id"])
@@ -0,0 +1,45 @@
+"""Flux /ws/projects/{id} : un membre retiré du projet est déconnecté."""
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from conftest import create_project, create_tasks, signup
+
+
+def token(user):
+    return user["headers"]["Authorization"].removeprefix("Bearer ")
+
+
+def test_removed_member_is_disconnected(client, user):
+    project = create_project(client, user)
+    member = signup(client)
+    response = client.post("/project-users", json={"project_id": project["id"], "user_id": member["id"]},
+                           headers=user["headers"])
+    assert response.status_code == 201
+
+    with client.websocket_connect(f"/ws/projects/{project['id']}?token={token(user)}") as owner_socket, \
+            client.websocket_connect(f"/ws/projects/{project['id']}?token={token(member)}") as member_socket:
+        create_tasks(client, user, project["id"], 1)
+        assert member_socket.receive_json()["type"] == "task.created"
+        assert owner_socket.receive_json()["type"] == "task.created"
+
+        assert client.delete(f"/project-users/{project['id']}/{member['id']}",
+                             headers=user["headers"]).status_code == 204
+        with pytest.raises(WebSocketDisconnect) as closed:
+            member_socket.receive_json()
+        assert closed.value.code == 1008
+
+        create_tasks(client, user, project["id"], 1)
+        assert owner_socket.receive_json()["type"] == "task.created"
+
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect(f"/ws/projects/{project['id']}?token={token(member)}") as socket:
+            socket.receive_json()
+
+
+def test_deleted_project_disconnects_subscribers(client, user):
+    project = create_project(client, user)
+    with client.websocket_connect(f"/ws/projects/{project['id']}?token={token(user)}") as socket:
+        assert client.delete(f"/projects/{project['id']}", headers=user["headers"]).status_code == 204
+        with pytest.raises(WebSocketDisconnect) as closed:
+            socket.receive_json()
+        assert closed.value.code == 1008
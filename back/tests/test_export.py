@@ -0,0 +1,43 @@
+"""Exports en flux : périmètre de l'utilisateur, colonnes et dates identiques en NDJSON et en CSV."""
+import csv
+import io
+import json
+
+from conftest import create_project, create_tasks, signup
+from export import PROJECT_COLUMNS, TASK_COLUMNS
+
+
+def ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_export_limited_to_member_projects(client, user):
+    project = create_project(client, user)
+    task_ids = create_tasks(client, user, project["id"], 3)
+    outsider = signup(client)
+
+    tasks = ndjson(client.get("/export/tasks", headers=outsider["headers"]))
+    assert not {task["id"] for task in tasks} & set(task_ids)
+    projects = ndjson(client.get("/export/projects", headers=outsider["headers"]))
+    assert project["id"] not in {p["id"] for p in projects}
+    response = client.get("/export/tasks", params={"project_id": project["id"]}, headers=outsider["headers"])
+    assert response.status_code == 403
+
+    tasks = ndjson(client.get("/export/tasks", headers=user["headers"]))
+    assert {task["id"] for task in tasks} == set(task_ids)
+    projects = ndjson(client.get("/export/projects", headers=user["headers"]))
+    assert [p["id"] for p in projects] == [project["id"]]
+
+
+def test_export_formats_match(client, user):
+    project = create_project(client, user)
+    create_tasks(client, user, project["id"], 2, status="terminé", due_date="2025-01-31")
+    for path, columns in (("/export/tasks", TASK_COLUMNS), ("/export/projects", PROJECT_COLUMNS)):
+        rows = ndjson(client.get(path, headers=user["headers"]))
+        response = client.get(path, params={"format": "csv"}, headers=user["headers"])
+        reader = csv.DictReader(io.StringIO(response.text))
+        assert reader.fieldnames == columns
+        assert [list(row) for row in rows] == [columns] * len(rows)
+        for row, line in zip(rows, reader):
+            assert line == {key: "" if value is None else str(value) for key, value in row.items()}
+            assert "T" in line["created_at"]
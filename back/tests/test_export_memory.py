@@ -0,0 +1,49 @@
+"""Export d'une grande table : lu et écrit par lots, en mémoire bornée."""
+import os
+import sqlite3
+import tracemalloc
+
+from conftest import create_project
+from database import BATCH_SIZE
+from export import TASK_COLUMNS, csv_lines, ndjson_lines
+from filters import TaskFilters
+
+ROWS = 30_000
+# Quelques lots de lignes et leur sérialisation ; la table entière lue d'un coup : plus de 30 Mo
+PEAK_BYTES = 8 * 1024 * 1024
+
+
+def seed_tasks(project_id):
+    with sqlite3.connect(os.environ["DB_SQLITE_PATH"]) as conn:
+        conn.executemany(
+            "INSERT INTO Tasks (title, description, due_date, project_id) VALUES (?, ?, ?, ?)",
+            ((f"Tâche {i}", "x" * 200, "2025-01-31", project_id) for i in range(ROWS)),
+        )
+
+
+def test_export_memory_is_bounded(client, user):
+    import main
+
+    project_id = create_project(client, user)["id"]
+    seed_tasks(project_id)
+    filters = TaskFilters(status=None, priority=None, due_after=None, due_before=None, assignee_id=None, q=None,
+                          sort=None, after_value=None)
+
+    for lines in (ndjson_lines, lambda batches: csv_lines(batches, TASK_COLUMNS)):
+        async def export():
+            batches = main.tasks_repo.stream(filters, ["project_id = %s"], [project_id], TASK_COLUMNS)
+            tracemalloc.start()
+            try:
+                chunks = size = 0
+                async for chunk in lines(batches):
+                    chunks += 1
+                    size += len(chunk)
+                return chunks, size, tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        chunks, size, peak = client.portal.call(export)
+        # Un morceau par lot : la première ligne est écrite avant que la suivante ne soit lue
+        assert chunks >= ROWS // BATCH_SIZE
+        assert size > ROWS * 200
+        assert peak < PEAK_BYTES, f"pic de {peak / 1e6:.1f} Mo"
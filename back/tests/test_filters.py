@@ -0,0 +1,36 @@
+"""Tri des tâches par clé : curseurs valides et invalides."""
+import uuid
+
+import pytest
+
+from conftest import create_project, signup
+
+
+@pytest.mark.parametrize("sort, value", [
+    ("priority", "x"), ("priority", "9"), ("-status", "-1"), ("due_date", "demain"), ("created_at", "hier"),
+])
+def test_invalid_cursor_value(client, user, sort, value):
+    response = client.get("/tasks", params={"sort": sort, "after_id": 1, "after_value": value},
+                          headers=user["headers"])
+    assert response.status_code == 400
+    assert "Curseur invalide" in response.json()["detail"]
+
+
+def test_priority_cursor_pages(client):
+    user = signup(client)
+    project = create_project(client, user)
+    word = uuid.uuid4().hex
+    tasks = [{"title": f"{word} {i}", "project_id": project["id"], "priority": priority}
+             for i, priority in enumerate(("haute", "basse", "moyenne", "basse", "haute"))]
+    client.post("/tasks/bulk", json={"create": tasks}, headers=user["headers"])
+    params = {"q": word, "sort": "priority", "limit": 2}
+    seen = []
+    while True:
+        response = client.get("/tasks", params=params, headers=user["headers"])
+        assert response.status_code == 200
+        seen += [task["priority"] for task in response.json()]
+        if "x-next-cursor" not in response.headers:
+            break
+        after_id, after_value = response.headers["x-next-cursor"].split(",")
+        params.update(after_id=after_id, after_value=after_value)
+    assert seen == ["basse", "basse", "moyenne", "haute", "haute"]
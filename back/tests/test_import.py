@@ -0,0 +1,31 @@
+"""Import d'archive : lecture hors de la boucle d'événements, écriture en arrière-plan."""
+import json
+import threading
+
+import importer
+from conftest import signup
+
+
+def test_archive_is_read_off_the_event_loop(client, monkeypatch):
+    user = signup(client, "import")
+    threads = []
+    read_archive = importer.read_archive
+
+    def recording(data):
+        threads.append(threading.current_thread())
+        return read_archive(data)
+
+    monkeypatch.setattr(importer, "read_archive", recording)
+    archive = "\n".join(json.dumps({"name": f"Client {i}", "members": [{"email": user["email"], "role": "editor"}],
+                                    "tasks": [{"title": "Cadrage", "assignees": [user["email"]]}]})
+                        for i in range(3))
+    response = client.post("/imports", content=archive.encode(), headers=user["headers"])
+    assert response.status_code == 202, response.text
+    job = client.get(f"/imports/{response.json()['id']}", headers=user["headers"]).json()
+    assert (job["status"], job["done"]) == ("terminé", 3)
+    # Thread de la boucle d'événements de l'application
+    loop_thread = client.portal.call(threading.current_thread)
+    assert threads and threads[0] is not loop_thread
+
+    response = client.post("/imports", content=b'{"name": ', headers=user["headers"])
+    assert response.status_code == 422
@@ -0,0 +1,22 @@
+"""Budget "account" de /login : seuls les échecs comptent, par compte et par adresse."""
+import main
+from limits import RateLimits
+from conftest import signup
+
+
+def login(client, user, password="pw"):
+    return client.post("/login", json={"email": user["email"], "password": password})
+
+
+def test_only_failed_logins_are_charged(client, monkeypatch):
+    limits = RateLimits({"account": "2/300"}, enabled=True)
+    monkeypatch.setattr(main, "limits", limits)
+    user = signup(client, "budget")
+
+    assert [login(client, user).status_code for _ in range(4)] == [200] * 4
+    assert [login(client, user, "faux").status_code for _ in range(2)] == [401, 401]
+    response = login(client, user)
+    assert response.status_code == 429
+    assert "retry-after" in response.headers
+    # Même compte depuis une autre adresse : budget intact
+    limits.check_remaining("account", ("autre adresse", user["email"]))
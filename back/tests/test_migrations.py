@@ -0,0 +1,74 @@
+"""Mise à niveau d'une base créée par le schéma d'origine (sans version, rang, compteurs ni archives)."""
+import asyncio
+import sqlite3
+
+from database import MYSQL_SCHEMA, SQLiteDatabase
+from migrations import parse_schema
+
+ORIGINAL_SCHEMA = """
+CREATE TABLE Users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, name VARCHAR(30) NOT NULL, email VARCHAR(100) NOT NULL UNIQUE,
+    password VARCHAR(255) NOT NULL, role TEXT DEFAULT 'member'
+);
+CREATE TABLE Projects (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, name VARCHAR(30) NOT NULL, description TEXT, start_date DATE,
+    end_date DATE, status TEXT DEFAULT 'actif', owner_id INT REFERENCES Users(id),
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE Tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, title VARCHAR(100) NOT NULL, description TEXT, due_date DATE,
+    status TEXT DEFAULT 'todo', priority TEXT DEFAULT 'moyenne',
+    project_id INT NOT NULL REFERENCES Projects(id) ON DELETE CASCADE, created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE AssignedTasks (
+    task_id INT NOT NULL REFERENCES Tasks(id) ON DELETE CASCADE,
+    user_id INT NOT NULL REFERENCES Users(id) ON DELETE CASCADE, PRIMARY KEY (task_id, user_id)
+);
+CREATE TABLE ProjectUsers (
+    project_id INT NOT NULL REFERENCES Projects(id) ON DELETE CASCADE,
+    user_id INT NOT NULL REFERENCES Users(id) ON DELETE CASCADE, role TEXT DEFAULT 'viewer',
+    PRIMARY KEY (project_id, user_id)
+);
+INSERT INTO Users (name, email, password) VALUES ('a', 'a@test.fr', 'x');
+INSERT INTO Projects (name, owner_id) VALUES ('P', 1);
+INSERT INTO Tasks (title, status, project_id) VALUES
+    ('t1', 'todo', 1), ('t2', 'todo', 1), ('t3', 'todo', 1), ('t4', 'terminé', 1), ('t5', 'terminé', 1);
+INSERT INTO AssignedTasks (task_id, user_id) VALUES (1, 1), (4, 1);
+"""
+
+
+def test_original_sqlite_database_is_upgraded(tmp_path):
+    path = tmp_path / "original.db"
+    with sqlite3.connect(path) as conn:
+        conn.executescript(ORIGINAL_SCHEMA)
+
+    async def open_twice():
+        for _ in range(2):  # la seconde ouverture ne trouve rien à faire
+            db = SQLiteDatabase(str(path))
+            await db.open()
+            try:
+                tasks = await db.fetch_all("SELECT id, status, position, version, completed_at FROM Tasks ORDER BY id")
+                stats = await db.fetch_all("SELECT status, tasks FROM ProjectTaskStats WHERE project_id = 1")
+                assignees = await db.fetch_all("SELECT user_id, tasks FROM ProjectAssigneeStats")
+                archived = await db.fetch_all("SELECT * FROM ArchivedTasks")
+            finally:
+                await db.close()
+        return tasks, stats, assignees, archived
+
+    tasks, stats, assignees, archived = asyncio.run(open_twice())
+    todo = [task["position"] for task in tasks if task["status"] == "todo"]
+    assert todo == sorted(set(todo)) and len(todo) == 3
+    assert all(task["version"] == 1 for task in tasks)
+    assert [task["completed_at"] is not None for task in tasks] == [False, False, False, True, True]
+    assert {row["status"]: row["tasks"] for row in stats} == {"todo": 3, "terminé": 2}
+    assert assignees == [{"user_id": 1, "tasks": 2}]
+    assert archived == []
+
+
+def test_mysql_schema_is_parsed():
+    tables = {table: (create, dict(indexes)) for table, create, indexes in parse_schema(MYSQL_SCHEMA.read_text())}
+    assert {"Tasks", "ProjectTaskStats", "ArchivedTasks", "ImportJobs"} <= tables.keys()
+    create, indexes = tables["Tasks"]
+    assert create.startswith("CREATE TABLE IF NOT EXISTS Tasks (")
+    assert indexes["idx_tasks_board"] == "ADD INDEX idx_tasks_board (project_id, status, position)"
+    assert indexes["ft_tasks"] == "ADD FULLTEXT INDEX ft_tasks (title, description)"
@@ -0,0 +1,31 @@
+"""Pagination par clé : /users et /my-projects ne sont paginés qu'à la demande."""
+from conftest import create_project, signup
+
+
+def test_my_projects_complete_without_limit(client, monkeypatch):
+    import pagination
+
+    user = signup(client)
+    ids = [create_project(client, user)["id"] for _ in range(3)]
+    # Une page par défaut plus petite que la liste ne la tronque pas
+    monkeypatch.setattr(pagination, "DEFAULT_PAGE_SIZE", 2)
+    response = client.get("/my-projects", headers=user["headers"])
+    assert [project["id"] for project in response.json()] == ids
+    assert "link" not in response.headers
+
+    response = client.get("/my-projects", params={"limit": 2}, headers=user["headers"])
+    assert [project["id"] for project in response.json()] == ids[:2]
+    assert response.headers["x-next-cursor"] == str(ids[1])
+    response = client.get("/my-projects", params={"after_id": ids[1]}, headers=user["headers"])
+    assert [project["id"] for project in response.json()] == ids[2:]
+
+
+def test_users_complete_without_limit(client):
+    for _ in range(3):
+        signup(client)
+    users = client.get("/users").json()
+    assert len(users) >= 3
+    assert "link" not in client.get("/users").headers
+    response = client.get("/users", params={"limit": 1})
+    assert len(response.json()) == 1
+    assert 'rel="next"' in response.headers["link"]
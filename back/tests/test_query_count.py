@@ -0,0 +1,40 @@
+"""Nombre de requêtes SQL constant quel que soit le nombre de tâches ou de projets (pas de N+1)."""
+from conftest import create_project, create_tasks, query_count, signup
+
+# Tâches du projet, puis leurs assignés en un seul IN (...) (accès au projet en cache)
+BOARD_QUERIES = 2
+# Projets de l'utilisateur et lectures groupées de leurs statistiques
+MY_PROJECTS_QUERIES = 4
+
+
+def board(client, user, tasks):
+    project = create_project(client, user)
+    for task_id in create_tasks(client, user, project["id"], tasks):
+        response = client.post(f"/tasks/{task_id}/assign-users", json={"user_ids": [user["id"]]},
+                               headers=user["headers"])
+        assert response.status_code == 200, response.text
+    response = client.get(f"/projects/{project['id']}/tasks", headers=user["headers"])
+    assert response.status_code == 200
+    assert len(response.json()) == tasks
+    assert all(task["users"] for task in response.json())
+    return query_count(response)
+
+
+def test_project_tasks_query_count(client):
+    user = signup(client)
+    assert board(client, user, 2) == board(client, user, 40) == BOARD_QUERIES
+
+
+def my_projects(client, projects):
+    user = signup(client)
+    for _ in range(projects):
+        project = create_project(client, user)
+        create_tasks(client, user, project["id"], 3)
+    response = client.get("/my-projects", params={"with_stats": "true"}, headers=user["headers"])
+    assert response.status_code == 200
+    assert len(response.json()) == projects
+    return query_count(response)
+
+
+def test_my_projects_query_count(client):
+    assert my_projects(client, 1) == my_projects(client, 15) == MY_PROJECTS_QUERIES
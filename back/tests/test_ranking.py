@@ -0,0 +1,32 @@
+"""Rang des cartes changées de colonne par PUT /tasks/{id} ou /tasks/bulk."""
+from conftest import create_project, create_tasks
+
+
+def column(client, user, project_id, status):
+    response = client.get(f"/projects/{project_id}/tasks", headers=user["headers"])
+    assert response.status_code == 200
+    return [(task["id"], task["position"]) for task in response.json() if task["status"] == status]
+
+
+def test_status_change_ranks_task_after_target_column(client, user):
+    project_id = create_project(client, user)["id"]
+    first = create_tasks(client, user, project_id, 1, status="en cours")[0]
+    dragged, moved, *bulk = create_tasks(client, user, project_id, 4)
+
+    # Glisser-déposer du tableau : PUT avec le seul statut
+    response = client.put(f"/tasks/{dragged}", json={"status": "en cours"}, headers=user["headers"])
+    assert response.status_code == 200, response.text
+    assert column(client, user, project_id, "en cours") == [(first, "a0"), (dragged, response.json()["position"])]
+
+    response = client.patch(f"/tasks/{moved}/move", json={"status": "en cours", "after_id": first,
+                                                          "before_id": dragged}, headers=user["headers"])
+    assert response.status_code == 200, response.text
+
+    # Sans puis avec version attendue : UPDATE groupé et UPDATE propre à la tâche
+    updates = [{"id": bulk[0], "status": "en cours"}, {"id": bulk[1], "status": "en cours", "version": 1}]
+    response = client.post("/tasks/bulk", json={"update": updates}, headers=user["headers"])
+    assert [result["status"] for result in response.json()["results"]] == ["updated", "updated"]
+    cards = column(client, user, project_id, "en cours")
+    assert [i for i, _ in cards] == [first, moved, dragged, *bulk]
+    positions = [position for _, position in cards]
+    assert positions == sorted(set(positions))
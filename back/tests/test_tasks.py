@@ -0,0 +1,18 @@
+"""Réponse de POST /tasks : la tâche telle qu'enregistrée."""
+import pytest
+
+from conftest import create_project
+
+
+@pytest.mark.parametrize("status, completed", [("todo", False), ("terminé", True)])
+def test_created_task_matches_stored_row(client, user, status, completed):
+    project_id = create_project(client, user)["id"]
+    response = client.post("/tasks", json={"title": "Tâche", "status": status, "project_id": project_id},
+                           headers=user["headers"])
+    assert response.status_code == 201, response.text
+    created = response.json()
+    assert (created["completed_at"] is not None) == completed
+
+    board = client.get(f"/projects/{project_id}/tasks", headers=user["headers"]).json()
+    stored = {key: board[0].get(key) for key in created}
+    assert created == stored
@@ -0,0 +1,38 @@
+"""
+Compare deux résultats de run.py (par exemple avant / après un commit).
+
+    python bench/compare.py bench/results/avant.json bench/results/apres.json
+"""
+import sys
+import json
+from pathlib import Path
+
+METRICS = ("throughput", "p50_ms", "p95_ms", "p99_ms")
+
+
+def delta(before, after):
+    if not before:
+        return "   n/a"
+    return f"{(after - before) / before * 100:+6.1f}%"
+
+
+def main(argv=None):
+    argv = argv if argv is not None else sys.argv[1:]
+    if len(argv) != 2:
+        raise SystemExit(__doc__)
+    before, after = (json.loads(Path(path).read_text(encoding="utf-8")) for path in argv)
+    print(f"{before.get('commit')} -> {after.get('commit')} ({after['scenario']}, concurrence {after['concurrency']})")
+    print(f"{'route':<14}" + "".join(f"{metric:>22}" for metric in METRICS))
+    for name in sorted(before["endpoints"].keys() | after["endpoints"].keys()):
+        old, new = before["endpoints"].get(name, {}), after["endpoints"].get(name, {})
+        cells = []
+        for metric in METRICS:
+            if metric in old and metric in new:
+                cells.append(f"{old[metric]:>8} -> {new[metric]:<7}{delta(old[metric], new[metric])}")
+            else:
+                cells.append(f"{'absent':>22}")
+        print(f"{name:<14}" + "".join(f"{cell:>22}" for cell in cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Vérifie les plans d'exécution des requêtes des routes les plus sollicitées.
+
+    DB_BACKEND=sqlite DB_SQLITE_PATH=bench.db python bench/explain.py
+
+Les requêtes sont celles réellement émises par les dépôts (capturées pendant
+leur exécution sur la base remplie par seed.py), puis passées à EXPLAIN
+(MySQL) ou EXPLAIN QUERY PLAN (SQLite). Un parcours complet d'une table fait
+échouer le script : un index manquant se voit avant la mise en production.
+"""
+import re
+import sys
+import asyncio
+from datetime import date, datetime
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "back"))
+import database
+from database import db
+from filters import TaskFilters
+from repository import (
+    ProjectRepository, ProjectUserRepository, TaskRepository, AssignmentRepository, StatsRepository, ArchiveRepository,
+)
+
+TABLES = {
+    "Users", "Projects", "Tasks", "ProjectUsers", "AssignedTasks",
+    "ProjectTaskStats", "ProjectDueStats", "ProjectAssigneeStats",
+    "ArchivedProjects", "ArchivedTasks", "ArchivedProjectUsers", "ArchivedAssignedTasks",
+}
+
+
+def task_filters(**values):
+    defaults = dict(status=None, priority=None, due_after=None, due_before=None, assignee_id=None,
+                    q=None, sort=None, after_value=None)
+    return TaskFilters(**{**defaults, **values})
+
+
+async def capture(calls):
+    """Exécute chaque appel de dépôt et retourne les requêtes SELECT qu'il a émises."""
+    captured = []
+    record_query = database.record_query
+
+    def recorder(query, params, duration, rows=0):
+        record_query(query, params, duration, rows)
+        if query.lstrip().upper().startswith("SELECT"):
+            captured.append((label, query, params))
+
+    database.record_query = recorder
+    try:
+        for label, call in calls:
+            await call()
+    finally:
+        database.record_query = record_query
+    return captured
+
+
+def aliases(query):
+    """{alias ou nom: table} des tables de base citées dans la requête."""
+    found = {}
+    for table, alias in re.findall(r"(?:FROM|JOIN)\s+(\w+)(?:\s+(?!WHERE|JOIN|ON|LEFT|ORDER|GROUP|LIMIT)(\w+))?", query):
+        if table in TABLES:
+            found[alias or table] = table
+            found[table] = table
+    return found
+
+
+async def full_scans(conn, query, params):
+    """Plan de la requête et liste des tables parcourues en entier."""
+    if db.dialect == "sqlite":
+        plan = await conn.fetch_all(f"EXPLAIN QUERY PLAN {query}", params)
+        lines = [row["detail"] for row in plan]
+        # Sous-requêtes (réunions avec les archives) : nommées comme leur table, parcourues en mémoire
+        derived = {
+            match.group(1) for line in lines if (match := re.match(r"(?:CO-ROUTINE|MATERIALIZE) (\w+)$", line))
+        }
+        tables = {name: table for name, table in aliases(query).items() if name not in derived}
+        scans = [
+            tables[match.group(1)] for line in lines
+            if (match := re.match(r"SCAN (\w+)$", line)) and match.group(1) in tables
+        ]
+    else:
+        plan = await conn.fetch_all(f"EXPLAIN {query}", params)
+        lines = [f"{row['table']}: type={row['type']} key={row['key']} rows={row['rows']}" for row in plan]
+        scans = [row["table"] for row in plan if row["type"] == "ALL" and not str(row["table"]).startswith("<")]
+    return lines, scans
+
+
+async def main():
+    await db.open()
+    try:
+        project = await db.fetch_one("SELECT id, owner_id FROM Projects ORDER BY id LIMIT 1")
+        task = await db.fetch_one("SELECT id FROM Tasks WHERE project_id = %s LIMIT 1", (project["id"],))
+        if project is None or task is None:
+            raise SystemExit("Base vide : lancer d'abord bench/seed.py")
+        project_id, user_id = project["id"], project["owner_id"]
+        projects, members = ProjectRepository(db), ProjectUserRepository(db)
+        tasks, assignments, stats = TaskRepository(db), AssignmentRepository(db), StatsRepository(db)
+        archives = ArchiveRepository(db)
+
+        queries = await capture([
+            ("my-projects", lambda: projects.list_for_user(user_id, limit=100)),
+            ("my-projects (page 2)", lambda: projects.list_for_user(user_id, after_id=project_id, limit=100)),
+            ("accès projet", lambda: projects.access(project_id, user_id)),
+            ("membres", lambda: members.member_ids(project_id)),
+            ("tableau", lambda: tasks.list_by_project(project_id, task_filters())),
+            ("tableau filtré", lambda: tasks.list_by_project(
+                project_id, task_filters(status=["todo"], priority=["haute"], sort="-due_date"))),
+            ("tableau par assigné", lambda: tasks.list_by_project(project_id, task_filters(assignee_id=user_id))),
+            ("assignés d'une tâche", lambda: assignments.users_for_task(task["id"])),
+            ("statistiques", lambda: stats.for_projects([project_id, project_id + 1], date.today())),
+            ("my-projects + archives", lambda: projects.list_for_user(user_id, limit=100, include_archived=True)),
+            ("tableau + archives", lambda: tasks.list_by_project(project_id, task_filters(), include_archived=True)),
+            ("projets à archiver", lambda: archives.archivable_projects(100)),
+            ("tâches à archiver", lambda: archives.archivable_tasks(datetime(2000, 1, 1), 100)),
+        ])
+
+        failures = 0
+        async with db.acquire() as conn:
+            for label, query, params in queries:
+                lines, scans = await full_scans(conn, query, params)
+                status = "PARCOURS COMPLET : " + ", ".join(scans) if scans else "ok"
+                failures += bool(scans)
+                print(f"[{status}] {label}")
+                for line in lines:
+                    print(f"    {line}")
+        print(f"{len(queries)} requêtes, {failures} avec parcours complet")
+        if failures:
+            raise SystemExit(1)
+    finally:
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
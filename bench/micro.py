@@ -0,0 +1,89 @@
+"""
+Micro-benchmarks sans base de données.
+
+    python bench/micro.py
+
+    auth           coût par requête de la vérification du JWT (cache de tokens / jwt.decode)
+    serialization  sérialisation d'un tableau de 1k / 10k / 100k tâches
+                   (response_model + jsonable_encoder / lignes sérialisées telles quelles)
+    search         index en mémoire (backend SQLite de /search) : construction et recherche
+                   dans 1M de tâches, terme rare, terme fréquent, préfixe, utilisateur à 20 projets
+"""
+import sys
+import json
+import time
+import random
+from datetime import date, datetime
+from pathlib import Path
+from typing import List
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "back"))
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from jose import jwt
+
+from Auth import ALGORITHM, TokenVerifier, create_access_token, JWT_KEYS, JWT_ACTIVE_KID
+from db_matching import TaskWithUsers
+from responses import dumps
+from search import InvertedIndex, parse_query
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def bench_auth(repeat=20000):
+    token = create_access_token({"sub": "1"})
+    verifier = TokenVerifier()
+    verifier.verify(token)
+    cached = timed(lambda: verifier.verify(token), repeat)
+    decoded = timed(lambda: jwt.decode(token, JWT_KEYS[JWT_ACTIVE_KID], algorithms=[ALGORITHM]), repeat // 10)
+    return {"cached_us": round(cached * 1e6, 2), "jwt_decode_us": round(decoded * 1e6, 2)}
+
+
+def board(size):
+    user = {"id": 1, "name": "user1", "email": "user1@example.com", "role": "member"}
+    return [
+        {"id": i, "title": f"tâche {i}", "description": "description " * 5, "due_date": date(2026, 1, 1),
+         "status": "todo", "priority": "haute", "project_id": 1, "created_at": datetime(2026, 1, 1, 9, 30),
+         "users": [user]}
+        for i in range(size)
+    ]
+
+
+def bench_serialization(sizes=(1000, 10000, 100000)):
+    adapter = TypeAdapter(List[TaskWithUsers])
+    results = {}
+    for size in sizes:
+        rows = board(size)
+        validated = timed(lambda: json.dumps(jsonable_encoder(adapter.validate_python(rows))).encode(), 1)
+        direct = timed(lambda: dumps(rows), 3)
+        results[size] = {"response_model_ms": round(validated * 1000, 1), "trusted_ms": round(direct * 1000, 1)}
+    return results
+
+
+def bench_search(size=1_000_000, projects=10_000, repeat=20):
+    rng = random.Random(0)
+    words = [f"mot{i}" for i in range(20000)]
+    index = InvertedIndex()
+    start = time.perf_counter()
+    for doc_id in range(1, size + 1):
+        title = " ".join(rng.choices(words[:2000], k=4))
+        description = " ".join(rng.choices(words, k=12))
+        index.put(doc_id, doc_id % projects, None, title, description)
+    results = {"build_s": round(time.perf_counter() - start, 1)}
+    everything, few = set(range(projects)), set(range(20))
+    for label, q, scope in [("rare", "mot19999", everything), ("frequent", "mot1 mot2", everything),
+                            ("prefix", "mot1 mot2", everything), ("user_20_projects", "mot1", few)]:
+        query_terms, prefix = parse_query(q if label == "prefix" else q + " ")
+        elapsed = timed(lambda: index.search(query_terms, prefix, scope, 20), repeat)
+        results[f"{label}_ms"] = round(elapsed * 1000, 2)
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps({"auth": bench_auth(), "serialization": bench_serialization(), "search": bench_search()},
+                     indent=2))
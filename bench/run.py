@@ -0,0 +1,206 @@
+"""
+Charge réaliste d'un tableau Kanban, à concurrence fixe, sur une base remplie par seed.py.
+
+    python bench/run.py --url http://127.0.0.1:8000 --concurrency 50 --duration 30
+    DB_BACKEND=sqlite DB_SQLITE_PATH=bench.db python bench/run.py      # application chargée en processus
+
+Chaque utilisateur virtuel se connecte, choisit un de ses projets puis enchaîne
+au hasard (pondéré) : chargement du tableau, déplacement d'une carte,
+assignation d'utilisateurs, liste de ses projets.
+
+Scénarios :
+    kanban        le mélange ci-dessus
+    login-storm   la moitié des utilisateurs virtuels ne font que se connecter,
+                  pour mesurer l'effet des calculs bcrypt sur les autres routes
+
+Tous les utilisateurs virtuels venant de la même adresse, les limites de
+débit de l'API sont à couper (RATE_LIMITS=off au lancement de l'API ; coupées
+d'office quand l'application est chargée en processus).
+
+Le résultat (débit, p50/p95/p99 par route) est écrit en JSON dans bench/results/
+pour être comparé d'un commit à l'autre avec compare.py.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import subprocess
+from pathlib import Path
+from datetime import datetime
+
+import httpx
+
+sys.path.append(str(Path(__file__).resolve().parent))
+from seed import BENCH_PASSWORD, bench_email
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+STATUSES = ("todo", "en cours", "terminé")
+# Poids des actions d'un utilisateur virtuel sur son tableau
+MIX = {"board": 50, "move": 25, "assign": 10, "my-projects": 15}
+
+
+class Recorder:
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}  # route -> {code HTTP (ou "réseau"): nombre}
+
+    async def call(self, name, request):
+        start = time.perf_counter()
+        try:
+            response = await request
+            error = response.status_code if response.status_code >= 400 else None
+        except httpx.HTTPError:
+            response, error = None, "réseau"
+        self.latencies.setdefault(name, []).append(time.perf_counter() - start)
+        if error is not None:
+            errors = self.errors.setdefault(name, {})
+            errors[str(error)] = errors.get(str(error), 0) + 1
+            return None
+        return response
+
+
+def percentile(values, p):
+    """Percentile au rang le plus proche, sur des valeurs triées."""
+    index = max(0, min(len(values) - 1, round(p / 100 * len(values) + 0.5) - 1))
+    return values[index]
+
+
+def summarize(recorder, elapsed):
+    endpoints = {}
+    for name, latencies in sorted(recorder.latencies.items()):
+        values = sorted(latencies)
+        endpoints[name] = {
+            "requests": len(values),
+            "errors": sum(recorder.errors.get(name, {}).values()),
+            "errors_by_status": recorder.errors.get(name, {}),
+            "throughput": round(len(values) / elapsed, 2),
+            "mean_ms": round(sum(values) / len(values) * 1000, 2),
+            **{f"p{p}_ms": round(percentile(values, p) * 1000, 2) for p in (50, 95, 99)},
+        }
+    total = sum(e["requests"] for e in endpoints.values())
+    return {"requests": total, "throughput": round(total / elapsed, 2), "endpoints": endpoints}
+
+
+async def login(client, recorder, email):
+    response = await recorder.call("login", client.post("/login", json={"email": email, "password": BENCH_PASSWORD}))
+    return {"Authorization": f"Bearer {response.json()['token']}"} if response else None
+
+
+async def kanban_user(client, recorder, email, deadline, rng):
+    headers = await login(client, recorder, email)
+    if headers is None:
+        return
+    response = await recorder.call("my-projects", client.get("/my-projects", headers=headers))
+    projects = response.json() if response else []
+    if not projects:
+        return
+    project_id = rng.choice(projects)["id"]
+    members = await client.get(f"/project-users/{project_id}", headers=headers)
+    team = [row["user_id"] for row in members.json()] if members.status_code == 200 else []
+    tasks = []
+    actions, weights = zip(*MIX.items())
+    while time.perf_counter() < deadline:
+        action = rng.choices(actions, weights)[0]
+        if action == "board" or not tasks:
+            response = await recorder.call("board", client.get(f"/projects/{project_id}/tasks", headers=headers))
+            tasks = [task["id"] for task in response.json()] if response else tasks
+        elif action == "move":
+            await recorder.call("move", client.put(
+                f"/tasks/{rng.choice(tasks)}", json={"status": rng.choice(STATUSES)}, headers=headers
+            ))
+        elif action == "assign":
+            user_ids = rng.sample(team, min(2, len(team)))
+            await recorder.call("assign", client.post(
+                f"/tasks/{rng.choice(tasks)}/assign-users", json={"user_ids": user_ids}, headers=headers
+            ))
+        else:
+            await recorder.call("my-projects", client.get("/my-projects", headers=headers))
+
+
+async def login_storm_user(client, recorder, email, deadline, rng):
+    while time.perf_counter() < deadline:
+        await login(client, recorder, email)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de charge de l'API")
+    parser.add_argument("--url", help="API déjà lancée ; sinon l'application est chargée dans ce processus")
+    parser.add_argument("--scenario", choices=("kanban", "login-storm"), default="kanban")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=20, help="Secondes de charge")
+    parser.add_argument("--users", type=int, default=1000, help="Comme seed.py --users")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, help="Fichier JSON (par défaut bench/results/<date>-<commit>.json)")
+    return parser.parse_args(argv)
+
+
+async def run(args, client):
+    rng = random.Random(args.seed)
+    recorder = Recorder()
+    deadline = time.perf_counter() + args.duration
+    users = []
+    for i in range(args.concurrency):
+        storm = args.scenario == "login-storm" and i % 2 == 1
+        worker = login_storm_user if storm else kanban_user
+        email = bench_email(rng.randrange(args.users))
+        users.append(worker(client, recorder, email, deadline, random.Random(rng.random())))
+    started = time.perf_counter()
+    await asyncio.gather(*users)
+    return summarize(recorder, time.perf_counter() - started)
+
+
+async def main(argv=None):
+    args = parse_args(argv)
+    limits = httpx.Limits(max_connections=args.concurrency)
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as client:
+            results = await run(args, client)
+    else:
+        sys.path.append(str(Path(__file__).resolve().parent.parent / "back"))
+        os.environ.setdefault("RATE_LIMITS", "off")
+        import main as api
+
+        transport = httpx.ASGITransport(app=api.app)
+        async with api.lifespan(api.app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+                results = await run(args, client)
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "target": args.url or "in-process",
+        "scenario": args.scenario,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        **results,
+    }
+    output = args.output or RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}-{commit or 'local'}-{args.scenario}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    print(f"{'route':<14}{'req':>8}{'err':>6}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}  (ms)")
+    for name, stats in report["endpoints"].items():
+        print(f"{name:<14}{stats['requests']:>8}{stats['errors']:>6}{stats['throughput']:>9}"
+              f"{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}")
+    print(f"Total : {report['requests']} requêtes, {report['throughput']} req/s -> {output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,134 @@
+"""
+Remplit la base de données synthétiques pour les benchmarks.
+
+    DB_BACKEND=sqlite DB_SQLITE_PATH=bench.db python bench/seed.py --projects 1000
+    python bench/seed.py --users 10000 --projects 100000 --members 10 --reset   # MySQL (docker-compose)
+    python bench/seed.py --projects 1000 --archived 20000 --reset   # mêmes projets actifs, grosses archives
+
+Les utilisateurs sont user{i}@bench.local, tous avec le mot de passe "bench".
+Le tirage est déterministe (--seed) : deux bases remplies avec les mêmes
+paramètres sont identiques, ce qui rend les mesures comparables d'un commit à l'autre.
+"""
+import sys
+import time
+import random
+import asyncio
+import argparse
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "back"))
+from Auth import get_password_hash
+from database import db
+from filters import TASK_STATUSES, TASK_PRIORITIES
+from ranking import rank_between
+from reconcile import reconcile_all
+from archiving import archive_pass
+from repository import ArchiveRepository, StatsRepository
+
+BENCH_PASSWORD = "bench"
+PROJECTS_PER_TRANSACTION = 100
+# Ordre de suppression compatible avec les clés étrangères
+TABLES = (
+    "ArchivedAssignedTasks", "ArchivedProjectUsers", "ArchivedTasks", "ArchivedProjects",
+    "AssignedTasks", "ProjectUsers", "Tasks", "ImportJobs",
+    "ProjectTaskStats", "ProjectDueStats", "ProjectAssigneeStats", "Projects", "Users",
+)
+
+
+def bench_email(index):
+    return f"user{index}@bench.local"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Données synthétiques pour les benchmarks")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--projects", type=int, default=1000)
+    parser.add_argument("--members", type=int, default=5, help="Membres par projet, en plus du propriétaire")
+    parser.add_argument("--tasks", type=int, default=100, help="Tâches par projet")
+    parser.add_argument("--assignees", type=int, default=2, help="Assignés par tâche")
+    parser.add_argument("--archived", type=int, default=0,
+                        help="Projets archivés en plus, déplacés dans les archives (projets actifs inchangés)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="Vider les tables avant de remplir")
+    return parser.parse_args(argv)
+
+
+async def reset():
+    async with db.transaction() as conn:
+        for table in TABLES:
+            await conn.execute(f"DELETE FROM {table}")
+
+
+async def seed(args):
+    rng = random.Random(args.seed)
+    password = get_password_hash(BENCH_PASSWORD)  # un seul calcul bcrypt pour tous
+    async with db.transaction() as conn:
+        user_ids = await conn.insert_many(
+            "Users", ("name", "email", "password", "role"),
+            [(f"user{i}", bench_email(i), password, "member") for i in range(args.users)],
+        )
+
+    today = date.today()
+    total = args.projects + args.archived
+    for start in range(0, total, PROJECTS_PER_TRANSACTION):
+        count = min(PROJECTS_PER_TRANSACTION, total - start)
+        owners = [rng.choice(user_ids) for _ in range(count)]
+        async with db.transaction() as conn:
+            project_ids = await conn.insert_many(
+                "Projects", ("name", "status", "owner_id"),
+                [(f"projet {start + i}", "actif" if start + i < args.projects else "archivé", owner)
+                 for i, owner in enumerate(owners)],
+            )
+            memberships, tasks, teams = [], [], []
+            for project_id, owner in zip(project_ids, owners):
+                others = [user for user in rng.sample(user_ids, min(args.members + 1, len(user_ids))) if user != owner]
+                members = others[:args.members]
+                memberships += [(project_id, user, "editor") for user in members]
+                team = [owner, *members]
+                column_ends = {}
+                for n in range(args.tasks):
+                    status = rng.choice(TASK_STATUSES)
+                    column_ends[status] = rank_between(column_ends.get(status), None)
+                    tasks.append((
+                        f"tâche {n}", status, rng.choice(TASK_PRIORITIES),
+                        today + timedelta(days=rng.randint(-30, 90)), project_id, column_ends[status],
+                    ))
+                    teams.append(team)
+            await conn.insert_many("ProjectUsers", ("project_id", "user_id", "role"), memberships, with_ids=False)
+            task_ids = await conn.insert_many(
+                "Tasks", ("title", "status", "priority", "due_date", "project_id", "position"), tasks
+            )
+            assignments = [
+                (task_id, user)
+                for task_id, team in zip(task_ids, teams)
+                for user in rng.sample(team, min(args.assignees, len(team)))
+            ]
+            await conn.insert_many("AssignedTasks", ("task_id", "user_id"), assignments, with_ids=False)
+        print(f"  {start + count}/{total} projets", end="\r", flush=True)
+    print()
+    if args.archived:
+        await archive_pass(ArchiveRepository(db))
+    # Insertions directes : compteurs du tableau de bord recalculés d'un coup
+    await reconcile_all(StatsRepository(db))
+
+
+async def main(argv=None):
+    args = parse_args(argv)
+    await db.open()
+    try:
+        if args.reset:
+            await reset()
+        started = time.perf_counter()
+        await seed(args)
+        print(
+            f"{args.users} utilisateurs, {args.projects} projets, {args.projects * args.members} adhésions, "
+            f"{args.projects * args.tasks} tâches ({args.archived} projets archivés) "
+            f"en {time.perf_counter() - started:.1f} s"
+        )
+    finally:
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
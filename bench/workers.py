@@ -0,0 +1,131 @@
+"""
+Débit de l'API selon le nombre de workers (back/serve.py), sur une base
+remplie par seed.py :
+
+    SHARED_BACKEND=redis python bench/workers.py --workers 1 2 4 8 --duration 20
+
+Pour chaque nombre de workers N, l'API est lancée sur N workers puis chargée
+par N processus run.py de --concurrency utilisateurs virtuels chacun : la
+charge croît avec les workers. Le débit total, l'accélération par rapport à
+un worker et l'efficacité (accélération / N) sont affichés et écrits en JSON
+dans bench/results/. Le générateur de charge tourne sur la même machine :
+garder 2 x N sous le nombre de cœurs pour que la mesure reste celle de l'API.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+BENCH_DIR = Path(__file__).resolve().parent
+SERVE = BENCH_DIR.parent / "back" / "serve.py"
+RESULTS_DIR = BENCH_DIR / "results"
+
+sys.path.append(str(BENCH_DIR))
+from run import git_commit
+
+
+def default_workers():
+    cores = os.cpu_count() or 1
+    counts, n = [], 1
+    while n <= cores:
+        counts.append(n)
+        n *= 2
+    return counts
+
+
+def wait_ready(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"API injoignable sur {url}")
+
+
+def measure(workers, args):
+    url = f"http://127.0.0.1:{args.port}"
+    # Toute la charge vient de 127.0.0.1 : sans limites de débit
+    server = subprocess.Popen([sys.executable, str(SERVE), "--workers", str(workers), "--port", str(args.port)],
+                              env={**os.environ, "RATE_LIMITS": "off"})
+    try:
+        wait_ready(url)
+        time.sleep(args.warmup)  # tous les workers prêts
+        with tempfile.TemporaryDirectory() as tmp:
+            outputs = [Path(tmp) / f"load-{i}.json" for i in range(workers)]
+            loads = [
+                subprocess.Popen([
+                    sys.executable, str(BENCH_DIR / "run.py"), "--url", url, "--concurrency", str(args.concurrency),
+                    "--duration", str(args.duration), "--users", str(args.users), "--seed", str(args.seed + i),
+                    "--output", str(output),
+                ], stdout=subprocess.DEVNULL)
+                for i, output in enumerate(outputs)
+            ]
+            for load in loads:
+                load.wait()
+            reports = [json.loads(output.read_text(encoding="utf-8")) for output in outputs]
+    finally:
+        server.terminate()
+        server.wait()
+    board = [report["endpoints"].get("board", {}) for report in reports]
+    return {
+        "workers": workers,
+        "requests": sum(report["requests"] for report in reports),
+        "errors": sum(e["errors"] for report in reports for e in report["endpoints"].values()),
+        "throughput": round(sum(report["throughput"] for report in reports), 2),
+        "board_p95_ms": max((b.get("p95_ms", 0) for b in board), default=None),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Passage à l'échelle de l'API selon le nombre de workers")
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers())
+    parser.add_argument("--concurrency", type=int, default=20, help="Utilisateurs virtuels par worker")
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--warmup", type=float, default=2)
+    parser.add_argument("--users", type=int, default=1000, help="Comme seed.py --users")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args(argv)
+
+    runs = [measure(workers, args) for workers in args.workers]
+    base = runs[0]["throughput"] / runs[0]["workers"] or 1
+    for run in runs:
+        speedup = run["throughput"] / base
+        run["speedup"] = round(speedup, 2)
+        run["efficiency"] = round(speedup / run["workers"], 2)
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "concurrency_per_worker": args.concurrency,
+        "duration": args.duration,
+        "runs": runs,
+    }
+    output = args.output or RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}-{commit or 'local'}-workers.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    print(f"{'workers':>8}{'req/s':>10}{'accél.':>9}{'effic.':>9}{'err':>6}{'p95 board':>11}")
+    for run in runs:
+        print(f"{run['workers']:>8}{run['throughput']:>10}{run['speedup']:>9}{run['efficiency']:>9}"
+              f"{run['errors']:>6}{run['board_p95_ms']:>11}")
+    print(f"-> {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,19 @@
 import { createApp } from 'vue'
 import { createPinia } from 'pinia'
+import axios from 'axios'
 
 import App from './App.vue'
 import router from './router/index.js'
 
+// Le JWT accompagne chaque appel à l'API (les endpoints projets et tâches l'exigent)
+axios.interceptors.request.use((config) => {
+  const token = localStorage.getItem('token')
+  if (token && !config.headers.Authorization) {
+    config.headers.Authorization = `Bearer ${token}`
+  }
+  return config
+})
+
 const app = createApp(App)
 
 app.use(createPinia())
@@ -15,7 +15,14 @@ CREATE Table Projects (
     status ENUM("actif", "archivé") default "actif",
     owner_id INT,
     foreign key (owner_id) REFERENCES Users(id),
-    created_at DATETIME DEFAULT current_timestamp
+    created_at DATETIME DEFAULT current_timestamp,
+    -- Incrémentée à chaque modification (If-Match / conflit 409)
+    version INT NOT NULL DEFAULT 1,
+    INDEX idx_projects_owner (owner_id, id),
+    -- Projets à archiver (back/archiving.py)
+    INDEX idx_projects_status (status, id),
+    -- Recherche plein texte (GET /search)
+    FULLTEXT INDEX ft_projects (name, description)
 );
 
 CREATE TABLE Tasks (
@@ -27,15 +34,30 @@ CREATE TABLE Tasks (
     priority ENUM("basse", "moyenne", "haute", "critique") DEFAULT "moyenne",
     project_id INT NOT NULL,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    version INT NOT NULL DEFAULT 1,
+    -- Rang lexicographique de la carte dans sa colonne (back/ranking.py), comparé octet par octet
+    position VARCHAR(64) CHARACTER SET ascii COLLATE ascii_bin NOT NULL DEFAULT 'a0',
+    -- Passage au statut "terminé" (NULL sinon) : les tâches terminées depuis longtemps sont archivées
+    completed_at DATETIME NULL,
     FOREIGN KEY (project_id) REFERENCES Projects(id) ON DELETE CASCADE,
     INDEX (status),
-    INDEX (priority)
+    INDEX (priority),
+    -- Filtres du tableau Kanban : statut/priorité ou échéance au sein d'un projet
+    INDEX idx_tasks_project_status_priority (project_id, status, priority),
+    INDEX idx_tasks_project_due_date (project_id, due_date),
+    -- Tableau dans l'ordre des colonnes (rang de l'ENUM) puis des cartes
+    INDEX idx_tasks_board (project_id, status, position),
+    INDEX idx_tasks_completed (status, completed_at),
+    -- Recherche plein texte (GET /search) ; mots de 2 caractères et plus (innodb_ft_min_token_size)
+    FULLTEXT INDEX ft_tasks (title, description)
 );
 
 CREATE TABLE AssignedTasks (
     task_id INT NOT NULL,
     user_id INT NOT NULL,
     PRIMARY KEY (task_id, user_id),
+    -- Filtre "tâches assignées à un utilisateur"
+    INDEX idx_assigned_user_task (user_id, task_id),
     FOREIGN KEY (task_id) REFERENCES Tasks(id) ON DELETE CASCADE,
     FOREIGN KEY (user_id) REFERENCES Users(id) ON DELETE CASCADE
 );
@@ -45,6 +67,100 @@ CREATE TABLE ProjectUsers (
     user_id INT NOT NULL,
     role ENUM('owner', 'editor', 'viewer') DEFAULT 'viewer',
     PRIMARY KEY (project_id, user_id),
+    INDEX idx_project_users_user (user_id, project_id),
     FOREIGN KEY (project_id) REFERENCES Projects(id) ON DELETE CASCADE,
     FOREIGN KEY (user_id) REFERENCES Users(id) ON DELETE CASCADE
-);
\ No newline at end of file
+);
+
+-- Compteurs du tableau de bord (GET /projects/{id}/stats), tenus à jour par les
+-- écritures de tâches et d'assignations, recalculés par back/reconcile.py
+CREATE TABLE ProjectTaskStats (
+    project_id INT NOT NULL,
+    status ENUM("todo", "en cours", "terminé") NOT NULL,
+    tasks INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (project_id, status),
+    FOREIGN KEY (project_id) REFERENCES Projects(id) ON DELETE CASCADE
+);
+
+-- Tâches non terminées par échéance : les tâches en retard sont la somme des échéances passées
+CREATE TABLE ProjectDueStats (
+    project_id INT NOT NULL,
+    due_date DATE NOT NULL,
+    tasks INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (project_id, due_date),
+    FOREIGN KEY (project_id) REFERENCES Projects(id) ON DELETE CASCADE
+);
+
+CREATE TABLE ProjectAssigneeStats (
+    project_id INT NOT NULL,
+    user_id INT NOT NULL,
+    tasks INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (project_id, user_id),
+    FOREIGN KEY (project_id) REFERENCES Projects(id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES Users(id) ON DELETE CASCADE
+);
+
+-- Archives (back/archiving.py) : projets archivés et tâches terminées depuis longtemps,
+-- sortis des tables chaudes avec leurs membres et assignations. Mêmes colonnes,
+-- mêmes ids (restauration à l'identique), sans clés étrangères vers les tables chaudes.
+CREATE TABLE ArchivedProjects (
+    id INT PRIMARY KEY,
+    name VARCHAR(30) NOT NULL,
+    description TEXT,
+    start_date DATE,
+    end_date DATE,
+    status ENUM("actif", "archivé") default "actif",
+    owner_id INT,
+    created_at DATETIME,
+    version INT NOT NULL DEFAULT 1,
+    archived_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_archived_projects_owner (owner_id, id)
+);
+
+CREATE TABLE ArchivedTasks (
+    id INT PRIMARY KEY,
+    title VARCHAR(100) NOT NULL,
+    description TEXT,
+    due_date DATE,
+    status ENUM("todo", "en cours", "terminé") DEFAULT "todo",
+    priority ENUM("basse", "moyenne", "haute", "critique") DEFAULT "moyenne",
+    project_id INT NOT NULL,
+    created_at DATETIME,
+    version INT NOT NULL DEFAULT 1,
+    position VARCHAR(64) CHARACTER SET ascii COLLATE ascii_bin NOT NULL DEFAULT 'a0',
+    completed_at DATETIME NULL,
+    archived_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_archived_tasks_board (project_id, status, position)
+);
+
+CREATE TABLE ArchivedAssignedTasks (
+    task_id INT NOT NULL,
+    user_id INT NOT NULL,
+    archived_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (task_id, user_id),
+    INDEX idx_archived_assigned_user_task (user_id, task_id),
+    FOREIGN KEY (user_id) REFERENCES Users(id) ON DELETE CASCADE
+);
+
+CREATE TABLE ArchivedProjectUsers (
+    project_id INT NOT NULL,
+    user_id INT NOT NULL,
+    role ENUM('owner', 'editor', 'viewer') DEFAULT 'viewer',
+    archived_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (project_id, user_id),
+    INDEX idx_archived_project_users_user (user_id, project_id),
+    FOREIGN KEY (user_id) REFERENCES Users(id) ON DELETE CASCADE
+);
+
+CREATE TABLE ImportJobs (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    user_id INT NOT NULL,
+    checksum CHAR(64) NOT NULL,
+    status ENUM('en cours', 'terminé', 'échec') DEFAULT 'en cours',
+    total INT NOT NULL,
+    done INT NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES Users(id) ON DELETE CASCADE
+);
@@ -0,0 +1,137 @@
+-- Schéma équivalent à init.sql pour le backend SQLite (tests locaux, DB_BACKEND=sqlite)
+CREATE TABLE IF NOT EXISTS Users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(30) NOT NULL,
+    email VARCHAR(100) NOT NULL UNIQUE,
+    password VARCHAR(255) NOT NULL,
+    role TEXT CHECK (role IN ('admin', 'member', 'guest')) DEFAULT 'member'
+);
+
+CREATE TABLE IF NOT EXISTS Projects (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(30) NOT NULL,
+    description TEXT,
+    start_date DATE,
+    end_date DATE,
+    status TEXT CHECK (status IN ('actif', 'archivé')) DEFAULT 'actif',
+    owner_id INT REFERENCES Users(id),
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    version INT NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_projects_owner ON Projects (owner_id, id);
+CREATE INDEX IF NOT EXISTS idx_projects_status ON Projects (status, id);
+
+CREATE TABLE IF NOT EXISTS Tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title VARCHAR(100) NOT NULL,
+    description TEXT,
+    due_date DATE,
+    status TEXT CHECK (status IN ('todo', 'en cours', 'terminé')) DEFAULT 'todo',
+    priority TEXT CHECK (priority IN ('basse', 'moyenne', 'haute', 'critique')) DEFAULT 'moyenne',
+    project_id INT NOT NULL REFERENCES Projects(id) ON DELETE CASCADE,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    version INT NOT NULL DEFAULT 1,
+    position TEXT NOT NULL DEFAULT 'a0',
+    completed_at DATETIME
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON Tasks (status);
+CREATE INDEX IF NOT EXISTS idx_tasks_priority ON Tasks (priority);
+CREATE INDEX IF NOT EXISTS idx_tasks_project_status_priority ON Tasks (project_id, status, priority);
+CREATE INDEX IF NOT EXISTS idx_tasks_project_due_date ON Tasks (project_id, due_date);
+CREATE INDEX IF NOT EXISTS idx_tasks_board ON Tasks (project_id, status, position);
+CREATE INDEX IF NOT EXISTS idx_tasks_completed ON Tasks (status, completed_at);
+
+CREATE TABLE IF NOT EXISTS AssignedTasks (
+    task_id INT NOT NULL REFERENCES Tasks(id) ON DELETE CASCADE,
+    user_id INT NOT NULL REFERENCES Users(id) ON DELETE CASCADE,
+    PRIMARY KEY (task_id, user_id)
+);
+CREATE INDEX IF NOT EXISTS idx_assigned_user_task ON AssignedTasks (user_id, task_id);
+
+CREATE TABLE IF NOT EXISTS ProjectUsers (
+    project_id INT NOT NULL REFERENCES Projects(id) ON DELETE CASCADE,
+    user_id INT NOT NULL REFERENCES Users(id) ON DELETE CASCADE,
+    role TEXT CHECK (role IN ('owner', 'editor', 'viewer')) DEFAULT 'viewer',
+    PRIMARY KEY (project_id, user_id)
+);
+CREATE INDEX IF NOT EXISTS idx_project_users_user ON ProjectUsers (user_id, project_id);
+
+CREATE TABLE IF NOT EXISTS ProjectTaskStats (
+    project_id INT NOT NULL REFERENCES Projects(id) ON DELETE CASCADE,
+    status TEXT NOT NULL CHECK (status IN ('todo', 'en cours', 'terminé')),
+    tasks INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (project_id, status)
+);
+
+CREATE TABLE IF NOT EXISTS ProjectDueStats (
+    project_id INT NOT NULL REFERENCES Projects(id) ON DELETE CASCADE,
+    due_date DATE NOT NULL,
+    tasks INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (project_id, due_date)
+);
+
+CREATE TABLE IF NOT EXISTS ProjectAssigneeStats (
+    project_id INT NOT NULL REFERENCES Projects(id) ON DELETE CASCADE,
+    user_id INT NOT NULL REFERENCES Users(id) ON DELETE CASCADE,
+    tasks INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (project_id, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS ArchivedProjects (
+    id INTEGER PRIMARY KEY,
+    name VARCHAR(30) NOT NULL,
+    description TEXT,
+    start_date DATE,
+    end_date DATE,
+    status TEXT CHECK (status IN ('actif', 'archivé')) DEFAULT 'actif',
+    owner_id INT,
+    created_at DATETIME,
+    version INT NOT NULL DEFAULT 1,
+    archived_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_archived_projects_owner ON ArchivedProjects (owner_id, id);
+
+CREATE TABLE IF NOT EXISTS ArchivedTasks (
+    id INTEGER PRIMARY KEY,
+    title VARCHAR(100) NOT NULL,
+    description TEXT,
+    due_date DATE,
+    status TEXT CHECK (status IN ('todo', 'en cours', 'terminé')) DEFAULT 'todo',
+    priority TEXT CHECK (priority IN ('basse', 'moyenne', 'haute', 'critique')) DEFAULT 'moyenne',
+    project_id INT NOT NULL,
+    created_at DATETIME,
+    version INT NOT NULL DEFAULT 1,
+    position TEXT NOT NULL DEFAULT 'a0',
+    completed_at DATETIME,
+    archived_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_archived_tasks_board ON ArchivedTasks (project_id, status, position);
+
+CREATE TABLE IF NOT EXISTS ArchivedAssignedTasks (
+    task_id INT NOT NULL,
+    user_id INT NOT NULL REFERENCES Users(id) ON DELETE CASCADE,
+    archived_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (task_id, user_id)
+);
+CREATE INDEX IF NOT EXISTS idx_archived_assigned_user_task ON ArchivedAssignedTasks (user_id, task_id);
+
+CREATE TABLE IF NOT EXISTS ArchivedProjectUsers (
+    project_id INT NOT NULL,
+    user_id INT NOT NULL REFERENCES Users(id) ON DELETE CASCADE,
+    role TEXT CHECK (role IN ('owner', 'editor', 'viewer')) DEFAULT 'viewer',
+    archived_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (project_id, user_id)
+);
+CREATE INDEX IF NOT EXISTS idx_archived_project_users_user ON ArchivedProjectUsers (user_id, project_id);
+
+CREATE TABLE IF NOT EXISTS ImportJobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INT NOT NULL REFERENCES Users(id) ON DELETE CASCADE,
+    checksum CHAR(64) NOT NULL,
+    status TEXT CHECK (status IN ('en cours', 'terminé', 'échec')) DEFAULT 'en cours',
+    total INT NOT NULL,
+    done INT NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);